@@ -26,16 +26,10 @@ __copyright__ = """
   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
 
-import ctypes
-from ctypes.wintypes import BYTE, BOOL, WORD, DWORD, LONG, ULONG, LPVOID
 from collections import namedtuple
+import importlib
 import os
-
-from msp430dll.api import API, StatusCode, STATUS_T
-from msp430dll.base import BaseAPI, FileType
-from msp430dll.debug import DebugAPI
-from msp430dll.eem import EMMAPI
-from msp430dll.logger import Logger
+import sys
 
 MSP430_DLL = "msp430"
 
@@ -49,46 +43,93 @@ static const char tilib_filename[] = "libmsp430.so";
 
 Instance = namedtuple('Instance', 'klass dll')
 
-class DLL(object):
 
-    _dllInstances = {}
+class _LazyAPI(object):
+    """Create an API object on first access and cache it in the instance dict."""
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        api = self.factory(instance)
+        instance.__dict__[self.name] = api
+        return api
 
-    def __new__(cls, dllPath = '.', dllName = 'msp430'):
-        if dllPath not in DLL._dllInstances:
-            klass = super(DLL, cls).__new__(cls)
-            dll = DLL._loadDll(dllPath, dllName)
-            cls.dllPath = dllPath
-            cls.dllName = dllName
-            cls.logger = Logger()
 
-            baseApi = BaseAPI(klass, dll)
-            baseApi.loadFunctions()
-            klass.base = baseApi
+def _createDebug(dll):
+    from msp430dll.debug import DebugAPI
+    debugApi = DebugAPI(dll, dll.dll)
+    debugApi.loadFunctions()
+    debugApi.errorNumber = dll.base.errorNumber
+    debugApi.errorString = dll.base.errorString
+    return debugApi
 
-            debugApi = DebugAPI(klass, dll)
-            debugApi.loadFunctions()
-            klass.debug = debugApi
 
-            debugApi.errorNumber = baseApi.errorNumber
-            debugApi.errorString = baseApi.errorString
+def _createEem(dll):
+    from msp430dll.eem import EMMAPI
+    eemApi = EMMAPI(dll, dll.dll)
+    eemApi.loadFunctions()
+    return eemApi
 
-            eemApi = EMMAPI(klass, dll)
-            eemApi.loadFunctions()
-            klass.eem = eemApi
 
+class DLL(object):
+
+    _dllInstances = {}
+    instrumentation = None  # See `msp430dll.instrument.Instrumentation`.
+
+    debug = _LazyAPI('debug', _createDebug)
+    eem = _LazyAPI('eem', _createEem)
+
+    def __new__(cls, dllPath = '.', dllName = 'msp430', library = None):
+        """`library` replaces the loaded DLL, e.g. by a `msp430dll.replay.ReplayLibrary`.
+
+        `base` is set up right away, `debug` and `eem` on first use.
+        """
+        from msp430dll.base import BaseAPI
+        from msp430dll.logger import Logger
+
+        if library is None and dllPath in DLL._dllInstances:
+            inst = DLL._dllInstances[dllPath]
+            inst.klass.dll = inst.dll
+            return inst.klass
+        klass = super(DLL, cls).__new__(cls)
+        dll = DLL._loadDll(dllPath, dllName) if library is None else library
+        cls.dllPath = dllPath
+        cls.dllName = dllName
+        cls.logger = Logger()
+        klass.dll = dll
+
+        baseApi = BaseAPI(klass, dll)
+        baseApi.loadFunctions()
+        klass.base = baseApi
+
+        if library is None:
+            # Instances with their own `library` are not shared, so they go away together with the library.
             DLL._dllInstances[dllPath] = Instance(klass, dll)
-        inst = DLL._dllInstances[dllPath]
-        inst.klass.dll = inst.dll
-        return inst.klass
+        return klass
 
     @classmethod
     def _loadDll(cls, dllPath, dllName):
+        import ctypes
         currentPath = os.getcwd()
         os.chdir(dllPath)
-        mspDll = ctypes.windll.LoadLibrary(dllName)
-        os.chdir(currentPath)
+        try:
+            if os.name == 'nt':
+                mspDll = ctypes.windll.LoadLibrary(dllName)
+            else:
+                mspDll = ctypes.cdll.LoadLibrary(os.path.abspath("lib{0}.so".format(dllName)))
+        finally:
+            os.chdir(currentPath)
         return mspDll
 
+    def batch(self, **kws):
+        """Queue memory, register, erase and configure operations, see `msp430dll.batch.Batch`."""
+        from msp430dll.batch import Batch
+        return Batch(self, **kws)
+
     @classmethod
     def loadedDlls(cls):
         result = []
@@ -107,3 +148,32 @@ class DLL(object):
 ##
 
 
+## Names formerly imported eagerly; resolved on first access (PEP 562) to keep `import msp430dll` cheap.
+_LAZY_ATTRIBUTES = {
+    'API': 'msp430dll.api',
+    'StatusCode': 'msp430dll.api',
+    'STATUS_T': 'msp430dll.api',
+    'BaseAPI': 'msp430dll.base',
+    'FileType': 'msp430dll.base',
+    'DebugAPI': 'msp430dll.debug',
+    'EMMAPI': 'msp430dll.eem',
+    'Logger': 'msp430dll.logger',
+}
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        moduleName = _LAZY_ATTRIBUTES.get(name)
+        if moduleName is None:
+            raise AttributeError("module '{0}' has no attribute '{1}'".format(__name__, name))
+        value = getattr(importlib.import_module(moduleName), name)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+else:
+    from msp430dll.api import API, StatusCode, STATUS_T
+    from msp430dll.base import BaseAPI, FileType
+    from msp430dll.debug import DebugAPI
+    from msp430dll.eem import EMMAPI
+    from msp430dll.logger import Logger
@@ -48,8 +48,15 @@ class API(object):
         self.logger = Logger()
 
     def isImplemented(self, funcName):
-        return funcName not in self.unsupported
-        # As of now, only 'MSP430_Identify' is affected.
+        if funcName in self.__dict__:
+            return True
+        if funcName in self.unsupported:
+            return False
+        try:
+            getattr(self, funcName)
+        except AttributeError:
+            return False
+        return True
 
     def returnValue(self, value):
         if value == -1:
@@ -57,7 +64,7 @@ class API(object):
             errstr = self.parent.base.errorString(errno)
             raise MSPError("{0} -- {1}.".format(errno, errstr), errno = errno)
         elif value != 0:
-            self.warn("Unexpected return value: {0}".format(value))
+            self.warn("Unexpected return value: %s", value)
         return StatusCode(value)
 
     def functionFactory(self, library, functionName, resultType, argTypes, errorChecker = None):
@@ -67,35 +74,58 @@ class API(object):
         # These functions do not return 'STATUS_T'.
         if functionName not in ('MSP430_Error_Number', 'MSP430_Error_String', 'MSP430_GetCurVCCT', 'MSP430_GetExtVoltage'):
             func.restype = self.returnValue
+        else:
+            func.restype = resultType
         func.argtypes = argTypes
+        instrumentation = getattr(self.parent, 'instrumentation', None)
+        if instrumentation is not None:
+            return instrumentation.wrap(functionName, func)
         return func
 
+    @classmethod
+    def functionTable(cls):
+        """`FUNCTIONS` as a dict, keyed by function name."""
+        table = cls.__dict__.get('_functionTable')
+        if table is None:
+            table = {}
+            for fun in cls.FUNCTIONS:
+                if len(fun) not in (3, 4):
+                    raise AttributeError("wrong length of function definition '{0}'.".format(fun))
+                table[fun[0]] = fun
+            cls._functionTable = table
+        return table
+
     def loadFunctions(self):
-        for fun in self.FUNCTIONS:
-            addFunction = True
-            if len(fun) == 3:
-                functionName, resultType, argTypes = fun
-                if argTypes == []:
-                    argTypes = None
-                try:
-                    function = self.functionFactory(self.dll, functionName, resultType, argTypes)
-                except AttributeError as e:
-                    self.info(str(e))
-                    self.unsupported.append(functionName)
-                    addFunction = False
-            elif len(fun) == 4:
-                functionName, resultType, argTypes, checker = fun
-                if argTypes == []:
-                    argTypes = None
-                try:
-                    function = self.functionFactory(self.dll, functionName, resultType, argTypes, checker)
-                except AttributeError:
-                    self.unsupported.append(functionName)
-                    addFunction = False
-            else:
-                raise AttributeError("wrong length of function definition '{0}'.".format(fun))
-            if addFunction:
-                setattr(self, functionName, function)
+        """Prepare binding of `FUNCTIONS`.
+
+        Symbols are resolved on first access (see `__getattr__`), so only the
+        functions a session actually uses are looked up and configured.
+        """
+        self.functionTable()
+
+    def bindFunction(self, functionName):
+        fun = self.functionTable()[functionName]
+        if len(fun) == 3:
+            functionName, resultType, argTypes = fun
+            checker = None
+        else:
+            functionName, resultType, argTypes, checker = fun
+        if argTypes == []:
+            argTypes = None
+        try:
+            function = self.functionFactory(self.dll, functionName, resultType, argTypes, checker)
+        except AttributeError as e:
+            self.info("%s", e)
+            self.unsupported.append(functionName)
+            raise
+        setattr(self, functionName, function)
+        return function
+
+    def __getattr__(self, name):
+        # Only called for attributes not found otherwise, i.e. functions not bound yet.
+        if name.startswith("MSP430_") and name in self.functionTable() and name not in self.__dict__.get('unsupported', ()):
+            return self.bindFunction(name)
+        raise AttributeError("'{0}' object has no attribute '{1}'".format(type(self).__name__, name))
 
     def info(self, *args):
         self.logger.info(*args)
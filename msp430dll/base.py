@@ -27,12 +27,16 @@ __copyright__ = """
 """
 
 from collections import namedtuple
-from ctypes import addressof, byref, create_string_buffer, cast, c_char, c_char_p, c_int32, POINTER, Structure, Union
+from ctypes import addressof, Array, byref, create_string_buffer, cast, c_char, c_char_p, c_int32, POINTER, Structure, Union
 from ctypes.wintypes import BYTE, BOOL, WORD, LONG, ULONG
-from ctypes import WINFUNCTYPE
+try:
+    from ctypes import WINFUNCTYPE
+except ImportError:
+    from ctypes import CFUNCTYPE as WINFUNCTYPE  # libmsp430.so uses the C calling convention.
 
 import enum
 from msp430dll.api import API, STATUS_T
+from msp430dll.decoder import getDecoder
 from msp430dll.errors import ErrorType
 
 class _DeviceStructure(Structure):
@@ -81,13 +85,7 @@ class _DeviceStructure(Structure):
 
 
 def instanceiateNamedtuple(ntType, struc):
-    result = []
-    for field in ntType._fields:
-        value = getattr(struc, field)
-        if 'c_byte_Array' in str(type(value)):
-            value = cast(value, c_char_p).value
-        result.append(value)
-    return ntType(*result)
+    return getDecoder(type(struc), ntType).decode(struc)
 
 
 def makeNamedtupleFromStructure(name, struct):
@@ -99,6 +97,7 @@ def makeNamedtupleFromStructure(name, struct):
     return namedtuple(name, ' '.join(fields))
 
 DeviceStructureNT = makeNamedtupleFromStructure("DeviceStructureNT", _DeviceStructure)
+DeviceDecoder = getDecoder(_DeviceStructure, DeviceStructureNT)
 
 class Device(Union):
     _pack_ = 1
@@ -295,19 +294,39 @@ class BaseAPI(API):
             \n       USB_FET_BUSY_ERR
             \n           COMM_ERR
         """
+        if not isinstance(port, bytes):
+            port = port.encode("ascii")
         version = LONG()
         self.MSP430_Initialize(port, byref(version))
-        self.debug("MSP430_Initialize('{0}') - version returned: {1:#x}".format(port, version.value))
+        self.debug("MSP430_Initialize('%s') - version returned: %#x", port, version.value)
         return version.value
 
+    def setSystemNotifyCallback(self, callback):
+        """`callback(SystemEventMSPType)` is called from a thread of the DLL; None unregisters it."""
+        if callback is None:
+            thunk = SystemNotifyCallback()
+        else:
+            def thunk(event):
+                try:
+                    event = SystemEventMSPType(event)
+                except ValueError:
+                    pass
+                callback(event)
+            thunk = SystemNotifyCallback(thunk)
+        self._systemNotifyCallback = thunk   # Must outlive the registration.
+        self.MSP430_SET_SYSTEM_NOTIFY_CALLBACK(thunk)
+
+    def close(self, vccOff = False):
+        self.MSP430_Close(LONG(1 if vccOff else 0))
+
     def getVCC(self):
         voltage = LONG()
         self.MSP430_GetCurVCCT(byref(voltage))
-        self.debug("MSP430_GetCurVCCT() returned: {0:d}".format(voltage.value))
+        self.debug("MSP430_GetCurVCCT() returned: %d", voltage.value)
         return voltage.value #/ 1000.0
 
     def setVCC(self, voltage):
-        self.debug("MSP430_VCC({0:d})".format(voltage))
+        self.debug("MSP430_VCC(%d)", voltage)
         self.MSP430_VCC(voltage)
 
     def getExternalVoltage(self):
@@ -317,6 +336,10 @@ class BaseAPI(API):
         return (voltage.value, ErrorType(state.value))
 
     def openDevice(self, device = "DEVICE_UNKNOWN", password = "", deviceCode = 0, setId = 0):
+        if not isinstance(device, bytes):
+            device = device.encode("ascii")
+        if not isinstance(password, bytes):
+            password = password.encode("ascii")
         device = c_char_p(device)
         self.MSP430_OpenDevice(device, c_char_p(password), len(password), LONG(deviceCode), LONG(setId))
 
@@ -328,21 +351,36 @@ class BaseAPI(API):
     def getFoundDevice(self):
         device = create_string_buffer(256)
         self.MSP430_GetFoundDevice(device, LONG(256))
-        deviceStructure = cast(device, POINTER(_DeviceStructure))
-        content = deviceStructure.contents
-        return instanceiateNamedtuple(DeviceStructureNT, content)
+        return DeviceDecoder.decode(device)
+
+    def getDevice(self, localDeviceId):
+        """Descriptor of entry `localDeviceId` of the DLL's device list."""
+        device = create_string_buffer(256)
+        self.MSP430_Device(LONG(localDeviceId), device, LONG(256))
+        return DeviceDecoder.decode(device)
 
     def memory(self, address, buf, byteCount, rw):   # LONG address, CHAR* buffer, LONG count, LONG rw
         # ReadWrite
-        buf = create_string_buffer(byteCount)
+        if buf is None:
+            buf = create_string_buffer(byteCount)
         self.MSP430_Memory(address, buf, byteCount, rw)
         return buf
 
     def readMemory(self, address, buffer, byteCount):
         return self.memory(address, buffer, byteCount, ReadWriteType.READ)
 
-    def writeMemory(self, address, buffer, byteCount):
-        pass
+    def writeMemory(self, address, buffer, byteCount = None):
+        if byteCount is None:
+            byteCount = len(buffer)
+        if not isinstance(buffer, Array):
+            buffer = create_string_buffer(bytes(buffer), byteCount)
+        self.memory(address, buffer, byteCount, ReadWriteType.WRITE)
+
+    def erase(self, eraseType, address, length):
+        self.MSP430_Erase(eraseType, address, length)
+
+    def configure(self, mode, value):
+        self.MSP430_Configure(mode, value)
 
     def readOutFile(self, start, length, filename, filetype = FileType.FILETYPE_AUTO):
         self.MSP430_ReadOutFile(start, length, filename, filetype.value)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from msp430dll.errors import ErrorType, MSPError
+from msp430dll.utils import Future
+
+
+def overlaps(address, size, otherAddress, otherSize):
+    return address < otherAddress + otherSize and otherAddress < address + size
+
+
+class _Read(object):
+
+    def __init__(self, address, count):
+        self.address = address
+        self.count = count
+        self.future = Future()
+        self.pinned = False     # Overlaps an earlier write: must run after the writes.
+        self.early = False      # Overlaps a later write: must run before the writes.
+
+
+class _Write(object):
+
+    def __init__(self, address, data):
+        self.address = address
+        self.data = bytes(data)
+        self.count = len(self.data)
+        self.future = Future()
+
+
+class _Register(object):
+
+    def __init__(self, num, value):
+        self.num = num
+        self.value = value
+        self.future = Future()
+
+
+class _Call(object):
+    """Order sensitive operation (erase, configure)."""
+
+    def __init__(self, name, *args):
+        self.name = name
+        self.args = args
+        self.future = Future()
+
+
+class Step(object):
+    """One DLL call of the execution plan; `operations` are the queued operations it serves."""
+
+    def __init__(self, kind, args, operations):
+        self.kind = kind
+        self.args = args
+        self.operations = operations
+
+    def __repr__(self):
+        return "Step({0!r}, {1!r})".format(self.kind, self.args)
+
+
+class Batch(object):
+    """Collects operations and runs them in one optimised pass.
+
+    ::
+
+        with dll.batch() as b:
+            b.writeMemory(0x2400, data)
+            b.writeRegister(4, 0x1234)
+            value = b.readMemory(0x2400, 4)
+        value.result()
+
+    Every method returns a `msp430dll.utils.Future`. When the block is left,
+    the batch is planned and executed:
+
+    - erases and configures are barriers, their order is preserved,
+    - between barriers writes are merged into contiguous runs (later writes
+      replace earlier ones) and issued as one call per run,
+    - reads run after the writes, reads that overlap a later write before
+      them; reads closer than `mergeGap` bytes are merged into one call,
+    - register writes between two barriers are folded into one masked
+      `writeRegisters()` call, issued before the next barrier.
+
+    If the block raises, nothing is executed. If the DLL reports an error,
+    the remaining futures fail with it and it is re-raised.
+    """
+
+    def __init__(self, dll, mergeGap = 16):
+        self.dll = dll
+        self.mergeGap = mergeGap
+        self.operations = []
+        self.calls = 0
+
+    def readMemory(self, address, count):
+        return self._queue(_Read(address, count))
+
+    def writeMemory(self, address, data):
+        return self._queue(_Write(address, data))
+
+    def erase(self, eraseType, address, length):
+        return self._queue(_Call("erase", eraseType, address, length))
+
+    def configure(self, mode, value):
+        return self._queue(_Call("configure", mode, value))
+
+    def writeRegister(self, num, value):
+        return self._queue(_Register(num, value))
+
+    def _queue(self, operation):
+        self.operations.append(operation)
+        return operation.future
+
+    def plan(self):
+        """Return the list of `Step`s that `execute()` runs."""
+        steps = []
+        segment = []
+        for operation in self.operations:
+            if isinstance(operation, _Call):
+                steps.extend(self._planSegment(segment))
+                segment = []
+                steps.append(Step(operation.name, operation.args, [operation]))
+            elif isinstance(operation, _Register):
+                segment.append(operation)
+            elif isinstance(operation, _Read):
+                operation.pinned = any(isinstance(op, _Write) and self._overlaps(op, operation) for op in segment)
+                segment.append(operation)
+            else:
+                conflicting = [op for op in segment if isinstance(op, _Read) and self._overlaps(op, operation)]
+                if any(op.pinned for op in conflicting):
+                    steps.extend(self._planSegment(segment))
+                    segment = []
+                else:
+                    for op in conflicting:
+                        op.early = True
+                segment.append(operation)
+        steps.extend(self._planSegment(segment))
+        return steps
+
+    @staticmethod
+    def _overlaps(a, b):
+        return overlaps(a.address, a.count, b.address, b.count)
+
+    def _planSegment(self, segment):
+        reads = [op for op in segment if isinstance(op, _Read)]
+        writes = [op for op in segment if isinstance(op, _Write)]
+        registers = [op for op in segment if isinstance(op, _Register)]
+        steps = self._planReads([op for op in reads if op.early])
+        steps.extend(self._planWrites(writes))
+        steps.extend(self._planReads([op for op in reads if not op.early]))
+        if registers:
+            values = OrderedDict()
+            for register in registers:
+                values.pop(register.num, None)
+                values[register.num] = register.value
+            steps.append(Step("writeRegisters", (dict(values), ), registers))
+        return steps
+
+    def _planWrites(self, writes):
+        # Disjoint, non-adjacent runs sorted by address: `starts[i]`, `ends[i]` (exclusive) and `runs[i]` (the data).
+        starts, ends, runs = [], [], []
+        for write in writes:
+            if not write.count:
+                continue
+            start, end = write.address, write.address + write.count
+            lo = bisect_left(ends, start)       # First run ending at or after `start`...
+            hi = bisect_right(starts, end)      # ...up to the last one starting at or before `end`.
+            if lo < hi:
+                start, end = min(start, starts[lo]), max(end, ends[hi - 1])
+            data = bytearray(end - start)
+            for idx in range(lo, hi):
+                data[starts[idx] - start : ends[idx] - start] = runs[idx]
+            offset = write.address - start
+            data[offset : offset + write.count] = write.data
+            starts[lo : hi] = [start]
+            ends[lo : hi] = [end]
+            runs[lo : hi] = [data]
+        steps = [Step("writeMemory", (address, bytes(data)), []) for address, data in zip(starts, runs)]
+        if steps:
+            steps[-1].operations = writes
+        elif writes:
+            steps.append(Step("nothing", (), writes))   # Only empty writes.
+        return steps
+
+    def _planReads(self, reads):
+        steps = []
+        for read in sorted(reads, key = lambda r: r.address):
+            if steps:
+                address, count = steps[-1].args
+                if read.address <= address + count + self.mergeGap:
+                    steps[-1].args = (address, max(count, read.address + read.count - address))
+                    steps[-1].operations.append(read)
+                    continue
+            steps.append(Step("readMemory", (read.address, read.count), [read]))
+        return steps
+
+    def execute(self):
+        steps = self.plan()
+        try:
+            for step in steps:
+                self._run(step)
+        except MSPError as e:
+            self._fail(e)
+            raise
+        self.operations = []
+        return steps
+
+    def _run(self, step):
+        if step.kind == "readMemory":
+            address, count = step.args
+            data = self.dll.base.readMemory(address, None, count).raw
+            for read in step.operations:
+                start = read.address - address
+                read.future.setResult(data[start : start + read.count])
+        else:
+            result = None
+            if step.kind == "writeMemory":
+                self.dll.base.writeMemory(*step.args)
+            elif step.kind == "writeRegisters":
+                self.dll.debug.writeRegisters(*step.args)
+            elif step.kind != "nothing":
+                result = getattr(self.dll.base, step.kind)(*step.args)
+            for operation in step.operations:
+                operation.future.setResult(result)
+        if step.kind != "nothing":
+            self.calls += 1
+
+    def _fail(self, exception):
+        for operation in self.operations:
+            if not operation.future.done():
+                operation.future.setException(exception)
+        self.operations = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, tb):
+        if excType is None:
+            self.execute()
+        else:
+            self._fail(MSPError("Batch aborted: {0!r}".format(excValue), errno = ErrorType.INTERNAL_ERR))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import namedtuple
+import json
+import math
+
+BenchmarkResult = namedtuple("BenchmarkResult", "name runs min median p99 max")
+Regression = namedtuple("Regression", "name metric baseline current ratio")
+
+REGRESSION_METRICS = ("min", "median", "p99")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not values:
+        raise ValueError("percentile of empty sequence")
+    rank = int(math.ceil(pct / 100.0 * len(values))) - 1
+    return values[min(max(rank, 0), len(values) - 1)]
+
+
+def summarize(name, samples):
+    samples = sorted(samples)
+    return BenchmarkResult(name, len(samples), samples[0], percentile(samples, 50), percentile(samples, 99), samples[-1])
+
+
+def saveBaseline(filename, results):
+    with open(filename, "w") as outf:
+        json.dump(dict((r.name, r._asdict()) for r in results), outf, indent = 2, sort_keys = True)
+
+
+def loadBaseline(filename):
+    with open(filename) as inf:
+        return json.load(inf)
+
+
+def checkRegressions(results, baseline, threshold = 0.05, metrics = REGRESSION_METRICS):
+    """Compare `results` against a baseline (as returned by `loadBaseline`).
+
+    Every metric that got slower by more than `threshold` (a fraction) is
+    reported as a `Regression`; benchmarks missing from the baseline are ignored.
+    """
+    regressions = []
+    for result in results:
+        reference = baseline.get(result.name)
+        if not reference:
+            continue
+        for metric in metrics:
+            old = reference[metric]
+            new = getattr(result, metric)
+            if old and (new - old) / float(old) > threshold:
+                regressions.append(Regression(result.name, metric, old, new, new / float(old)))
+    return regressions
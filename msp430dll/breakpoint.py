@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from ctypes import addressof, memmove, sizeof, string_at
+
+from msp430dll.eem import BpMode, BpParameter, MAXTRIGGER
+from msp430dll.errors import ErrorType, MSPError
+
+
+def breakpointKey(parameter):
+    """Raw bytes of a `BpParameter`, used to compare breakpoint settings."""
+    return string_at(addressof(parameter), sizeof(parameter))
+
+
+def copyBreakpoint(parameter):
+    result = BpParameter()
+    memmove(addressof(result), addressof(parameter), sizeof(BpParameter))
+    return result
+
+
+class BreakpointManager(object):
+    """Host-side shadow of the EEM breakpoint resources.
+
+    Every `BpParameter` passed to the DLL is mirrored here, so `getBreakpoint`
+    never has to ask the target and `apply` only sends what actually changed.
+    Handles that become unused are recycled by modifying them in place
+    (one `MSP430_EEM_SetBreakpoint` call) instead of clearing them and
+    allocating a new one (two calls).
+
+    The number of breakpoints is limited to `maxBreakpoints`, by default the
+    hardware breakpoints of `device` (a `DeviceStructureNT`, see
+    `getFoundDevice()`) or `MAXTRIGGER` without one.
+    """
+
+    def __init__(self, eem, maxBreakpoints = None, device = None):
+        self.eem = eem
+        if maxBreakpoints is None:
+            maxBreakpoints = (device.nBreakpoints if device is not None else 0) or MAXTRIGGER
+        self.maxBreakpoints = maxBreakpoints
+        self._shadow = {}   # handle -> BpParameter
+        self._keys = {}     # handle -> breakpointKey(BpParameter)
+        self.dllCalls = 0
+
+    def __len__(self):
+        return len(self._shadow)
+
+    def __contains__(self, handle):
+        return handle in self._shadow
+
+    @property
+    def handles(self):
+        return sorted(self._shadow.keys())
+
+    def add(self, parameter):
+        """Set a new breakpoint and return its handle."""
+        if len(self._shadow) >= self.maxBreakpoints:
+            raise MSPError("No free breakpoint resources ({0} in use).".format(len(self._shadow)),
+                errno = ErrorType.RESOURCE_ERR)
+        return self._set(0, parameter)
+
+    def modify(self, handle, parameter):
+        """Change the settings of breakpoint `handle`; unchanged settings cost no DLL call."""
+        if handle not in self._shadow:
+            raise MSPError("Invalid breakpoint handle {0}.".format(handle), errno = ErrorType.PARAMETER_ERR)
+        if self._keys[handle] != breakpointKey(parameter):
+            self._set(handle, parameter)
+        return handle
+
+    def remove(self, handle):
+        if handle not in self._shadow:
+            raise MSPError("Invalid breakpoint handle {0}.".format(handle), errno = ErrorType.PARAMETER_ERR)
+        parameter = BpParameter()
+        parameter.bpMode = BpMode.BP_CLEAR
+        self.dllCalls += 1
+        self.eem.setBreakpoint(parameter, handle)
+        del self._shadow[handle]
+        del self._keys[handle]
+
+    def clear(self):
+        for handle in self.handles:
+            self.remove(handle)
+
+    def getBreakpoint(self, handle):
+        """Return a copy of the settings of breakpoint `handle`.
+
+        Breakpoints set by this manager are served from the shadow, others
+        are read from the DLL every time (they are not managed here).
+        """
+        if handle not in self._shadow:
+            self.dllCalls += 1
+            return self.eem.getBreakpoint(handle)
+        return copyBreakpoint(self._shadow[handle])
+
+    def apply(self, desired):
+        """Make the set of active breakpoints equal to `desired`.
+
+        `desired` is a sequence of `BpParameter`; a list of handles in the same
+        order is returned. Breakpoints already set keep their handles, stale
+        handles are reused for new settings, and only the remaining stale
+        handles are cleared.
+        """
+        desired = list(desired)
+        wanted = [breakpointKey(parameter) for parameter in desired]
+        if len(wanted) > self.maxBreakpoints:
+            raise MSPError("Too many breakpoints requested ({0}, maximum is {1}).".format(len(wanted), self.maxBreakpoints),
+                errno = ErrorType.RESOURCE_ERR)
+        byKey = {}
+        for handle in self.handles:
+            byKey.setdefault(self._keys[handle], []).append(handle)
+        result = [None] * len(desired)
+        pending = []
+        for idx, key in enumerate(wanted):
+            if byKey.get(key):
+                result[idx] = byKey[key].pop(0)
+            else:
+                pending.append(idx)
+        stale = [handle for handles in byKey.values() for handle in handles]
+        stale.sort()
+        for idx in pending:
+            if stale:
+                result[idx] = self._set(stale.pop(0), desired[idx])
+            else:
+                result[idx] = self._set(0, desired[idx])
+        for handle in stale:
+            self.remove(handle)
+        return result
+
+    def invalidate(self):
+        """Forget the shadow, e.g. after a device reset or re-open."""
+        self._shadow.clear()
+        self._keys.clear()
+
+    def _set(self, handle, parameter):
+        self.dllCalls += 1
+        newHandle = self.eem.setBreakpoint(parameter, handle) or handle
+        if handle and newHandle != handle:
+            del self._shadow[handle]
+            del self._keys[handle]
+        self._shadow[newHandle] = copyBreakpoint(parameter)
+        self._keys[newHandle] = breakpointKey(parameter)
+        return newHandle
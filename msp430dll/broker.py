@@ -0,0 +1,482 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import argparse
+import base64
+import json
+import os
+import socket
+import stat
+import threading
+import time
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+from msp430dll import DLL
+from msp430dll.errors import CONNECTION_ERRORS, ErrorType, MSPError
+from msp430dll.logger import Logger
+from msp430dll.utils import configDirectory, perf_counter
+
+#: Wrapper methods remote clients may call (here and in `msp430dll.rpc`). Not listed are the raw `MSP430_*`
+#: functions, methods managing the connection, writing files, securing the device or taking ctypes structures.
+REMOTE_METHODS = {
+    "base": frozenset(("getVCC", "getExternalVoltage", "getJTAGId", "getFoundDevice", "getDevice", "readMemory",
+        "writeMemory", "erase", "configure", "getNumberOfIFs", "getIF", "errorNumber")),
+    "debug": frozenset(("run", "getState", "readRegister", "writeRegister", "readRegisters", "writeRegisters",
+        "readRegistersExt")),
+    "eem": frozenset(("readTraceRecords", "refreshTraceBuffer", "setVariableWatch", "readSequencerState",
+        "setCycleCounterMode", "configureCycleCounter", "readCycleCounterValue", "writeCycleCounterValue",
+        "resetCycleCounter")),
+}
+
+
+def defaultSocketPath():
+    return os.path.join(configDirectory(), "broker.sock")
+
+
+def checkRemoteCall(api, method, args):
+    """Raise `MSPError` unless a remote client may call `api.method(*args)`, see `REMOTE_METHODS`."""
+    if method not in REMOTE_METHODS.get(api, ()):
+        raise MSPError("Method '{0}.{1}' is not available".format(api, method), errno = ErrorType.PARAMETER_ERR)
+    if method == "readMemory" and len(args) > 1 and args[1] is not None:
+        # The DLL would write into whatever the client sent.
+        raise MSPError("Remote readMemory() takes no buffer", errno = ErrorType.PARAMETER_ERR)
+
+
+def encodeValue(value):
+    """Make results of API methods JSON serializable; the inverse of `decodeValue`."""
+    if isinstance(value, bytes):
+        return {'$bytes': base64.b64encode(value).decode("ascii")}
+    elif hasattr(value, 'raw') and hasattr(value, '_length_'):   # ctypes char array.
+        return encodeValue(value.raw)
+    elif hasattr(value, '_asdict'):
+        return dict((k, encodeValue(v)) for k, v in value._asdict().items())
+    elif isinstance(value, dict):
+        return dict((k, encodeValue(v)) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        return [encodeValue(v) for v in value]
+    elif value is None or isinstance(value, (bool, float, str)):
+        return value
+    elif isinstance(value, int):
+        return int(value)
+    raise TypeError("Cannot transfer value of type '{0}'".format(type(value).__name__))
+
+
+def decodeValue(value):
+    if isinstance(value, dict):
+        if '$bytes' in value:
+            return base64.b64decode(value['$bytes'])
+        return dict((k, decodeValue(v)) for k, v in value.items())
+    elif isinstance(value, list):
+        return [decodeValue(v) for v in value]
+    return value
+
+
+class Session(object):
+    """One open device and its health record."""
+
+    def __init__(self, port, dll):
+        self.port = port
+        self.dll = dll
+        self.device = None
+        self.vcc = None
+        self.lease = None
+        self.opens = 0
+        self.calls = 0
+        self.errors = 0
+        self.consecutiveErrors = 0
+        self.lastError = None
+        self.failed = False
+        self.created = perf_counter()
+        self.lastUsed = self.created
+
+    @property
+    def isOpen(self):
+        return self.device is not None
+
+    def open(self, vcc = None):
+        base = self.dll.base
+        base.initialize(self.port)
+        if vcc is not None:
+            base.setVCC(vcc)
+        base.openDevice()
+        self.device = base.getFoundDevice()
+        self.vcc = vcc
+        self.failed = False
+        self.consecutiveErrors = 0
+        self.opens += 1
+
+    def close(self):
+        if self.device is not None:
+            self.device = None
+            try:
+                self.dll.base.close()
+            except MSPError:
+                pass
+
+    def call(self, api, method, args):
+        checkRemoteCall(api, method, args)
+        function = getattr(getattr(self.dll, api), method)
+        self.calls += 1
+        self.lastUsed = perf_counter()
+        try:
+            result = function(*args)
+        except MSPError as e:
+            self.errors += 1
+            self.consecutiveErrors += 1
+            self.lastError = str(e)
+            if getattr(e, 'errno', None) in CONNECTION_ERRORS:
+                self.failed = True
+            raise
+        self.consecutiveErrors = 0
+        return result
+
+    def health(self):
+        if self.failed:
+            state = "failed"
+        elif self.consecutiveErrors:
+            state = "degraded"
+        else:
+            state = "ok" if self.isOpen else "closed"
+        return dict(port = self.port, state = state, device = self.device.string.decode("latin-1") if self.device else None,
+            leased = self.lease is not None, opens = self.opens, calls = self.calls, errors = self.errors,
+            consecutiveErrors = self.consecutiveErrors, lastError = self.lastError,
+            idle = perf_counter() - self.lastUsed, uptime = perf_counter() - self.created)
+
+
+class Broker(object):
+    """Owns the DLL sessions and hands out exclusive leases.
+
+    Clients (see `BrokerClient`) lease an open device over a Unix socket and
+    call `BaseAPI`, `DebugAPI` and `EEMAPI` methods remotely; the device stays
+    initialized and open between leases, so short jobs skip `MSP430_Initialize`,
+    `MSP430_VCC`, `MSP430_OpenDevice` and identification. The protocol is one
+    JSON object per line in both directions::
+
+        {"op": "acquire", "port": "TIUSB", "vcc": 3300, "timeout": 10}
+        {"op": "call", "lease": 1, "api": "base", "method": "readMemory", "args": [512, null, 16]}
+        {"op": "release", "lease": 1}
+        {"op": "status"}
+
+    Sessions that are not leased for `idleTimeout` seconds are closed.
+    `factory(port)` returns the `DLL` for a port. The default loads `dllName`
+    from `dllPath` once for all ports -- the TI DLL drives a single FET per
+    process -- so leases of ports sharing a `DLL` are serialized: one of them
+    is leased at a time, and switching ports re-opens the device. Run one
+    broker per FET to use several FETs in parallel.
+    """
+
+    def __init__(self, dllPath = '.', dllName = 'msp430', idleTimeout = 600.0, factory = None):
+        self.factory = factory or (lambda port: DLL(dllPath, dllName))
+        self.idleTimeout = idleTimeout
+        self.sessions = {}
+        self.leases = {}
+        self.logger = Logger()
+        self._nextLease = 1
+        self._cond = threading.Condition()
+
+    def acquire(self, port = "TIUSB", vcc = None, timeout = None):
+        """Lease the session at `port`, opening the device if required; returns `(leaseId, session)`."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            session = self.sessions.get(port)
+            if session is None:
+                session = self.sessions[port] = Session(port, self.factory(port))
+            while self._inUse(session):
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise MSPError("Device at '{0}' is leased".format(port), errno = ErrorType.USB_FET_BUSY_ERR)
+                self._cond.wait(remaining)
+            leaseId = self._nextLease
+            self._nextLease += 1
+            session.lease = leaseId
+            self.leases[leaseId] = session
+            switched = [other for other in self.sessions.values()
+                if other is not session and other.dll is session.dll and other.isOpen]
+        try:
+            for other in switched:
+                other.close()
+            if switched or session.failed or not session.isOpen or (vcc is not None and vcc != session.vcc):
+                session.close()
+                session.open(vcc)
+        except Exception:
+            self.release(leaseId)
+            raise
+        session.lastUsed = perf_counter()
+        return leaseId, session
+
+    def _inUse(self, session):
+        """Whether `session`, or another session sharing its `DLL`, is leased."""
+        return any(other.lease is not None for other in self.sessions.values() if other.dll is session.dll)
+
+    def session(self, leaseId):
+        session = self.leases.get(leaseId)
+        if session is None:
+            raise MSPError("Unknown lease {0}".format(leaseId), errno = ErrorType.PARAMETER_ERR)
+        return session
+
+    def release(self, leaseId):
+        with self._cond:
+            session = self.leases.pop(leaseId, None)
+            if session is not None:
+                session.lease = None
+                session.lastUsed = perf_counter()
+                self._cond.notify_all()
+
+    def reapIdle(self):
+        """Close sessions that were not leased within `idleTimeout`; returns their ports."""
+        now = perf_counter()
+        closed = []
+        with self._cond:
+            for port, session in list(self.sessions.items()):
+                if not self._inUse(session) and now - session.lastUsed >= self.idleTimeout:
+                    session.close()
+                    del self.sessions[port]
+                    closed.append(port)
+        for port in closed:
+            self.logger.info("Closed idle session '%s'.", port)
+        return closed
+
+    def status(self):
+        with self._cond:
+            return [session.health() for session in self.sessions.values()]
+
+    def shutdown(self):
+        with self._cond:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+            self.leases.clear()
+
+    def handle(self, request, leases):
+        """Dispatch one decoded request; `leases` is the set owned by the connection."""
+        op = request.get('op')
+        if op == "acquire":
+            leaseId, session = self.acquire(request.get('port', "TIUSB"), request.get('vcc'), request.get('timeout'))
+            leases.add(leaseId)
+            return dict(lease = leaseId, device = encodeValue(session.device))
+        elif op == "call":
+            leaseId = self._owned(request.get('lease'), leases)
+            args = decodeValue(request.get('args', []))
+            return dict(result = encodeValue(self.session(leaseId).call(request['api'], request['method'], args)))
+        elif op == "release":
+            leaseId = self._owned(request.get('lease'), leases)
+            leases.discard(leaseId)
+            self.release(leaseId)
+            return {}
+        elif op == "status":
+            return dict(sessions = self.status())
+        raise MSPError("Unknown operation '{0}'".format(op), errno = ErrorType.PARAMETER_ERR)
+
+
+    @staticmethod
+    def _owned(leaseId, leases):
+        if leaseId not in leases:
+            raise MSPError("Lease {0} is not held by this client".format(leaseId), errno = ErrorType.PARAMETER_ERR)
+        return leaseId
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        broker = self.server.broker
+        leases = set()
+        try:
+            for line in self.rfile:
+                try:
+                    response = broker.handle(json.loads(line.decode("utf-8")), leases)
+                    response['ok'] = True
+                except MSPError as e:
+                    response = dict(ok = False, error = str(e), errno = int(getattr(e, 'errno', ErrorType.INTERNAL_ERR)))
+                except Exception as e:
+                    response = dict(ok = False, error = "{0}: {1}".format(type(e).__name__, e),
+                        errno = int(ErrorType.INTERNAL_ERR))
+                self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+                self.wfile.flush()
+        except socket.error:
+            pass
+        finally:
+            for leaseId in leases:
+                broker.release(leaseId)
+
+
+class BrokerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves a `Broker` on a Unix socket; a background thread reaps idle sessions."""
+
+    daemon_threads = True
+
+    def __init__(self, path, broker, reapInterval = 5.0):
+        self.removeStaleSocket(path)
+        socketserver.UnixStreamServer.__init__(self, path, _RequestHandler)
+        self.path = path
+        self.broker = broker
+        self.reapInterval = reapInterval
+        self._stopped = threading.Event()
+        self._reaper = threading.Thread(target = self._reap, name = "msp430-broker-reaper")
+        self._reaper.daemon = True
+        self._reaper.start()
+
+    @staticmethod
+    def removeStaleSocket(path):
+        """Remove the socket of a broker that is gone; refuse to touch anything else."""
+        try:
+            mode = os.stat(path).st_mode
+        except OSError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise MSPError("'{0}' exists and is not a socket".format(path), errno = ErrorType.PARAMETER_ERR)
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except socket.error:
+            os.unlink(path)
+        else:
+            raise MSPError("Another broker is listening on '{0}'".format(path), errno = ErrorType.USB_FET_BUSY_ERR)
+        finally:
+            probe.close()
+
+    def _reap(self):
+        while not self._stopped.wait(self.reapInterval):
+            self.broker.reapIdle()
+
+    def server_close(self):
+        self._stopped.set()
+        socketserver.UnixStreamServer.server_close(self)
+        self.broker.shutdown()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class _RemoteAPI(object):
+
+    def __init__(self, lease, api):
+        self._lease = lease
+        self._api = api
+
+    def __getattr__(self, method):
+        if method.startswith("_"):
+            raise AttributeError(method)
+        return lambda *args: self._lease.call(self._api, method, *args)
+
+
+class Lease(object):
+    """Client side of a lease: `lease.base.readMemory(...)` etc. are executed by the broker."""
+
+    def __init__(self, client, leaseId, device):
+        self.client = client
+        self.leaseId = leaseId
+        self.device = device
+        self.base = _RemoteAPI(self, "base")
+        self.debug = _RemoteAPI(self, "debug")
+        self.eem = _RemoteAPI(self, "eem")
+
+    def call(self, api, method, *args):
+        return self.client.request(op = "call", lease = self.leaseId, api = api, method = method,
+            args = encodeValue(list(args)))['result']
+
+    def release(self):
+        if self.leaseId is not None:
+            self.client.request(op = "release", lease = self.leaseId)
+            self.leaseId = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class BrokerClient(object):
+
+    def __init__(self, path = None, timeout = None):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        self.socket.connect(path or defaultSocketPath())
+        self._file = self.socket.makefile("rwb")
+        self._lock = threading.Lock()
+
+    def request(self, **request):
+        with self._lock:
+            self._file.write(json.dumps(request).encode("utf-8") + b"\n")
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            raise MSPError("Broker closed the connection", errno = ErrorType.COMM_ERR)
+        response = json.loads(line.decode("utf-8"))
+        if not response.pop('ok'):
+            errno = response['errno']
+            if errno in ErrorType.__members__.values():
+                errno = ErrorType(errno)
+            raise MSPError(response['error'], errno = errno)
+        return decodeValue(response)
+
+    def acquire(self, port = "TIUSB", vcc = None, timeout = None):
+        response = self.request(op = "acquire", port = port, vcc = vcc, timeout = timeout)
+        return Lease(self, response['lease'], response['device'])
+
+    def status(self):
+        return self.request(op = "status")['sessions']
+
+    def close(self):
+        self._file.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(args = None):
+    parser = argparse.ArgumentParser(description = "Keep MSP430 devices open and lease them to clients.")
+    parser.add_argument("dllPath", nargs = "?", default = ".", help = "path to the MSP430 DLL")
+    parser.add_argument("-n", "--dll-name", dest = "dllName", default = "msp430", help = "name of the DLL")
+    parser.add_argument("--socket", default = None, help = "path of the Unix socket")
+    parser.add_argument("--idle-timeout", dest = "idleTimeout", type = float, default = 600.0,
+        help = "close devices not leased for this many seconds")
+    parser.add_argument("--simulate", default = None, help = "use the simulated DLL for the given device")
+    options = parser.parse_args(args)
+    factory = None
+    if options.simulate:
+        from msp430dll.simulator import SimulatedLibrary
+        factory = lambda port: DLL(library = SimulatedLibrary(options.simulate))
+    broker = Broker(options.dllPath, options.dllName, options.idleTimeout, factory)
+    server = BrokerServer(options.socket or defaultSocketPath(), broker)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
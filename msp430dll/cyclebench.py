@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import time
+
+from msp430dll.benchstats import summarize
+from msp430dll.breakpoint import BreakpointManager
+from msp430dll.debug import RUN_MODES, STATE_MODES, DEVICE_REGISTERS
+from msp430dll.eem import BpMode, BpParameter
+from msp430dll.errors import ErrorType, MSPError
+from msp430dll.utils import perf_counter
+
+
+class CycleBenchmark(object):
+    """Measure firmware functions on the target with an EEM cycle counter.
+
+    Two measuring modes are supported:
+
+    - `measureCall`: the PC is set to the function entry and a return address,
+      guarded by a breakpoint, is pushed onto the target stack.
+    - `measureRange`: breakpoints at entry and exit; the firmware itself has
+      to execute the function repeatedly (e.g. from a test loop).
+    """
+
+    def __init__(self, dll, breakpoints = None, counter = 0, timeout = 5.0, pollInterval = 0.0005):
+        self.dll = dll
+        self.breakpoints = breakpoints if breakpoints is not None else BreakpointManager(dll.eem)
+        self.counter = counter
+        self.timeout = timeout
+        self.pollInterval = pollInterval
+
+    def measureCall(self, name, entry, returnAddress, stackPointer, runs = 100, registers = None):
+        """Call the function at `entry` `runs` times and return a `BenchmarkResult`.
+
+        `returnAddress` must be a location the function never touches (e.g. an
+        idle loop), `stackPointer` the SP value to start each call with.
+        `registers` optionally maps register numbers to argument values.
+        """
+        debug = self.dll.debug
+        base = self.dll.base
+        self.breakpoints.apply([self._codeBreakpoint(returnAddress)])
+        frame = bytearray([returnAddress & 0xff, (returnAddress >> 8) & 0xff])
+        samples = []
+        for _ in range(runs):
+            base.writeMemory(stackPointer - 2, frame, 2)
+            debug.writeRegister(DEVICE_REGISTERS.R1, stackPointer - 2)
+            for reg, value in (registers or {}).items():
+                debug.writeRegister(reg, value)
+            debug.writeRegister(DEVICE_REGISTERS.R0, entry)
+            samples.append(self._measure(returnAddress))
+        return summarize(name, samples)
+
+    def measureRange(self, name, entry, exit, runs = 100):
+        """Measure the cycles from `entry` to `exit` over `runs` passes of the firmware."""
+        self.breakpoints.apply([self._codeBreakpoint(entry), self._codeBreakpoint(exit)])
+        samples = []
+        for _ in range(runs):
+            self._runToBreakpoint(entry)
+            samples.append(self._measure(exit))
+        return summarize(name, samples)
+
+    def _measure(self, stopAddress):
+        eem = self.dll.eem
+        eem.resetCycleCounter(self.counter)
+        self._runToBreakpoint(stopAddress)
+        return eem.readCycleCounterValue(self.counter)
+
+    def _runToBreakpoint(self, address):
+        debug = self.dll.debug
+        debug.run(RUN_MODES.RUN_TO_BREAKPOINT, 0)
+        deadline = perf_counter() + self.timeout
+        while True:
+            state, _ = debug.getState(0)
+            if state in (STATE_MODES.BREAKPOINT_HIT, STATE_MODES.STOPPED):
+                break
+            if perf_counter() > deadline:
+                debug.getState(1)
+                raise MSPError("Breakpoint at 0x{0:04x} not reached within {1} s.".format(address, self.timeout),
+                    errno = ErrorType.RUN_ERR)
+            time.sleep(self.pollInterval)
+        pc = debug.readRegister(DEVICE_REGISTERS.R0)
+        if pc != address:
+            raise MSPError("Target stopped at 0x{0:04x}, expected 0x{1:04x}.".format(pc, address),
+                errno = ErrorType.RUN_ERR)
+
+    def _codeBreakpoint(self, address):
+        parameter = BpParameter()
+        parameter.bpMode = BpMode.BP_CODE
+        parameter.lAddrVal = address
+        return parameter
@@ -29,7 +29,10 @@ __copyright__ = """
 from collections import OrderedDict
 from ctypes import addressof, byref, create_string_buffer, cast, c_char, c_char_p, c_int32, c_void_p, POINTER, Union
 from ctypes.wintypes import BYTE, BOOL, WORD, DWORD, LONG, LPVOID
-from ctypes import WINFUNCTYPE
+try:
+    from ctypes import WINFUNCTYPE
+except ImportError:
+    from ctypes import CFUNCTYPE as WINFUNCTYPE  # libmsp430.so uses the C calling convention.
 
 import enum
 from msp430dll.api import API, STATUS_T
@@ -247,15 +250,34 @@ class DebugAPI(API):
     def readRegisters(self):
         treg = c_int32 * 16
         registers = treg()
-        regPointer = cast(registers, POINTER(c_int32))
-        self.MSP430_Registers(regPointer, ALL_REGS, ReadWriteType.READ)
+        self.MSP430_Registers(registers, ALL_REGS, ReadWriteType.READ)
         return OrderedDict(zip(DEVICE_REGISTERS.__members__, registers))
 
+    def writeRegisters(self, values, mask = None):
+        """Write several registers in one call.
+
+        `values` is a mapping of register numbers or names to values, or a
+        sequence of 16 values; only the registers in `mask` are written
+        (default: the keys of the mapping resp. all registers).
+        """
+        treg = c_int32 * 16
+        registers = treg()
+        if hasattr(values, 'items'):
+            bits = 0
+            for reg, value in values.items():
+                if not isinstance(reg, int):
+                    reg = DEVICE_REGISTERS[registerAlias(reg)]
+                registers[reg] = value
+                bits |= maskreg(reg)
+        else:
+            registers[ : ] = list(values)
+            bits = ALL_REGS
+        self.MSP430_Registers(registers, bits if mask is None else mask, ReadWriteType.WRITE)
+
     def readRegistersExt(self):
         treg = c_int32 * 16
         registers = treg()
-        regPointer = cast(registers, POINTER(c_int32))
-        self.MSP430_ExtRegisters(regPointer, ALL_REGS, 1, ReadWriteType.READ)
+        self.MSP430_ExtRegisters(registers, ALL_REGS, 1, ReadWriteType.READ)
         return OrderedDict(zip(DEVICE_REGISTERS.__members__, registers))
 
     def getClockNames(self, localDeviceId = 0):
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import namedtuple
+import ctypes
+import struct
+
+INTEGER_CODES = {1: 'b', 2: 'h', 4: 'i', 8: 'q'}
+STRING_TYPES = (ctypes.c_char, ctypes.c_byte)
+
+_decoders = {}
+
+
+def _typeCode(ctype):
+    code = getattr(ctype, '_type_', None)
+    if not isinstance(code, str):
+        raise TypeError("Unsupported field type '{0}'.".format(ctype.__name__))
+    if code in 'fd?c':
+        return code
+    size = ctypes.sizeof(ctype)
+    result = INTEGER_CODES[size]
+    if code in 'BHILQPzZ':
+        result = result.upper()
+    return result
+
+
+def _cstring(value):
+    return value.split(b'\0', 1)[0]
+
+
+def namedtupleFromStructure(name, structure):
+    return namedtuple(name, [field[0] for field in structure._fields_])
+
+
+class RecordDecoder(object):
+    """Decode a ctypes structure into a namedtuple with a single `struct.unpack_from`.
+
+    The `struct.Struct` format is derived from `_fields_` once (field offsets
+    and trailing padding are taken from ctypes, so `_pack_` is honoured):
+
+    - integer fields map to the little-endian code of the same size,
+    - `c_char`/`c_byte` arrays become byte strings, cut at the first NUL but
+      never read beyond the array bound,
+    - other arrays become tuples,
+    - fields listed in `_map` of a `StructureWithEnums` are converted likewise.
+    """
+
+    def __init__(self, structure, ntType = None):
+        self.structure = structure
+        self.ntType = ntType if ntType is not None else namedtupleFromStructure("{0}NT".format(structure.__name__), structure)
+        self.size = ctypes.sizeof(structure)
+        fmt = ['<']
+        steps = []      # (first, count, converter) per field.
+        position = 0
+        index = 0
+        simple = True
+        _map = getattr(structure, '_map', {})
+        for name, ftype in structure._fields_:
+            descriptor = getattr(structure, name)
+            offset = descriptor.offset
+            if offset > position:
+                fmt.append("{0}x".format(offset - position))
+            converter = None
+            if name in _map:
+                converter = _memberLookup(_map[name])
+            if issubclass(ftype, ctypes.Array):
+                if ftype._type_ in STRING_TYPES:
+                    fmt.append("{0}s".format(ftype._length_))
+                    steps.append((index, 1, _cstring))
+                    index += 1
+                else:
+                    fmt.append("{0}{1}".format(ftype._length_, _typeCode(ftype._type_)))
+                    steps.append((index, ftype._length_, converter))
+                    index += ftype._length_
+                simple = False
+            else:
+                fmt.append(_typeCode(ftype))
+                steps.append((index, None, converter))
+                index += 1
+                if converter is not None:
+                    simple = False
+            position = offset + ctypes.sizeof(ftype)
+        if self.size > position:
+            fmt.append("{0}x".format(self.size - position))
+        self.format = ''.join(fmt)
+        self.struct = struct.Struct(self.format)
+        if self.struct.size != self.size:
+            raise TypeError("Layout of '{0}' not representable ({1} != {2} bytes).".format(structure.__name__,
+                self.struct.size, self.size))
+        self._steps = steps
+        self._simple = simple
+        self._make = self.ntType._make
+
+    def decode(self, buffer, offset = 0):
+        values = self.struct.unpack_from(buffer, offset)
+        if self._simple:
+            return self._make(values)
+        return self._assemble(values)
+
+    def decodeMany(self, buffer, count, offset = 0):
+        """Decode `count` consecutive records, e.g. from a ctypes array of structures."""
+        unpack = self.struct.unpack_from
+        stop = offset + count * self.size
+        if self._simple:
+            make = self._make
+            return [make(unpack(buffer, pos)) for pos in range(offset, stop, self.size)]
+        assemble = self._assemble
+        return [assemble(unpack(buffer, pos)) for pos in range(offset, stop, self.size)]
+
+    def _assemble(self, values):
+        result = []
+        for first, count, converter in self._steps:
+            if count is None:
+                value = values[first]
+                result.append(converter(value) if converter else value)
+            elif converter is _cstring:
+                result.append(_cstring(values[first]))
+            else:
+                items = values[first : first + count]
+                if converter:
+                    items = [converter(item) for item in items]
+                result.append(tuple(items))
+        return self.ntType(*result)
+
+
+def _memberLookup(enumClass):
+    members = getattr(enumClass, '_value2member_map_', None)
+    if members is None:
+        return enumClass
+
+    def convert(value):
+        try:
+            return members[value]
+        except KeyError:
+            return enumClass(value)
+    return convert
+
+
+def getDecoder(structure, ntType = None):
+    """Return the (cached) `RecordDecoder` for `structure`."""
+    key = (structure, ntType)
+    try:
+        return _decoders[key]
+    except KeyError:
+        decoder = _decoders[key] = RecordDecoder(structure, ntType)
+        return decoder
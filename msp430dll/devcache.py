@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import os
+
+from msp430dll.base import DeviceStructureNT
+from msp430dll.errors import MSPError
+from msp430dll.logger import Logger
+from msp430dll.utils import configDirectory, loadJson, perf_counter, saveJson
+
+CACHE_VERSION = 1
+
+
+def deviceToDict(device):
+    result = device._asdict()
+    result['string'] = device.string.decode("latin-1")
+    return result
+
+
+def deviceFromDict(data):
+    values = dict(data)
+    values['string'] = values['string'].encode("latin-1")
+    return DeviceStructureNT(**values)
+
+
+class ConnectStats(object):
+    """Connect latencies with and without the cache."""
+
+    def __init__(self):
+        self.cached = []
+        self.detected = []
+        self.fallbacks = 0
+
+    def record(self, cached, elapsed):
+        (self.cached if cached else self.detected).append(elapsed)
+
+    @staticmethod
+    def _mean(values):
+        return sum(values) / len(values) if values else None
+
+    @property
+    def meanCached(self):
+        return self._mean(self.cached)
+
+    @property
+    def meanDetected(self):
+        return self._mean(self.detected)
+
+    @property
+    def savedPerConnect(self):
+        """Mean latency saved by a cache hit [s], None until both kinds of connects were seen."""
+        if not self.cached or not self.detected:
+            return None
+        return self.meanDetected - self.meanCached
+
+    def summary(self):
+        return dict(cachedConnects = len(self.cached), detectedConnects = len(self.detected), fallbacks = self.fallbacks,
+            meanCached = self.meanCached, meanDetected = self.meanDetected, savedPerConnect = self.savedPerConnect)
+
+
+class DeviceCache(object):
+    """Persistent device identification, keyed by FET interface and JTAG ID.
+
+    `openDevice` replaces the usual `openDevice("DEVICE_UNKNOWN")` +
+    `getFoundDevice()` sequence: on a cache hit the device is opened by its
+    exact name, which skips the DLL's identification; the descriptor is
+    checked against the one the DLL reports after opening. A JTAG ID only
+    names a device family, so entries which the DLL refuses to open or
+    which describe another part of the family are discarded and full
+    detection is run instead; so are entries of another format version.
+    """
+
+    def __init__(self, filename = None):
+        self.filename = filename or os.path.join(configDirectory(), "devices.json")
+        self.logger = Logger()
+        self.stats = ConnectStats()
+        self._entries = None
+
+    @staticmethod
+    def key(interface, jtagId):
+        return "{0}:{1:#04x}".format(interface, jtagId)
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            data = loadJson(self.filename, {})
+            if data.get('version') != CACHE_VERSION:
+                data = {}
+            self._entries = data.get('devices', {})
+        return self._entries
+
+    def lookup(self, interface, jtagId):
+        """Return `(name, DeviceStructureNT)` or None."""
+        entry = self.entries.get(self.key(interface, jtagId))
+        if entry is None:
+            return None
+        try:
+            device = deviceFromDict(entry['device'])
+        except (KeyError, TypeError, ValueError) as e:
+            self.logger.warn("Discarding invalid device cache entry '%s': %s", self.key(interface, jtagId), e)
+            self.invalidate(interface, jtagId)
+            return None
+        return (entry['name'], device)
+
+    def store(self, interface, jtagId, device, name = None):
+        if name is None:
+            name = device.string.decode("latin-1")
+        self.entries[self.key(interface, jtagId)] = dict(name = name, jtagId = jtagId, device = deviceToDict(device))
+        self.save()
+
+    def invalidate(self, interface, jtagId):
+        if self.entries.pop(self.key(interface, jtagId), None) is not None:
+            self.save()
+
+    def clear(self):
+        self._entries = {}
+        self.save()
+
+    def save(self):
+        saveJson(self.filename, dict(version = CACHE_VERSION, devices = self.entries))
+
+    def openDevice(self, base, interface):
+        """Open the device attached to an initialized `BaseAPI` and return its `DeviceStructureNT`."""
+        start = perf_counter()
+        jtagId = base.getJTAGId()
+        entry = self.lookup(interface, jtagId)
+        if entry is not None:
+            name, device = entry
+            try:
+                base.openDevice(name)
+                found = base.getFoundDevice()
+            except MSPError as e:
+                self.logger.warn("Opening cached device '%s' failed (%s), running full detection.", name, e)
+            else:
+                if (found.id, found.string) == (device.id, device.string):
+                    self.stats.record(True, perf_counter() - start)
+                    return found
+                self.logger.warn("Cached device '%s' does not match the attached device '%s', running full detection.",
+                    name, found.string.decode("latin-1"))
+            self.stats.fallbacks += 1
+            self.invalidate(interface, jtagId)
+        base.openDevice()
+        device = base.getFoundDevice()
+        self.store(interface, jtagId, device)
+        self.stats.record(False, perf_counter() - start)
+        return device
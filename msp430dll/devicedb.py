@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from bisect import bisect_right
+from collections import namedtuple
+import os
+import pkgutil
+
+from msp430dll.base import DeviceStructureNT
+from msp430dll.errors import MSPError
+from msp430dll.utils import configDirectory
+
+DeviceEntry = namedtuple("DeviceEntry", "name device mainSegmentSize infoSegmentSize")
+Region = namedtuple("Region", "name start end kind segmentSize")
+
+HEX_FIELDS = frozenset((
+    "endian", "mainStart", "infoStart", "ramEnd", "lcdStart", "lcdEnd", "ramStart", "ram2Start", "ram2End",
+    "infoEnd", "mainEnd", "bslStart", "bslEnd", "jtagId", "coreIpId", "deviceIdPtr",
+))
+
+COLUMNS = ["name"] + [f for f in DeviceStructureNT._fields if f != "string"] + ["mainSegmentSize", "infoSegmentSize"]
+
+
+def parseDatabase(text):
+    """Parse the CSV device table; lines starting with '#' are comments."""
+    entries = []
+    header = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        values = line.split(",")
+        if header is None:
+            header = values
+            continue
+        row = dict(zip(header, values))
+        name = row.pop("name")
+        numbers = dict((key, int(value, 0)) for key, value in row.items())
+        mainSegmentSize = numbers.pop("mainSegmentSize")
+        infoSegmentSize = numbers.pop("infoSegmentSize")
+        device = DeviceStructureNT(string = name.encode("ascii"), **numbers)
+        entries.append(DeviceEntry(name, device, mainSegmentSize, infoSegmentSize))
+    return entries
+
+
+def formatEntry(entry):
+    values = entry.device._asdict()
+    values.update(name = entry.name, mainSegmentSize = entry.mainSegmentSize, infoSegmentSize = entry.infoSegmentSize)
+    result = []
+    for column in COLUMNS:
+        value = values[column]
+        if column in HEX_FIELDS and value:
+            value = "{0:#x}".format(value)
+        result.append(str(value))
+    return ",".join(result)
+
+
+class MemoryMap(object):
+    """Memory regions of a device, sorted for O(log n) address lookup."""
+
+    def __init__(self, device, mainSegmentSize = 512, infoSegmentSize = 64):
+        flash = "fram" if device.hasFramMemory else "flash"
+        if device.hasFramMemory:
+            mainSegmentSize = infoSegmentSize = 0
+        candidates = (
+            ("RAM", device.ramStart, device.ramEnd, "ram", 0),
+            ("RAM2", device.ram2Start, device.ram2End, "ram", 0),
+            ("MAIN", device.mainStart, device.mainEnd, flash, mainSegmentSize),
+            ("INFO", device.infoStart, device.infoEnd, flash, infoSegmentSize),
+            ("BSL", device.bslStart, device.bslEnd, flash, mainSegmentSize),
+            ("LCD", device.lcdStart, device.lcdEnd, "peripheral", 0),
+        )
+        self.regions = sorted((Region(*r) for r in candidates if r[1] or r[2]), key = lambda r: r.start)
+        self._starts = [r.start for r in self.regions]
+
+    def regionOf(self, address):
+        """Return the `Region` containing `address`, or None."""
+        idx = bisect_right(self._starts, address) - 1
+        if idx >= 0:
+            region = self.regions[idx]
+            if address <= region.end:
+                return region
+        return None
+
+    def isFlash(self, address):
+        region = self.regionOf(address)
+        return region is not None and region.kind == "flash"
+
+    def segmentOf(self, address):
+        """Return `(start, size)` of the erase segment containing `address`, or None."""
+        region = self.regionOf(address)
+        if region is None or not region.segmentSize:
+            return None
+        offset = (address - region.start) % region.segmentSize
+        return (address - offset, region.segmentSize)
+
+    def nextBoundary(self, address):
+        """First address after `address` which lies in another region (or in no region at all), None if there is none."""
+        region = self.regionOf(address)
+        if region is not None:
+            return region.end + 1
+        idx = bisect_right(self._starts, address)
+        return self._starts[idx] if idx < len(self._starts) else None
+
+    def eraseSegments(self, address, length):
+        """Segments which have to be erased to program `length` bytes at `address`."""
+        result = []
+        position = address
+        end = address + length
+        while position < end:
+            segment = self.segmentOf(position)
+            if segment is None:
+                # RAM, FRAM, peripherals or a gap: nothing to erase up to the next region.
+                position = self.nextBoundary(position)
+                if position is None:
+                    break
+                continue
+            result.append(segment)
+            position = segment[0] + segment[1]
+        return result
+
+    def validate(self, address, length, writable = ("ram", "flash", "fram")):
+        """Return the list of `(start, end)` ranges not covered by a writable region."""
+        problems = []
+        position = address
+        end = address + length
+        while position < end:
+            region = self.regionOf(position)
+            boundary = self.nextBoundary(position)
+            stop = end if boundary is None else min(boundary, end)
+            if region is None or region.kind not in writable:
+                problems.append((position, stop - 1))
+            position = stop
+        return problems
+
+
+class DeviceDatabase(object):
+    """Offline device descriptors, loaded on first use.
+
+    The bundled table (`msp430dll/data/devices.csv`) is merged with an
+    optional user table `devices.csv` in `configDirectory()`; user entries
+    win. Lookups by name (case-insensitive) and by DLL device id are dict
+    based. DLL device ids are indices into the device list of a particular
+    DLL version, so only entries taken from a DLL (`importDll`, `add`) have
+    one; the bundled table covers common parts by name only.
+    """
+
+    def __init__(self, userFile = None):
+        self.userFile = userFile if userFile is not None else os.path.join(configDirectory(), "devices.csv")
+        self._byName = None
+        self._byId = None
+
+    def _load(self):
+        byName = {}
+        for entry in parseDatabase(pkgutil.get_data("msp430dll", "data/devices.csv").decode("ascii")):
+            byName[entry.name.upper()] = entry
+        if os.path.exists(self.userFile):
+            with open(self.userFile) as inf:
+                for entry in parseDatabase(inf.read()):
+                    byName[entry.name.upper()] = entry
+        self._byName = byName
+        self._byId = dict((e.device.id, e) for e in byName.values() if e.device.id)
+
+    @property
+    def byName(self):
+        if self._byName is None:
+            self._load()
+        return self._byName
+
+    @property
+    def byId(self):
+        if self._byId is None:
+            self._load()
+        return self._byId
+
+    def __len__(self):
+        return len(self.byName)
+
+    def __contains__(self, name):
+        return name.upper() in self.byName
+
+    def names(self):
+        return sorted(e.name for e in self.byName.values())
+
+    def lookup(self, name):
+        """Return the `DeviceEntry` for `name`, or None."""
+        if isinstance(name, bytes):
+            name = name.decode("ascii")
+        return self.byName.get(name.upper())
+
+    def lookupId(self, deviceId):
+        return self.byId.get(deviceId)
+
+    def device(self, name):
+        """Return the `DeviceStructureNT` for `name`; raises KeyError for unknown devices."""
+        entry = self.lookup(name)
+        if entry is None:
+            raise KeyError(name)
+        return entry.device
+
+    def memoryMap(self, name):
+        entry = self.lookup(name)
+        if entry is None:
+            raise KeyError(name)
+        return MemoryMap(entry.device, entry.mainSegmentSize, entry.infoSegmentSize)
+
+    def add(self, device, mainSegmentSize = 512, infoSegmentSize = 64, name = None, save = True):
+        """Add a device descriptor (e.g. from `getFoundDevice()`) to the user table."""
+        if name is None:
+            name = device.string.decode("ascii")
+        entry = DeviceEntry(name, device._replace(string = name.encode("ascii")), mainSegmentSize, infoSegmentSize)
+        self.byName[name.upper()] = entry
+        if device.id:
+            self.byId[device.id] = entry
+        if save:
+            self._saveUserEntry(entry)
+        return entry
+
+    def importDll(self, base, save = True):
+        """Add the complete device list of the DLL behind `base` (a `BaseAPI`), indexed by DLL device id.
+
+        Flash segment sizes are not part of the DLL's descriptors; they are
+        taken from an existing entry of the same name, or the defaults.
+        Returns the number of imported devices.
+        """
+        entries = []
+        while True:
+            index = len(entries)
+            try:
+                device = base.getDevice(index)
+            except MSPError:
+                break
+            device = device._replace(id = device.id or index)
+            name = device.string.decode("ascii")
+            known = self.lookup(name)
+            sizes = (known.mainSegmentSize, known.infoSegmentSize) if known is not None else (512, 64)
+            entries.append(self.add(device, sizes[0], sizes[1], name = name, save = False))
+        if save and entries:
+            self._saveUserEntries(entries)
+        return len(entries)
+
+    def _saveUserEntry(self, entry):
+        self._saveUserEntries([entry])
+
+    def _saveUserEntries(self, entries):
+        names = set(entry.name.upper() for entry in entries)
+        lines = []
+        if os.path.exists(self.userFile):
+            with open(self.userFile) as inf:
+                lines = [l.rstrip("\n") for l in inf if l.strip() and not l.startswith("#")]
+            lines = lines[1 : ]
+        lines = [l for l in lines if l.split(",", 1)[0].upper() not in names]
+        lines.extend(formatEntry(entry) for entry in entries)
+        directory = os.path.dirname(self.userFile)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(self.userFile, "w") as outf:
+            outf.write(",".join(COLUMNS) + "\n")
+            outf.write("\n".join(lines) + "\n")
+
+
+_database = None
+
+
+def database():
+    """The shared `DeviceDatabase` instance."""
+    global _database
+    if _database is None:
+        _database = DeviceDatabase()
+    return _database
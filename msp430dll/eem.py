@@ -30,11 +30,15 @@ from collections import OrderedDict
 from ctypes import addressof, byref, create_string_buffer, cast, c_char, c_char_p, c_int
 from ctypes import Array, c_int32, c_uint32, c_uint16, c_uint64, Structure, POINTER, Union
 from ctypes.wintypes import BYTE, BOOL, WORD, DWORD, LONG, LPVOID
-from ctypes import WINFUNCTYPE
+try:
+    from ctypes import WINFUNCTYPE
+except ImportError:
+    from ctypes import CFUNCTYPE as WINFUNCTYPE  # libmsp430.so uses the C calling convention.
 
 import enum
 from msp430dll.api import API, STATUS_T
 from msp430dll.base import ReadWriteType
+from msp430dll.decoder import getDecoder, namedtupleFromStructure
 from msp430dll.utils import StructureWithEnums
 
 
@@ -234,6 +238,9 @@ class TraceBuffer(StructureWithEnums):
         ("wTrBufCNTRL", c_uint16),  #: Trace buffer control signals.
     ]
 
+TraceBufferNT = namedtupleFromStructure("TraceBufferNT", TraceBuffer)
+TraceBufferDecoder = getDecoder(TraceBuffer, TraceBufferNT)
+
 
 class VwEnable(enum.IntEnum):
     """Variable watch: Enable.
@@ -286,6 +293,9 @@ class VwResources(StructureWithEnums):
         "vwDataType": VwDataType
     }
 
+VwResourcesNT = namedtupleFromStructure("VwResourcesNT", VwResources)
+VwResourcesDecoder = getDecoder(VwResources, VwResourcesNT)
+
 
 class CcControl(enum.IntEnum):
     """Clock control: Extended emulation.
@@ -493,12 +503,17 @@ class EMMAPI(API):
     )
 
     def init(self, callback, clientHandle, parameters):
+        if not isinstance(callback, Msp430EventnotifyFunc):
+            callback = Msp430EventnotifyFunc(callback)
+        # The DLL calls back from its polling thread, so the thunk must outlive this call.
+        self.eventCallback = callback
         pref = byref(parameters)
-        self.MSP430_EEM_Init(Msp430EventnotifyFunc(callback), clientHandle, pref)
+        self.MSP430_EEM_Init(callback, clientHandle, pref)
 
-    def setBreakpoint(self, parameter):
+    def setBreakpoint(self, parameter, handle = 0):
+        """Set a new breakpoint (`handle` == 0) or modify/clear an existing one."""
         pref = byref(parameter)
-        handle = c_uint16()
+        handle = c_uint16(handle)
         self.MSP430_EEM_SetBreakpoint(byref(handle), pref)
         return handle.value
 
@@ -537,6 +552,13 @@ class EMMAPI(API):
         self.MSP430_EEM_ReadTraceData(byref(buffer), byref(pulCount))
         return (buffer, pulCount)
 
+    def readTraceRecords(self, count = N_TRACE_POS):
+        """Read up to `count` trace entries with one DLL call; returns a list of `TraceBufferNT`."""
+        buffer = (TraceBuffer * count)()
+        pulCount = c_uint32(count)
+        self.MSP430_EEM_ReadTraceData(buffer, byref(pulCount))
+        return TraceBufferDecoder.decodeMany(buffer, min(pulCount.value, count))
+
     def refreshTraceBuffer(self):
         self.MSP430_EEM_RefreshTraceBuffer()
 
@@ -544,13 +566,17 @@ class EMMAPI(API):
         self.MSP430_EEM_SetVariableWatch(ena)
 
     def setVariable(self, handle, buffer):
+        """Set (`handle` == 0), modify or clear a watched variable; returns the handle."""
+        if not isinstance(handle, c_uint16):
+            handle = c_uint16(handle)
         self.MSP430_EEM_SetVariable(byref(handle), byref(buffer))
+        return handle.value
 
-    def getVariableWatch(self):
-        ena = VwEnable()
-        resource = VwResources()
-        self.MSP430_EEM_GetVariableWatch(byref(ena), byref(resource))
-        return (ena, resource)
+    def getVariableWatch(self, count = MAXTRIGGER):
+        ena = c_int()
+        resources = (VwResources * count)()
+        self.MSP430_EEM_GetVariableWatch(byref(ena), resources)
+        return (VwEnable(ena.value), VwResourcesDecoder.decodeMany(resources, count))
 
     def setClockControl(self, parameter):
         self.MSP430_EEM_SetClockControl(byref(parameter))
@@ -580,12 +606,12 @@ class EMMAPI(API):
         self.MSP430_EEM_ConfigureCycleCounter(counter, config)
 
     def readCycleCounterValue(self, counter):
-        value = c_uint64
+        value = c_uint64()
         self.MSP430_EEM_ReadCycleCounterValue(counter, byref(value))
-        return value
+        return value.value
 
     def writeCycleCounterValue(self, counter, value):
-        self.MSP430_EEM_WriteCycleCounterValue(counter, value)
+        self.MSP430_EEM_WriteCycleCounterValue(counter, c_uint64(value))
 
     def resetCycleCounter(self, counter):
         self.MSP430_EEM_ResetCycleCounter(counter)
@@ -38,6 +38,26 @@ class MSPError(Exception):
         super(Exception, self).__init__(*args)
 
 
+class DeadlineExceeded(MSPError):
+    """A DLL call did not return within its deadline, see `msp430dll.watchdog.Watchdog`."""
+
+    def __init__(self, functionName, timeout):
+        super(DeadlineExceeded, self).__init__("{0} did not return within {1:.3f} s.".format(functionName, timeout),
+            errno = ErrorType.COMM_ERR)
+        self.functionName = functionName
+        self.timeout = timeout
+
+
+class BoardQuarantined(MSPError):
+    """A DLL call was refused because the `msp430dll.watchdog.Watchdog` quarantined the board."""
+
+    def __init__(self, functionName, reason):
+        super(BoardQuarantined, self).__init__("{0} refused, the board is quarantined ({1}).".format(functionName, reason),
+            errno = ErrorType.USB_FET_BUSY_ERR)
+        self.functionName = functionName
+        self.reason = reason
+
+
 class ErrorType(enum.IntEnum):
     NO_ERR                          = 0
     INITIALIZE_ERR                  = 1
@@ -184,24 +204,13 @@ ERROR_MAP = {
     ErrorType.INVALID_ERR: "Invalid error number",
 }
 
-import unittest
-
-class TestErrorCodes(unittest.TestCase):
-
-    def testErrorCodeInEnum(self):
-        self.assertEquals(ErrorType['PRESERVE_RESTORE_ERR'], 12)
-
-    def testErrorCodeInNotEnum(self):
-        with self.assertRaises(KeyError):
-            value = ErrorType['FooBar']
-
-    def testErrorCodeInErrorMap(self):
-        self.assertEquals(ERROR_MAP[ErrorType.USB_FET_NOT_FOUND_ERR], 'Could not find MSP-FET430UIF on specified COM port')
-
-    def testErrorCodeInNotErrorMap(self):
-        with self.assertRaises(KeyError):
-            value = ERROR_MAP['FooBar']
-
-
-if __name__ == '__main__':
-    unittest.main()
+#: Errors after which the connection to FET or device has to be re-established.
+CONNECTION_ERRORS = frozenset((
+    ErrorType.INITIALIZE_ERR,
+    ErrorType.NO_DEVICE_ERR,
+    ErrorType.VCC_ERR,
+    ErrorType.COMM_ERR,
+    ErrorType.USB_FET_NOT_FOUND_ERR,
+    ErrorType.USB_FET_BUSY_ERR,
+    ErrorType.INTERNAL_ERR,
+))
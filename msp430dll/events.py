@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import deque, namedtuple
+import abc
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+import enum
+from msp430dll.eem import MessageIdType, MessageType, Msp430EventnotifyFunc
+from msp430dll.logger import Logger
+from msp430dll.utils import ABC
+
+Event = namedtuple("Event", "msgId wParam lParam clientHandle")
+
+
+class Backpressure(enum.IntEnum):
+    DROP_NEWEST = 0     #: Discard incoming events while the subscriber is full.
+    DROP_OLDEST = 1     #: Discard the oldest pending event to make room.
+
+
+def defaultMessageIds():
+    ids = MessageIdType()
+    ids.uiMsgIdSingleStep = MessageType.WMX_SINGLESTEP
+    ids.uiMsgIdBreakpoint = MessageType.WMX_BREKAPOINT
+    ids.uiMsgIdStorage = MessageType.WMX_STORAGE
+    ids.uiMsgIdState = MessageType.WMX_STATE
+    ids.uiMsgIdWarning = MessageType.WMX_WARNING
+    ids.uiMsgIdCPUStopped = MessageType.WMX_STOPPED
+    return ids
+
+
+class Subscription(ABC):
+
+    def __init__(self, bus, messageTypes):
+        self.bus = bus
+        self.messageTypes = frozenset(messageTypes) if messageTypes else None
+        self.delivered = 0
+        self.dropped = 0
+
+    def accepts(self, event):
+        return self.messageTypes is None or event.msgId in self.messageTypes
+
+    @abc.abstractmethod
+    def offer(self, event):
+        """Called from the dispatcher thread for every accepted event, must not block."""
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class CallbackSubscription(Subscription):
+    """Calls `callback(event)` from a worker thread of its own, so a slow consumer only delays itself."""
+
+    def __init__(self, bus, callback, messageTypes, maxPending, policy):
+        super(CallbackSubscription, self).__init__(bus, messageTypes)
+        self.callback = callback
+        self.maxPending = maxPending
+        self.policy = policy
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target = self._worker, name = "msp430-event-subscriber")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def offer(self, event):
+        with self._cond:
+            if len(self._pending) >= self.maxPending:
+                self.dropped += 1
+                if self.policy == Backpressure.DROP_NEWEST:
+                    return
+                self._pending.popleft()
+            self._pending.append(event)
+            self._cond.notify()
+
+    def close(self):
+        super(CallbackSubscription, self).close()
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                event = self._pending.popleft()
+            try:
+                self.callback(event)
+            except Exception as e:
+                self.bus.logger.error("Event subscriber raised: %r", e)
+            self.delivered += 1
+
+
+class QueueSubscription(Subscription):
+    """Puts events into a `queue.Queue` (or anything with `put_nowait`); a full queue drops the event."""
+
+    def __init__(self, bus, queue_, messageTypes):
+        super(QueueSubscription, self).__init__(bus, messageTypes)
+        self.queue = queue_
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+        else:
+            self.delivered += 1
+
+
+class FutureSubscription(Subscription):
+    """One-shot: resolves an asyncio future with the next matching event."""
+
+    def __init__(self, bus, loop, messageTypes):
+        super(FutureSubscription, self).__init__(bus, messageTypes)
+        self.loop = loop
+        self.future = loop.create_future()
+
+    def offer(self, event):
+        self.bus.unsubscribe(self)
+        self.loop.call_soon_threadsafe(self._resolve, event)
+        self.delivered += 1
+
+    def _resolve(self, event):
+        if not self.future.done():
+            self.future.set_result(event)
+
+
+class EventBus(object):
+    """Fan-out of EEM events to any number of subscribers.
+
+    The callback handed to the DLL does nothing but append the raw
+    arguments to a deque (an atomic operation) and wake the dispatcher, so
+    the DLL's polling thread is never held up by Python consumers. The
+    dispatcher thread converts and distributes the events; every subscriber
+    has its own buffer and counts the events it had to drop.
+    """
+
+    def __init__(self):
+        self.logger = Logger()
+        self._ingress = deque()
+        self._wakeup = threading.Event()
+        self._dropped = 0
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+        self.received = 0
+        # Referenced for the whole lifetime of the bus, the DLL keeps calling it.
+        self.thunk = Msp430EventnotifyFunc(self._enqueue)
+
+    def _enqueue(self, msgId, wParam, lParam, clientHandle):
+        self._ingress.append((msgId, wParam, lParam, clientHandle))
+        self._wakeup.set()
+
+    def attach(self, eem, clientHandle = 0, messageIds = None):
+        """Register the bus as event callback of an `EMMAPI` (i.e. call `MSP430_EEM_Init`)."""
+        eem.init(self.thunk, clientHandle, messageIds if messageIds is not None else defaultMessageIds())
+
+    def subscribe(self, callback, messageTypes = None, maxPending = 256, policy = Backpressure.DROP_NEWEST):
+        return self._add(CallbackSubscription(self, callback, messageTypes, maxPending, policy))
+
+    def subscribeQueue(self, queue_, messageTypes = None):
+        return self._add(QueueSubscription(self, queue_, messageTypes))
+
+    def nextEvent(self, messageTypes = None, loop = None):
+        """Return an asyncio future which is resolved with the next matching event."""
+        import asyncio
+
+        if loop is None:
+            loop = asyncio.get_running_loop()
+        return self._add(FutureSubscription(self, loop, messageTypes)).future
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers = [s for s in self._subscribers if s is not subscription]
+                self._dropped += subscription.dropped
+
+    @property
+    def subscribers(self):
+        return list(self._subscribers)
+
+    @property
+    def dropped(self):
+        """Events dropped by all subscribers, including the ones already gone."""
+        with self._lock:
+            return self._dropped + sum(s.dropped for s in self._subscribers)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target = self._dispatcher, name = "msp430-event-dispatcher")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.dispatchPending()
+
+    def dispatchPending(self):
+        """Distribute all queued events in the calling thread; returns the number of events."""
+        count = 0
+        popleft = self._ingress.popleft
+        while True:
+            try:
+                raw = popleft()
+            except IndexError:
+                break
+            self._dispatch(raw)
+            count += 1
+        return count
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscribers = self._subscribers + [subscription]
+        return subscription
+
+    def _dispatch(self, raw):
+        msgId, wParam, lParam, clientHandle = raw
+        try:
+            msgId = MessageType(msgId)
+        except ValueError:
+            pass
+        event = Event(msgId, wParam, lParam, clientHandle)
+        self.received += 1
+        for subscription in self._subscribers:
+            if subscription.accepts(event):
+                try:
+                    subscription.offer(event)
+                except Exception as e:
+                    self.logger.error("Event subscription raised: %r", e)
+
+    def _dispatcher(self):
+        while self._running:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self.dispatchPending()
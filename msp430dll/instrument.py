@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from bisect import bisect_left
+import json
+
+from msp430dll.utils import perf_counter
+
+MIN_BOUND = 1e-6        # 1us
+BUCKET_FACTOR = 2.0
+BUCKET_COUNT = 24       # 1us .. ~8s
+
+READ = 1                # ReadWriteType.READ, see `base.py`.
+
+
+def bucketBounds(minBound = MIN_BOUND, factor = BUCKET_FACTOR, count = BUCKET_COUNT):
+    return tuple(minBound * factor ** idx for idx in range(count))
+
+
+class Histogram(object):
+    """Latency histogram with log-spaced buckets; memory use does not depend on the number of samples."""
+
+    def __init__(self, bounds = None):
+        self.bounds = bounds if bounds is not None else bucketBounds()
+        self.counts = [0] * (len(self.bounds) + 1)    # Last bucket is +Inf.
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Upper bound of the bucket containing the `q`-quantile (0 < q <= 1)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        total = 0
+        for idx, count in enumerate(self.counts):
+            total += count
+            if total >= rank:
+                return self.bounds[idx] if idx < len(self.bounds) else self.max
+        return self.max
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def cumulative(self):
+        """`(upperBound, count)` pairs as used by Prometheus, the last bound is `float('inf')`."""
+        result = []
+        total = 0
+        for bound, count in zip(self.bounds + (float('inf'), ), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def toDict(self):
+        return dict(count = self.count, sum = self.sum, min = self.min, max = self.max,
+            p50 = self.quantile(0.5), p99 = self.quantile(0.99), bounds = list(self.bounds), counts = list(self.counts))
+
+
+class FunctionStats(object):
+
+    def __init__(self, name, bounds = None):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.bytesRead = 0
+        self.bytesWritten = 0
+        self.timeouts = 0       # See `msp430dll.watchdog.Watchdog`.
+        self.latency = Histogram(bounds)
+
+    def toDict(self):
+        return dict(calls = self.calls, errors = self.errors, bytesRead = self.bytesRead,
+            bytesWritten = self.bytesWritten, timeouts = self.timeouts, latency = self.latency.toDict())
+
+
+class Instrumentation(object):
+    """Opt-in call statistics for the bound `MSP430_*` functions.
+
+    `install(dll)` replaces the functions bound so far with timing wrappers
+    (functions bound later are wrapped by `functionFactory`),
+    `uninstall()` puts the raw ctypes functions back -- so there is no
+    overhead at all while instrumentation is off.
+    """
+
+    def __init__(self, bounds = None):
+        self.bounds = bounds if bounds is not None else bucketBounds()
+        self.functions = {}
+        self.dll = None
+
+    def stats(self, functionName):
+        try:
+            return self.functions[functionName]
+        except KeyError:
+            result = self.functions[functionName] = FunctionStats(functionName, self.bounds)
+            return result
+
+    def wrap(self, functionName, func):
+        stats = self.stats(functionName)
+        histogram = stats.latency
+
+        if functionName == "MSP430_Memory":
+            def wrapper(address, buf, count, rw):
+                start = perf_counter()
+                try:
+                    result = func(address, buf, count, rw)
+                except Exception:
+                    stats.errors += 1
+                    raise
+                finally:
+                    histogram.record(perf_counter() - start)
+                    stats.calls += 1
+                # Failed transfers moved nothing.
+                if rw == READ:
+                    stats.bytesRead += count
+                else:
+                    stats.bytesWritten += count
+                return result
+        else:
+            def wrapper(*args):
+                start = perf_counter()
+                try:
+                    return func(*args)
+                except Exception:
+                    stats.errors += 1
+                    raise
+                finally:
+                    histogram.record(perf_counter() - start)
+                    stats.calls += 1
+        wrapper.__name__ = functionName
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    def install(self, dll):
+        if self.dll is not None:
+            raise RuntimeError("Instrumentation is already installed.")
+        self.dll = dll
+        dll.instrumentation = self
+        for api in self._apis():
+            for functionName in api.functionTable():
+                func = api.__dict__.get(functionName)
+                if func is not None:
+                    setattr(api, functionName, self.wrap(functionName, func))
+        return self
+
+    def uninstall(self):
+        if self.dll is None:
+            return
+        for api in self._apis():
+            for functionName in api.functionTable():
+                func = api.__dict__.get(functionName)
+                if func is not None and hasattr(func, '__wrapped__'):
+                    setattr(api, functionName, func.__wrapped__)
+        self.dll.instrumentation = None
+        self.dll = None
+
+    def _apis(self):
+        return [api for api in (self.dll.__dict__.get(name) for name in ('base', 'debug', 'eem')) if api is not None]
+
+    def reset(self):
+        for stats in self.functions.values():
+            stats.__init__(stats.name, self.bounds)
+
+    def snapshot(self):
+        return dict((name, stats.toDict()) for name, stats in self.functions.items() if stats.calls or stats.timeouts)
+
+    def toJson(self, **kws):
+        return json.dumps(self.snapshot(), sort_keys = True, **kws)
+
+    def toPrometheus(self, prefix = "msp430_dll"):
+        """Snapshot in the Prometheus text exposition format."""
+        active = sorted((name, stats) for name, stats in self.functions.items() if stats.calls or stats.timeouts)
+        lines = []
+
+        def header(name, kind, text):
+            lines.append("# HELP {0}_{1} {2}".format(prefix, name, text))
+            lines.append("# TYPE {0}_{1} {2}".format(prefix, name, kind))
+
+        header("calls_total", "counter", "Number of DLL function calls.")
+        for name, stats in active:
+            lines.append('{0}_calls_total{{function="{1}"}} {2}'.format(prefix, name, stats.calls))
+        header("errors_total", "counter", "Number of DLL function calls which raised an error.")
+        for name, stats in active:
+            lines.append('{0}_errors_total{{function="{1}"}} {2}'.format(prefix, name, stats.errors))
+        header("bytes_total", "counter", "Bytes transferred by MSP430_Memory.")
+        for name, stats in active:
+            if stats.bytesRead or stats.bytesWritten:
+                lines.append('{0}_bytes_total{{function="{1}",direction="read"}} {2}'.format(prefix, name, stats.bytesRead))
+                lines.append('{0}_bytes_total{{function="{1}",direction="write"}} {2}'.format(prefix, name,
+                    stats.bytesWritten))
+        if any(stats.timeouts for _, stats in active):
+            header("timeouts_total", "counter", "Number of DLL function calls which exceeded their deadline.")
+            for name, stats in active:
+                lines.append('{0}_timeouts_total{{function="{1}"}} {2}'.format(prefix, name, stats.timeouts))
+        header("call_seconds", "histogram", "Latency of DLL function calls.")
+        for name, stats in active:
+            for bound, count in stats.latency.cumulative():
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append('{0}_call_seconds_bucket{{function="{1}",le="{2}"}} {3}'.format(prefix, name, le, count))
+            lines.append('{0}_call_seconds_sum{{function="{1}"}} {2!r}'.format(prefix, name, stats.latency.sum))
+            lines.append('{0}_call_seconds_count{{function="{1}"}} {2}'.format(prefix, name, stats.latency.count))
+        return "\n".join(lines) + "\n"
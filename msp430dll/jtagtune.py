@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import os
+
+from msp430dll.base import ConfigModeType, InterfaceType
+from msp430dll.errors import MSPError
+from msp430dll.logger import Logger
+from msp430dll.utils import configDirectory, loadJson, perf_counter, saveJson
+
+CACHE_VERSION = 1
+
+DEFAULT_SPEEDS = (0, 1, 2, 3)   # Values tried for `ConfigModeType.JTAG_SPEED`.
+DEFAULT_INTERFACES = (InterfaceType.JTAG_IF, InterfaceType.SPYBIWIRE_IF)
+DEFAULT_VCC = 3000              # mV, set by the FET on every reconnect.
+
+
+def readbackPatterns(size, rounds = 1):
+    """Write/readback patterns: all zeros/ones, alternating bits, walking one, address dependent."""
+    size &= ~1
+    result = []
+    for _ in range(rounds):
+        result.append(b"\x00" * size)
+        result.append(b"\xff" * size)
+        result.append(b"\x55\xaa" * (size // 2))
+        result.append(b"\xaa\x55" * (size // 2))
+        result.append(bytes(bytearray((1 << (idx % 8)) for idx in range(size))))
+        result.append(bytes(bytearray((idx * 7 + (idx >> 8)) & 0xff for idx in range(size))))
+    return result
+
+
+def applySetting(base, interface, speed):
+    """Configure protocol and speed; must be called between `initialize()` and `openDevice()`."""
+    if interface is not None:
+        base.configure(ConfigModeType.INTERFACE_MODE, int(interface))
+    if speed is not None:
+        base.configure(ConfigModeType.JTAG_SPEED, int(speed))
+
+
+class Trial(object):
+    """Outcome of the write/readback test of one interface/speed combination."""
+
+    def __init__(self, interface, speed):
+        self.interface = interface
+        self.speed = speed
+        self.transfers = 0
+        self.errors = 0
+        self.bytes = 0
+        self.elapsed = 0.0
+        self.failure = None
+
+    @property
+    def throughput(self):
+        """Bytes per second (written and read back)."""
+        return self.bytes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def errorRate(self):
+        if self.failure is not None or not self.transfers:
+            return 1.0
+        return self.errors / float(self.transfers)
+
+    def toDict(self):
+        return dict(interface = InterfaceType(self.interface).name, speed = self.speed, throughput = self.throughput,
+            errorRate = self.errorRate, failure = self.failure)
+
+    def __repr__(self):
+        return "Trial({0}, speed = {1}, {2:.0f} B/s, error rate {3:.3f})".format(InterfaceType(self.interface).name,
+            self.speed, self.throughput, self.errorRate)
+
+
+class JtagTuner(object):
+    """Find the fastest reliable JTAG protocol and speed for the target at `port`.
+
+    Every combination of `interfaces` and `speeds` is tried by reconnecting
+    (`close()`, `initialize()`, `applySetting()`, `setVCC(vcc)`, `openDevice()`)
+    and running write/readback patterns against RAM; pass `vcc = None` for
+    externally powered targets. The RAM contents are saved before
+    and restored afterwards. `timer` can be replaced, e.g. by the virtual
+    clock of a simulated library.
+    """
+
+    def __init__(self, base, port, device, speeds = DEFAULT_SPEEDS, interfaces = DEFAULT_INTERFACES,
+            blockSize = 256, rounds = 2, maxErrorRate = 0.0, vcc = DEFAULT_VCC, timer = perf_counter):
+        self.base = base
+        self.port = port
+        self.device = device
+        self.vcc = vcc
+        self.speeds = speeds
+        self.interfaces = interfaces
+        self.address = device.ramStart
+        self.blockSize = min(blockSize, device.ramEnd - device.ramStart + 1)
+        self.rounds = rounds
+        self.maxErrorRate = maxErrorRate
+        self.timer = timer
+        self.logger = Logger()
+
+    def connect(self, interface = None, speed = None):
+        self.base.close()
+        self.base.initialize(self.port)
+        applySetting(self.base, interface, speed)
+        if self.vcc is not None:
+            self.base.setVCC(self.vcc)
+        self.base.openDevice(self.device.string)
+
+    def trial(self, interface, speed):
+        result = Trial(interface, speed)
+        try:
+            self.connect(interface, speed)
+        except MSPError as e:
+            result.failure = str(e)
+            return result
+        for pattern in readbackPatterns(self.blockSize, self.rounds):
+            start = self.timer()
+            try:
+                self.base.writeMemory(self.address, pattern)
+                data = self.base.readMemory(self.address, None, len(pattern)).raw
+            except MSPError:
+                data = None
+            result.elapsed += self.timer() - start
+            result.transfers += 1
+            result.bytes += 2 * len(pattern)
+            if data != pattern:
+                result.errors += 1
+        return result
+
+    def select(self, trials):
+        """The trial with the highest throughput within `maxErrorRate`, or None."""
+        reliable = [t for t in trials if t.failure is None and t.errorRate <= self.maxErrorRate]
+        return max(reliable, key = lambda t: t.throughput) if reliable else None
+
+    def run(self):
+        """Return `(best, trials)`; the target is left connected with the best setting (or the defaults)."""
+        original = self.base.readMemory(self.address, None, self.blockSize).raw
+        trials = []
+        try:
+            for interface in self.interfaces:
+                for speed in self.speeds:
+                    trial = self.trial(interface, speed)
+                    self.logger.debug("%r", trial)
+                    trials.append(trial)
+            best = self.select(trials)
+            if best is None:
+                self.logger.warn("No reliable JTAG setting found, using the defaults.")
+                self.connect()
+            else:
+                self.connect(best.interface, best.speed)
+        finally:
+            self.restore(original)
+        return best, trials
+
+    def restore(self, original):
+        """Write the saved RAM back, reconnecting with the default setting if the current connection is broken."""
+        try:
+            self.base.writeMemory(self.address, original)
+        except MSPError as e:
+            self.logger.warn("Restoring RAM failed (%s), reconnecting with the defaults.", e)
+            self.connect()
+            self.base.writeMemory(self.address, original)
+
+
+class TuningCache(object):
+    """Persistent JTAG settings, keyed by FET interface and JTAG ID (like `msp430dll.devcache.DeviceCache`).
+
+    The JTAG ID can be read right after `initialize()`, so `apply()` is able
+    to configure the cached setting before the device is opened.
+    """
+
+    def __init__(self, filename = None):
+        self.filename = filename or os.path.join(configDirectory(), "jtagtune.json")
+        self.logger = Logger()
+        self._entries = None
+
+    @staticmethod
+    def key(interface, jtagId):
+        return "{0}:{1:#04x}".format(interface, jtagId)
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            data = loadJson(self.filename, {})
+            if data.get('version') != CACHE_VERSION:
+                data = {}
+            self._entries = data.get('settings', {})
+        return self._entries
+
+    def lookup(self, interface, jtagId):
+        """Return `(InterfaceType, speed)` or None."""
+        entry = self.entries.get(self.key(interface, jtagId))
+        if entry is None:
+            return None
+        try:
+            return (InterfaceType[entry['interface']], int(entry['speed']))
+        except (KeyError, TypeError, ValueError) as e:
+            self.logger.warn("Discarding invalid JTAG tuning entry '%s': %s", self.key(interface, jtagId), e)
+            self.invalidate(interface, jtagId)
+            return None
+
+    def store(self, interface, jtagId, trial):
+        self.entries[self.key(interface, jtagId)] = trial.toDict()
+        self.save()
+
+    def invalidate(self, interface, jtagId):
+        if self.entries.pop(self.key(interface, jtagId), None) is not None:
+            self.save()
+
+    def clear(self):
+        self._entries = {}
+        self.save()
+
+    def save(self):
+        saveJson(self.filename, dict(version = CACHE_VERSION, settings = self.entries))
+
+    def apply(self, base, interface):
+        """Configure the cached setting on an initialized `BaseAPI`; returns it or None."""
+        setting = self.lookup(interface, base.getJTAGId())
+        if setting is not None:
+            applySetting(base, *setting)
+        return setting
+
+    def tune(self, base, interface, device, **kws):
+        """Run a `JtagTuner` on an open device and store the result; returns the best `Trial` or None."""
+        jtagId = base.getJTAGId()
+        best, _ = JtagTuner(base, interface, device, **kws).run()
+        if best is None:
+            self.invalidate(interface, jtagId)
+        else:
+            self.store(interface, jtagId, best)
+        return best
@@ -27,48 +27,101 @@ __copyright__ = """
 """
 
 
+from collections import deque
 import logging
+import sys
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last `capacity` records in memory, e.g. for a post-mortem dump."""
+
+    def __init__(self, capacity = 256, level = logging.NOTSET):
+        super(RingBufferHandler, self).__init__(level)
+        self.buffer = deque(maxlen = capacity)
+
+    def emit(self, record):
+        self.buffer.append(record)
+
+    def records(self):
+        return list(self.buffer)
+
+    def clear(self):
+        self.buffer.clear()
+
+    def dump(self, stream = None):
+        """Write the buffered records (formatted) to `stream` (default: stderr)."""
+        stream = stream if stream is not None else sys.stderr
+        formatter = self.formatter or logging.Formatter(Logger.FORMAT)
+        for record in self.records():
+            stream.write(formatter.format(record) + "\n")
+
 
 class Logger(object):
+    """Thin wrapper around the shared 'msp430' logger.
+
+    All instances share one logger and one stream handler (installed by the
+    first instance). Messages may carry %-style arguments, which are only
+    formatted if a handler actually gets the record.
+    """
 
     LOGGER_BASE_NAME = 'msp430'
     FORMAT = "[%(levelname)s (%(name)s)]: %(message)s"
 
+    _handler = None
+    _ringBuffer = None
+
     def __init__(self, level = logging.WARN):
         self.logger = logging.getLogger("{0}".format(self.LOGGER_BASE_NAME))
-        self.logger.setLevel(level)
-        handler = logging.StreamHandler()
-        handler.setLevel(level)
-        formatter = logging.Formatter(self.FORMAT)
-        handler.setFormatter(formatter)
-        self.logger.addHandler(handler)
+        if Logger._handler is None:
+            self.logger.setLevel(level)
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter(self.FORMAT))
+            self.logger.addHandler(handler)
+            Logger._handler = handler
         self.lastMessage = None
         self.lastSeverity = None
+        self._lastArgs = ()
 
     def getLastError(self):
-        result = (self.lastSeverity, self.lastMessage)
+        """Last message of severity WARN or above since the previous call."""
+        message = self.lastMessage
+        if message is not None and self._lastArgs:
+            message = message % self._lastArgs
+        result = (self.lastSeverity, message)
         self.lastSeverity = self.lastMessage = None
+        self._lastArgs = ()
         return result
 
-    def log(self, message, level):
-        self.lastSeverity = level
-        self.lastMessage = message
-        self.logger.log(level, "{0}".format(message))
+    def isEnabledFor(self, level):
+        return self.logger.isEnabledFor(level)
+
+    def log(self, message, level, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        if level >= logging.WARN:
+            self.lastSeverity = level
+            self.lastMessage = message
+            self._lastArgs = args
+        self.logger.log(level, message, *args)
 
-    def info(self, message):
-        self.log(message, logging.INFO)
+    def info(self, message, *args):
+        if self.logger.isEnabledFor(logging.INFO):
+            self.log(message, logging.INFO, *args)
 
-    def warn(self, message):
-        self.log(message, logging.WARN)
+    def warn(self, message, *args):
+        if self.logger.isEnabledFor(logging.WARN):
+            self.log(message, logging.WARN, *args)
 
-    def error(self, message):
-        self.log(message, logging.ERROR)
+    def error(self, message, *args):
+        if self.logger.isEnabledFor(logging.ERROR):
+            self.log(message, logging.ERROR, *args)
 
-    def debug(self, message):
-        self.log(message, logging.DEBUG)
+    def debug(self, message, *args):
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.log(message, logging.DEBUG, *args)
 
-    def critical(self, message):
-        self.log(message, logging.CRITICAL)
+    def critical(self, message, *args):
+        self.log(message, logging.CRITICAL, *args)
 
     def verbose(self):
         self.logger.setLevel(logging.DEBUG)
@@ -88,3 +141,21 @@ class Logger(object):
             level = LEVEL_MAP.get(level.upper(), logging.WARN)
         self.logger.setLevel(level)
 
+    @classmethod
+    def enableRingBuffer(cls, capacity = 256):
+        """Keep the last `capacity` records passing the logger level in memory; returns the `RingBufferHandler`."""
+        if cls._ringBuffer is None:
+            cls._ringBuffer = RingBufferHandler(capacity)
+            logging.getLogger(cls.LOGGER_BASE_NAME).addHandler(cls._ringBuffer)
+        return cls._ringBuffer
+
+    @classmethod
+    def disableRingBuffer(cls):
+        if cls._ringBuffer is not None:
+            logging.getLogger(cls.LOGGER_BASE_NAME).removeHandler(cls._ringBuffer)
+            cls._ringBuffer = None
+
+    @classmethod
+    def dumpRecent(cls, stream = None):
+        if cls._ringBuffer is not None:
+            cls._ringBuffer.dump(stream)
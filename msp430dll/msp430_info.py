@@ -28,13 +28,15 @@ __copyright__ = """
 
 from optparse import OptionParser
 from pprint import pprint
+import json
+import multiprocessing
 import re
 import sys
 
 from msp430dll import DLL
 from msp430dll.base import SystemNotifyCallback, ArchType
 from msp430dll.debug import DebugAPI, RUN_MODES, REGISTER_ALIAS_INV
-from msp430dll.utils import cygpathToWin
+from msp430dll.utils import cygpathToWin, perf_counter
 from msp430dll.errors import ErrorType
 
 def myCallback(*params):
@@ -59,6 +61,9 @@ def yesNo(value):
 def beautifyEnumerator(value):
     """
     """
+    name = getattr(value, "name", None)
+    if name is not None:
+        return name
     return re.sub(r"([^.]*\.)(.*)", r"\2", str(value))
 
 def externalVoltage(voltage, status):
@@ -164,10 +169,95 @@ def displayInfo(pathToDll, dllName, port = 'TIUSB'):
     dll.base.MSP430_Close(0)
 
 
+def openDll(pathToDll, dllName, simulate = None):
+    if simulate:
+        from msp430dll.simulator import SimulatedLibrary
+        return DLL(library = SimulatedLibrary(simulate))
+    return DLL(pathToDll, dllName)
+
+def enumerateInterfaces(dll):
+    """List `(name, status)` of all USB interfaces (FETs) known to the DLL."""
+    result = []
+    for idx in range(dll.base.getNumberOfIFs()):
+        name, status = dll.base.getIF(idx)
+        result.append((name.decode("latin-1"), beautifyEnumerator(status)))
+    return result
+
+def collectInfo(dll, port):
+    """Connect to the target at `port` and return everything `displayInfo` shows as a dictionary."""
+    start = perf_counter()
+    version = dll.base.initialize(port)
+    opened = False
+    try:
+        dll.base.openDevice()
+        opened = True
+        connectTime = perf_counter() - start
+        device = dll.base.getFoundDevice()
+        info = device._asdict()
+        info['string'] = device.string.decode("latin-1")
+        voltage, status = dll.base.getExternalVoltage()
+        registers = dll.debug.readRegisters()
+        return {
+            'port': port,
+            'dllVersion': version,
+            'connectTime': connectTime,
+            'device': info,
+            'architecture': beautifyEnumerator(ArchType(device.cpuArch)),
+            'vcc': dll.base.getVCC(),
+            'externalVoltage': voltage if status == ErrorType.NO_ERR else None,
+            'externalVoltageStatus': beautifyEnumerator(status),
+            'registers': dict((REGISTER_ALIAS_INV.get(name, name), value) for name, value in registers.items()),
+        }
+    finally:
+        try:
+            if opened:
+                dll.debug.run(RUN_MODES.FREE_RUN, 1)    # Release the target, like `displayInfo`.
+        finally:
+            dll.base.MSP430_Close(0)
+
+def inventoryTarget(task):
+    """Worker: identify one target; `task` is `(pathToDll, dllName, port, simulate)`.
+
+    Runs in its own process, so every FET gets a private instance of the DLL.
+    Errors are reported in the result instead of being raised.
+    """
+    pathToDll, dllName, port, simulate = task
+    try:
+        return collectInfo(openDll(pathToDll, dllName, simulate), port)
+    except Exception as e:
+        return {'port': port, 'error': "{0}: {1}".format(type(e).__name__, e)}
+
+def inventory(pathToDll, dllName, ports = None, processes = None, simulate = None):
+    """Identify all targets concurrently, one worker process per interface.
+
+    Without `ports` the interfaces are enumerated by the DLL. `processes` = 0
+    runs everything in the calling process.
+    """
+    start = perf_counter()
+    interfaces = enumerateInterfaces(openDll(pathToDll, dllName, simulate))
+    if ports is None:
+        ports = [name for name, _ in interfaces]
+    tasks = [(pathToDll, dllName, port, simulate) for port in ports]
+    if processes == 0 or len(tasks) < 2:
+        targets = [inventoryTarget(task) for task in tasks]
+    else:
+        pool = multiprocessing.Pool(min(processes or len(tasks), len(tasks)))
+        try:
+            targets = pool.map(inventoryTarget, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    return {
+        'interfaces': [{'name': name, 'status': status} for name, status in interfaces],
+        'targets': targets,
+        'elapsed': perf_counter() - start,
+    }
+
+
 
 """
 1. The interface is initialized: MSP430_Initialize()
-2. The device Vcc is set: MSP430_GetExtVoltage(), MSP430_VCC() MSP430_GetCurVCCT()
+2. The device Vcc is set: MSP430_GetExtVoltage(), MSP430_VCC() MSP430_GetCurVCCT()
 3. Configuring the JTAG protocol (Spy-bi-Wire 2-Wire JTAG, 4-wire JTAG) is optional. By default the protocol is selected automatic: MSP430_Configure()
 4. The device is identified: MSP430_OpenDevice()
 5. Return the identified device: MSP430_GetFoundDevice
@@ -206,13 +296,35 @@ def main():
 
     op = OptionParser(usage = usage,version = "%prog " + __version__, description = "Display informations about connected MSP430 controllers.")
     op.add_option('-n', '--dll-name', help = "Name of DLL", dest = "dllName", type = str, default = "msp430")
+    op.add_option('-a', '--all', help = "Identify the targets on all interfaces in parallel", dest = "all",
+        action = "store_true", default = False)
+    op.add_option('-j', '--json', help = "Print a JSON document", dest = "json", action = "store_true", default = False)
+    op.add_option('-p', '--port', help = "Interface to use", dest = "port", type = str, default = "TIUSB")
+    op.add_option('--processes', help = "Number of worker processes (0: no workers)", dest = "processes",
+        type = int, default = None)
+    op.add_option('--simulate', help = "Use the simulated DLL for the given device", dest = "simulate",
+        type = str, default = None)
 
     (options, args) = op.parse_args()
     if len(args) >= 1:
         pathToDll = args[0]
     else:
         pathToDll = "."
-    displayInfo(cygpathToWin(pathToDll), options.dllName)
+    pathToDll = cygpathToWin(pathToDll)
+    if options.all or options.json:
+        ports = None if options.all else [options.port]
+        result = inventory(pathToDll, options.dllName, ports, options.processes, options.simulate)
+        if options.json:
+            print(json.dumps(result, indent = 2, sort_keys = True))
+        else:
+            for target in result['targets']:
+                if 'error' in target:
+                    print("{0:<10}: {1}".format(target['port'], target['error']))
+                else:
+                    print("{0:<10}: {1} ({2:.1f} ms)".format(target['port'], target['device']['string'],
+                        target['connectTime'] * 1000.0))
+    else:
+        displayInfo(pathToDll, options.dllName, options.port)
 
 if __name__ == '__main__':
     main()
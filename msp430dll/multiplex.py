@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import deque, namedtuple
+import select
+import socket
+
+from msp430dll.base import SystemEventMSPType
+from msp430dll.eem import MessageIdType, MessageType, Msp430EventnotifyFunc
+from msp430dll.events import defaultMessageIds, Event
+from msp430dll.instrument import Histogram
+from msp430dll.logger import Logger
+from msp430dll.utils import perf_counter
+
+EEM_EVENT = "eem"
+SYSTEM_EVENT = "system"
+
+#: `event` is an `msp430dll.events.Event` (EEM) or a `SystemEventMSPType`; `timestamp` is the `perf_counter()`
+#: value taken in the DLL callback.
+MuxEvent = namedtuple("MuxEvent", "session kind event timestamp")
+
+#: Installed by `unregister()` in place of a session's EEM callback; there is no `MSP430_EEM_Init` counterpart.
+_ignoreEemEvents = Msp430EventnotifyFunc(lambda msgId, wParam, lParam, clientHandle: None)
+
+
+class EventMultiplexer(object):
+    """Collects EEM and system notify callbacks of many `DLL` instances in one place.
+
+    `register(session, dll)` installs callbacks that only append the raw
+    arguments (tagged with `session`) to a shared deque and wake up the
+    multiplexer through a socket pair. `fileno()` is readable while events
+    are pending, so the multiplexer fits into `select`/`selectors`/asyncio
+    loops; `poll()` returns the pending events and `dispatch()` passes them
+    to a handler. Latencies from the DLL callback to delivery resp. to the
+    end of the handler are recorded in `deliveryLatency` and
+    `handlingLatency`.
+    """
+
+    def __init__(self, bounds = None):
+        self.logger = Logger()
+        self.deliveryLatency = Histogram(bounds)
+        self.handlingLatency = Histogram(bounds)
+        self.received = {}
+        self._sessions = {}
+        self._ingress = deque()
+        self._signalled = False
+        self._receiver, self._sender = socket.socketpair()
+        self._receiver.setblocking(False)
+        self._sender.setblocking(False)
+
+    def fileno(self):
+        return self._receiver.fileno()
+
+    @property
+    def sessions(self):
+        return list(self._sessions)
+
+    def _wakeup(self):
+        if not self._signalled:
+            self._signalled = True
+            try:
+                self._sender.send(b"\0")
+            except socket.error:
+                pass    # Buffer full: the receiver is awake anyway.
+
+    def _callbacks(self, session):
+        ingress = self._ingress
+
+        def eemCallback(msgId, wParam, lParam, clientHandle):
+            ingress.append((session, EEM_EVENT, (msgId, wParam, lParam, clientHandle), perf_counter()))
+            self._wakeup()
+
+        def systemCallback(event):
+            ingress.append((session, SYSTEM_EVENT, event, perf_counter()))
+            self._wakeup()
+        return Msp430EventnotifyFunc(eemCallback), systemCallback
+
+    def register(self, session, dll, eem = True, system = True, clientHandle = 0, messageIds = None):
+        """Route the EEM (`MSP430_EEM_Init`) and/or system notify callbacks of `dll` here, tagged with `session`."""
+        if session in self._sessions:
+            raise KeyError("Session '{0}' is already registered".format(session))
+        eemThunk, systemCallback = self._callbacks(session)
+        if eem:
+            dll.eem.init(eemThunk, clientHandle, messageIds if messageIds is not None else defaultMessageIds())
+        if system:
+            dll.base.setSystemNotifyCallback(systemCallback)
+        self._sessions[session] = (dll, eemThunk, eem, system)
+        self.received[session] = 0
+
+    def unregister(self, session):
+        """Stop receiving events of `session`; its EEM callback is replaced by one without any messages enabled."""
+        dll, _, eem, system = self._sessions.pop(session)
+        if eem:
+            dll.eem.init(_ignoreEemEvents, 0, MessageIdType())
+        if system:
+            dll.base.setSystemNotifyCallback(None)
+
+    def _convert(self, raw):
+        session, kind, event, timestamp = raw
+        if kind == EEM_EVENT:
+            msgId, wParam, lParam, clientHandle = event
+            try:
+                msgId = MessageType(msgId)
+            except ValueError:
+                pass
+            event = Event(msgId, wParam, lParam, clientHandle)
+        else:
+            try:
+                event = SystemEventMSPType(event)
+            except ValueError:
+                pass
+        return MuxEvent(session, kind, event, timestamp)
+
+    def poll(self, timeout = 0.0):
+        """Wait up to `timeout` seconds (None: forever) for events and return all pending ones."""
+        if not self._ingress and timeout != 0.0:
+            select.select([self._receiver], [], [], timeout)
+        try:
+            while self._receiver.recv(4096):
+                pass
+        except socket.error:
+            pass
+        # Only now: a callback racing with the drain either sees the flag still set (and its event is picked
+        # up below) or sends a fresh wake-up byte which stays in the socket.
+        self._signalled = False
+        result = []
+        popleft = self._ingress.popleft
+        now = perf_counter()
+        while True:
+            try:
+                raw = popleft()
+            except IndexError:
+                break
+            if raw[0] not in self._sessions:
+                continue
+            event = self._convert(raw)
+            self.received[event.session] += 1
+            self.deliveryLatency.record(now - event.timestamp)
+            result.append(event)
+        return result
+
+    def dispatch(self, handler, timeout = 0.0):
+        """Call `handler(event)` for the pending events; returns their number."""
+        events = self.poll(timeout)
+        for event in events:
+            try:
+                handler(event)
+            except Exception as e:
+                self.logger.error("Event handler raised: %r", e)
+            self.handlingLatency.record(perf_counter() - event.timestamp)
+        return len(events)
+
+    def close(self):
+        for session in list(self._sessions):
+            self.unregister(session)
+        self._receiver.close()
+        self._sender.close()
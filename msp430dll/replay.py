@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import namedtuple
+import ctypes
+import struct
+import threading
+import time
+import zlib
+
+from msp430dll.errors import ErrorType, MSPError
+from msp430dll.utils import perf_counter
+
+MAGIC = b"MSP430RL"
+FORMAT_VERSION = 1
+
+# Record kinds.
+NAME = 0
+MISSING = 1
+CALL = 2
+
+HEADER = struct.Struct("<8sH")
+NAME_RECORD = struct.Struct("<BHH")         # kind, index, length of name
+CALL_RECORD = struct.Struct("<BHBdd")       # kind, function index, number of arguments, start, duration
+INTEGER = struct.Struct("<q")
+FLOAT = struct.Struct("<d")
+LENGTH = struct.Struct("<I")
+MEMORY = struct.Struct("<IB")               # size, changed
+
+Call = namedtuple("Call", "name args result start duration")
+Memory = namedtuple("Memory", "before after")
+Opaque = namedtuple("Opaque", "typeName")
+
+_CArgObject = type(ctypes.byref(ctypes.c_int()))
+_SimpleCData = ctypes.c_int.__mro__[1]
+
+
+def memoryOf(arg):
+    """`(address, size)` of the memory an argument lets the DLL write to, or None."""
+    if isinstance(arg, _CArgObject):
+        arg = arg._obj
+    if isinstance(arg, ctypes._Pointer):
+        address = ctypes.cast(arg, ctypes.c_void_p).value
+        if not address:
+            return None
+        return (address, ctypes.sizeof(arg._type_))
+    if isinstance(arg, (ctypes.Array, ctypes.Structure, ctypes.Union, _SimpleCData)):
+        return (ctypes.addressof(arg), ctypes.sizeof(arg))
+    return None
+
+
+def _isCType(restype):
+    return isinstance(restype, type) and issubclass(restype, (_SimpleCData, ctypes._Pointer))
+
+
+def applyRestype(restype, result, keepAlive):
+    """Convert a raw result like ctypes would; byte strings become `char` pointers kept alive in `keepAlive`."""
+    if restype is None:
+        return None
+    if isinstance(restype, type) and issubclass(restype, ctypes._Pointer):
+        if result is None:
+            return restype()
+        buf = ctypes.create_string_buffer(result)
+        keepAlive.append(buf)
+        return ctypes.cast(buf, restype)
+    if not _isCType(restype):
+        return restype(result)
+    return result
+
+
+def _encodeValue(value, out):
+    if value is None:
+        out.append(b'N')
+    elif isinstance(value, bool) or isinstance(value, int) or type(value).__name__ == 'long':
+        out.append(b'I')
+        out.append(INTEGER.pack(int(value)))
+    elif isinstance(value, float):
+        out.append(b'F')
+        out.append(FLOAT.pack(value))
+    elif isinstance(value, bytes):
+        out.append(b'S')
+        out.append(LENGTH.pack(len(value)))
+        out.append(value)
+    elif isinstance(value, Memory):
+        changed = value.after is not None
+        out.append(b'M')
+        out.append(MEMORY.pack(len(value.before), changed))
+        out.append(value.before)
+        if changed:
+            out.append(value.after)
+    else:
+        name = type(value).__name__.encode("ascii")
+        out.append(b'O')
+        out.append(LENGTH.pack(len(name)))
+        out.append(name)
+
+
+def _decodeValue(data, offset):
+    tag = data[offset : offset + 1]
+    offset += 1
+    if tag == b'N':
+        return None, offset
+    elif tag == b'I':
+        return INTEGER.unpack_from(data, offset)[0], offset + INTEGER.size
+    elif tag == b'F':
+        return FLOAT.unpack_from(data, offset)[0], offset + FLOAT.size
+    elif tag in (b'S', b'O'):
+        length = LENGTH.unpack_from(data, offset)[0]
+        offset += LENGTH.size
+        value = bytes(data[offset : offset + length])
+        return (value if tag == b'S' else Opaque(value.decode("ascii"))), offset + length
+    elif tag == b'M':
+        size, changed = MEMORY.unpack_from(data, offset)
+        offset += MEMORY.size
+        before = bytes(data[offset : offset + size])
+        offset += size
+        after = None
+        if changed:
+            after = bytes(data[offset : offset + size])
+            offset += size
+        return Memory(before, after), offset
+    raise MSPError("Corrupt replay log (tag {0!r} at offset {1}).".format(tag, offset - 1),
+        errno = ErrorType.FILE_DATA_ERR)
+
+
+def _loggedValue(arg):
+    if isinstance(arg, ctypes._CFuncPtr):
+        return Opaque(type(arg).__name__)
+    return arg
+
+
+def readLog(filename):
+    """Return the list of `Call`s and the set of missing functions of a log written by `RecordingLibrary`."""
+    with open(filename, "rb") as inf:
+        header = inf.read(HEADER.size)
+        payload = inf.read()
+    magic, version = HEADER.unpack(header)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise MSPError("'{0}' is not a replay log of version {1}.".format(filename, FORMAT_VERSION),
+            errno = ErrorType.FILE_DETECT_ERR)
+    data = zlib.decompress(payload)
+    names = {}
+    missing = set()
+    calls = []
+    offset = 0
+    while offset < len(data):
+        kind = ord(data[offset : offset + 1])
+        if kind in (NAME, MISSING):
+            _, index, length = NAME_RECORD.unpack_from(data, offset)
+            offset += NAME_RECORD.size
+            name = data[offset : offset + length].decode("ascii")
+            offset += length
+            if kind == NAME:
+                names[index] = name
+            else:
+                missing.add(name)
+        elif kind == CALL:
+            _, index, nargs, start, duration = CALL_RECORD.unpack_from(data, offset)
+            offset += CALL_RECORD.size
+            args = []
+            for _ in range(nargs):
+                value, offset = _decodeValue(data, offset)
+                args.append(value)
+            result, offset = _decodeValue(data, offset)
+            calls.append(Call(names[index], tuple(args), result, start, duration))
+        else:
+            raise MSPError("Corrupt replay log (record kind {0}).".format(kind), errno = ErrorType.FILE_DATA_ERR)
+    return calls, missing
+
+
+class RecordingFunction(object):
+    """Stands in for a ctypes function: calls the real one and logs the call."""
+
+    def __init__(self, library, name, func):
+        self._library = library
+        self._func = func
+        self.__name__ = name
+        self._restype = ctypes.c_int
+        func.restype = ctypes.c_int
+
+    @property
+    def argtypes(self):
+        return self._func.argtypes
+
+    @argtypes.setter
+    def argtypes(self, value):
+        self._func.argtypes = value
+
+    @property
+    def restype(self):
+        return self._restype
+
+    @restype.setter
+    def restype(self, value):
+        # Callables (i.e. `API.returnValue`) are applied here, so the raw status is recorded.
+        self._restype = value
+        self._func.restype = value if (value is None or _isCType(value)) else ctypes.c_long
+
+    def __call__(self, *args):
+        memory = [memoryOf(arg) for arg in args]
+        before = [ctypes.string_at(*m) if m is not None else None for m in memory]
+        start = perf_counter()
+        result = self._func(*args)
+        duration = perf_counter() - start
+        logged = []
+        for arg, location, content in zip(args, memory, before):
+            if location is None:
+                logged.append(_loggedValue(arg))
+            else:
+                after = ctypes.string_at(*location)
+                logged.append(Memory(content, after if after != content else None))
+        if isinstance(result, ctypes._Pointer):
+            logged.append(ctypes.cast(result, ctypes.c_char_p).value if result else None)
+        else:
+            logged.append(result)
+        self._library._log(self.__name__, logged, start, duration)
+        restype = self._restype
+        if restype is not None and not _isCType(restype):
+            return restype(result)
+        return result
+
+
+class RecordingLibrary(object):
+    """Wraps a loaded DLL and logs every call to a compact, zlib compressed binary file.
+
+    Usage: ``DLL(dllPath, library = RecordingLibrary(DLL._loadDll(dllPath, "msp430"), "session.mspr"))``.
+    """
+
+    def __init__(self, library, filename):
+        self.library = library
+        self._name = getattr(library, '_name', 'msp430')
+        self.filename = filename
+        self._functions = {}
+        self._indices = {}
+        self._lock = threading.Lock()
+        self._compressor = zlib.compressobj(6)
+        self._outf = open(filename, "wb")
+        self._outf.write(HEADER.pack(MAGIC, FORMAT_VERSION))
+        self._origin = perf_counter()
+        self.calls = 0
+
+    def __getattr__(self, name):
+        if not name.startswith("MSP430_"):
+            raise AttributeError(name)
+        try:
+            func = getattr(self.library, name)
+        except AttributeError:
+            self._write(NAME_RECORD.pack(MISSING, 0, len(name)) + name.encode("ascii"))
+            raise
+        function = RecordingFunction(self, name, func)
+        self.__dict__[name] = function
+        return function
+
+    def _write(self, data):
+        with self._lock:
+            self._outf.write(self._compressor.compress(data))
+
+    def _log(self, name, values, start, duration):
+        out = []
+        with self._lock:
+            index = self._indices.get(name)
+            if index is None:
+                index = self._indices[name] = len(self._indices)
+                encoded = name.encode("ascii")
+                out.append(NAME_RECORD.pack(NAME, index, len(encoded)))
+                out.append(encoded)
+            out.append(CALL_RECORD.pack(CALL, index, len(values) - 1, start - self._origin, duration))
+            for value in values:
+                _encodeValue(value, out)
+            self._outf.write(self._compressor.compress(b''.join(out)))
+            self.calls += 1
+
+    def flush(self):
+        with self._lock:
+            self._outf.write(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+            self._outf.flush()
+
+    def close(self):
+        with self._lock:
+            if self._outf.closed:
+                return
+            self._outf.write(self._compressor.flush())
+            self._outf.close()
+
+
+class ReplayFunction(object):
+    """Stands in for a ctypes function, answering calls from the log."""
+
+    def __init__(self, library, name):
+        self._library = library
+        self.__name__ = name
+        self.argtypes = None
+        self.restype = ctypes.c_int
+
+    def __call__(self, *args):
+        call = self._library._next(self.__name__, args)
+        for arg, value in zip(args, call.args):
+            if isinstance(value, Memory) and value.after is not None:
+                memory = memoryOf(arg)
+                if memory is not None:
+                    ctypes.memmove(memory[0], value.after, min(memory[1], len(value.after)))
+        return applyRestype(self.restype, call.result, self._library._keepAlive)
+
+
+class ReplayLibrary(object):
+    """Replays a recorded session in place of the DLL, e.g. ``DLL(library = ReplayLibrary("session.mspr"))``.
+
+    Calls have to arrive in recorded order; with `strict` scalar arguments
+    are compared, too. If `realtime` is set, every call sleeps for its recorded
+    duration divided by `speed` (2.0 replays twice as fast).
+    """
+
+    def __init__(self, log, strict = True, realtime = False, speed = 1.0):
+        if isinstance(log, tuple):
+            self._calls, self._missing = log
+        else:
+            self._calls, self._missing = readLog(log)
+        self._name = "replay"
+        self.strict = strict
+        self.realtime = realtime
+        self.speed = speed
+        self.position = 0
+        self._keepAlive = []
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if not name.startswith("MSP430_") or name in self._missing:
+            raise AttributeError(name)
+        function = ReplayFunction(self, name)
+        self.__dict__[name] = function
+        return function
+
+    @property
+    def remaining(self):
+        return len(self._calls) - self.position
+
+    def _next(self, name, args):
+        with self._lock:
+            if self.position >= len(self._calls):
+                raise MSPError("Replay log exhausted, unexpected call to {0}.".format(name),
+                    errno = ErrorType.INTERNAL_ERR)
+            call = self._calls[self.position]
+            if call.name != name:
+                raise MSPError("Replay diverged at call #{0}: expected {1}, got {2}.".format(self.position, call.name,
+                    name), errno = ErrorType.INTERNAL_ERR)
+            if self.strict:
+                self._compare(call, args)
+            self.position += 1
+        if self.realtime and call.duration > 0:
+            time.sleep(call.duration / self.speed)
+        return call
+
+    def _compare(self, call, args):
+        for idx, (recorded, arg) in enumerate(zip(call.args, args)):
+            if isinstance(recorded, (int, float, bytes)) and not isinstance(recorded, bool):
+                if isinstance(arg, (int, float, bytes)) and recorded != arg:
+                    raise MSPError("Replay diverged at call #{0} ({1}): argument {2} is {3!r}, recorded {4!r}.".format(
+                        self.position, call.name, idx, arg, recorded), errno = ErrorType.INTERNAL_ERR)
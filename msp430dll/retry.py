@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import ctypes
+import random
+import time
+
+import enum
+from msp430dll.base import ReadWriteType
+from msp430dll.devicedb import MemoryMap
+from msp430dll.errors import DeadlineExceeded, ErrorType, MSPError
+from msp430dll.instrument import Instrumentation
+from msp430dll.logger import Logger
+
+#: Errors which may go away when the call is repeated.
+TRANSIENT_ERRORS = frozenset((
+    ErrorType.COMM_ERR,
+    ErrorType.READ_MEMORY_ERR,
+    ErrorType.WRITE_MEMORY_ERR,
+    ErrorType.READ_REGISTER_ERR,
+    ErrorType.WRITE_REGISTER_ERR,
+    ErrorType.STATE_ERR,
+    ErrorType.EEM_READ_ERR,
+    ErrorType.READ_TRACE_ERR,
+))
+
+#: Memory read back after a retried write; peripherals and SFRs may legitimately read back something else.
+VERIFIED_KINDS = frozenset(("ram", "flash", "fram"))
+
+
+class Idempotency(enum.IntEnum):
+    UNSAFE = 0      #: Never repeated (erase, secure, run, reset, open, ...).
+    SAFE = 1        #: Read-only, repeated freely.
+    REPEATABLE = 2  #: Same effect when repeated; re-verified after a retry where possible.
+
+
+_SAFE = (
+    "MSP430_GetNumberOfUsbIfs", "MSP430_GetNameOfUsbIf", "MSP430_GetJtagID", "MSP430_GetFoundDevice",
+    "MSP430_GetCurVCCT", "MSP430_GetExtVoltage", "MSP430_ReadOutFile", "MSP430_VerifyFile", "MSP430_VerifyMem",
+    "MSP430_EraseCheck", "MSP430_Error_Number", "MSP430_Error_String", "MSP430_State",
+    "MSP430_CcGetClockNames", "MSP430_CcGetModuleNames", "MSP430_EEM_GetBreakpoint",
+    "MSP430_EEM_GetCombineBreakpoint", "MSP430_EEM_GetTrace", "MSP430_EEM_ReadTraceBuffer",
+    "MSP430_EEM_ReadTraceData", "MSP430_EEM_GetVariableWatch", "MSP430_EEM_GetClockControl",
+    "MSP430_EEM_GetSequencer", "MSP430_EEM_ReadSequencerState", "MSP430_EEM_ReadCycleCounterValue",
+)
+_REPEATABLE = (
+    "MSP430_Configure", "MSP430_VCC", "MSP430_EEM_SetTrace", "MSP430_EEM_SetVariableWatch",
+    "MSP430_EEM_SetClockControl", "MSP430_EEM_SetSequencer", "MSP430_EEM_SetCycleCounterMode",
+    "MSP430_EEM_ConfigureCycleCounter", "MSP430_EEM_WriteCycleCounterValue", "MSP430_EEM_ResetCycleCounter",
+)
+#: Functions whose idempotency depends on their read/write argument (index).
+_READ_WRITE = {
+    "MSP430_Memory": 3,
+    "MSP430_Register": 2,
+    "MSP430_Registers": 2,
+    "MSP430_ExtRegisters": 3,
+}
+
+CLASSIFICATION = dict([(name, Idempotency.SAFE) for name in _SAFE] + [(name, Idempotency.REPEATABLE)
+    for name in _REPEATABLE])
+
+
+def classify(functionName, args):
+    """Idempotency of the call `functionName(*args)`; unknown functions are UNSAFE."""
+    rwIndex = _READ_WRITE.get(functionName)
+    if rwIndex is not None:
+        rw = args[rwIndex]
+        rw = getattr(rw, 'value', rw)
+        return Idempotency.SAFE if rw == ReadWriteType.READ else Idempotency.REPEATABLE
+    return CLASSIFICATION.get(functionName, Idempotency.UNSAFE)
+
+
+def verifiedRanges(memoryMap, address, count):
+    """`(address, count)` pieces of a write which lie in `VERIFIED_KINDS` regions of `memoryMap`."""
+    result = []
+    position = address
+    end = address + count
+    while position < end:
+        boundary = memoryMap.nextBoundary(position)
+        stop = end if boundary is None else min(end, boundary)
+        region = memoryMap.regionOf(position)
+        if region is not None and region.kind in VERIFIED_KINDS:
+            result.append((position, stop - position))
+        position = stop
+    return result
+
+
+def _referencedValue(arg):
+    """Value behind a `byref()`/`pointer()` argument."""
+    obj = getattr(arg, '_obj', None)
+    if obj is None:
+        obj = getattr(arg, 'contents', arg)
+    return obj.value
+
+
+class RetryStats(object):
+
+    def __init__(self):
+        self.retries = 0            # Repeated calls.
+        self.recovered = 0          # Calls which succeeded after a retry.
+        self.exhausted = 0          # Calls which still failed after `maxRetries` retries.
+        self.notRetried = 0         # Transient errors of UNSAFE calls, raised at once.
+        self.verifyFailures = 0
+
+    def toDict(self):
+        return dict(retries = self.retries, recovered = self.recovered, exhausted = self.exhausted,
+            notRetried = self.notRetried, verifyFailures = self.verifyFailures)
+
+
+class RetryPolicy(Instrumentation):
+    """Repeats DLL calls which failed with a transient error, if they are safe to repeat (see `classify()`).
+
+    Installed like `Instrumentation`; to combine it with a
+    `msp430dll.watchdog.Watchdog` pass that as `inner` (and install only
+    the policy). Retries wait `baseDelay * 2 ** (n - 1)` (at most
+    `maxDelay`) seconds with "equal jitter". Writes (memory, registers)
+    which needed a retry are read back and compared -- memory only where
+    it is RAM, flash or FRAM of `memoryMap` (default: the map of the found
+    device); a mismatch raises `VERIFY_ERR`. UNSAFE calls like erase or secure are never repeated, the
+    error is counted and raised as is. Timeouts of a watchdog
+    (`DeadlineExceeded`) are only retried with `retryTimeouts`, as every
+    attempt may take the full deadline.
+    """
+
+    def __init__(self, inner = None, maxRetries = 3, baseDelay = 0.01, maxDelay = 0.5, transientErrors = None,
+            verify = True, memoryMap = None, retryTimeouts = False, sleep = time.sleep, random = random.random, bounds = None):
+        super(RetryPolicy, self).__init__(bounds)
+        self.inner = inner
+        self.maxRetries = maxRetries
+        self.baseDelay = baseDelay
+        self.maxDelay = maxDelay
+        self.transientErrors = TRANSIENT_ERRORS if transientErrors is None else frozenset(transientErrors)
+        self.verify = verify
+        self.memoryMap = memoryMap
+        self.retryTimeouts = retryTimeouts
+        self.sleep = sleep
+        self.random = random
+        self.retryStats = {}
+        self.logger = Logger()
+
+    def counters(self, functionName):
+        try:
+            return self.retryStats[functionName]
+        except KeyError:
+            result = self.retryStats[functionName] = RetryStats()
+            return result
+
+    def backoff(self, attempt):
+        delay = min(self.maxDelay, self.baseDelay * 2 ** (attempt - 1))
+        return delay / 2.0 + self.random() * delay / 2.0
+
+    def wrap(self, functionName, func):
+        inner = self.inner if self.inner is not None else super(RetryPolicy, self)
+        timed = inner.wrap(functionName, func)
+
+        def wrapper(*args):
+            return self.call(functionName, timed, args)
+        wrapper.__name__ = functionName
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    def call(self, functionName, func, args):
+        attempt = 0
+        while True:
+            try:
+                result = func(*args)
+            except MSPError as e:
+                if getattr(e, 'errno', None) not in self.transientErrors:
+                    raise
+                if isinstance(e, DeadlineExceeded) and not self.retryTimeouts:
+                    raise
+                idempotency = classify(functionName, args)
+                counters = self.counters(functionName)
+                if idempotency == Idempotency.UNSAFE:
+                    counters.notRetried += 1
+                    raise
+                if attempt >= self.maxRetries:
+                    counters.exhausted += 1
+                    raise
+                attempt += 1
+                counters.retries += 1
+                self.logger.warn("%s failed (%s), retry %d of %d.", functionName, e, attempt, self.maxRetries)
+                self.sleep(self.backoff(attempt))
+                continue
+            if attempt:
+                self.counters(functionName).recovered += 1
+                if self.verify and classify(functionName, args) == Idempotency.REPEATABLE:
+                    self.verifyWrite(functionName, func, args)
+            return result
+
+    def verifyWrite(self, functionName, func, args):
+        """Read back what a retried memory or register write wrote."""
+        if functionName == "MSP430_Memory":
+            address, buf, count, _ = args
+            memoryMap = self.memoryMap or MemoryMap(self.dll.base.getFoundDevice())
+            written = ctypes.string_at(buf, count)
+            ok = True
+            for start, length in verifiedRanges(memoryMap, address, count):
+                readBack = ctypes.create_string_buffer(length)
+                self.call(functionName, func, (start, readBack, length, ReadWriteType.READ))
+                ok = ok and readBack.raw == written[start - address : start - address + length]
+        elif functionName == "MSP430_Register":
+            value, register, _ = args
+            readBack = ctypes.c_int32()
+            self.call(functionName, func, (ctypes.byref(readBack), register, ReadWriteType.READ))
+            ok = (readBack.value ^ _referencedValue(value)) & 0xfffff == 0
+        elif functionName in ("MSP430_Registers", "MSP430_ExtRegisters"):
+            registers, mask = args[0], args[1]
+            readBack = (ctypes.c_int32 * 16)()
+            readArgs = list(args)
+            readArgs[0] = readBack
+            readArgs[-1] = ReadWriteType.READ
+            self.call(functionName, func, tuple(readArgs))
+            ok = all((readBack[idx] ^ registers[idx]) & 0xfffff == 0 for idx in range(16) if mask & (1 << idx))
+        else:
+            return
+        if not ok:
+            self.counters(functionName).verifyFailures += 1
+            raise MSPError("{0}: verification after retried write failed.".format(functionName),
+                errno = ErrorType.VERIFY_ERR)
+
+    def install(self, dll):
+        if self.inner is not None:
+            self.inner.dll = dll
+        return super(RetryPolicy, self).install(dll)
+
+    def uninstall(self):
+        dll = self.dll
+        super(RetryPolicy, self).uninstall()
+        if self.inner is not None and dll is not None:
+            self.inner.dll = dll
+            self.inner.uninstall()
+
+    def snapshot(self):
+        result = (self.inner if self.inner is not None else super(RetryPolicy, self)).snapshot()
+        for name, counters in self.retryStats.items():
+            result.setdefault(name, {})['retries'] = counters.toDict()
+        return result
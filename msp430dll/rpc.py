@@ -0,0 +1,501 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import OrderedDict
+import json
+import socket
+import struct
+import threading
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+import enum
+from msp430dll.broker import checkRemoteCall, decodeValue, encodeValue
+from msp430dll.debug import DEVICE_REGISTERS, STATE_MODES
+from msp430dll.errors import ErrorType, MSPError
+from msp430dll.logger import Logger
+from msp430dll.utils import Future
+
+PROTOCOL_VERSION = 1
+
+LENGTH = struct.Struct("<I")
+HEADER = struct.Struct("<BBBIH")    # version, kind, flags, batch id, number of operations.
+STATUS = struct.Struct("<B")
+ERROR = struct.Struct("<i")
+U8 = struct.Struct("<B")
+U32 = struct.Struct("<I")
+I32 = struct.Struct("<i")
+U64 = struct.Struct("<Q")
+U8_U8 = struct.Struct("<BB")
+U8_I32 = struct.Struct("<Bi")
+U32_U32 = struct.Struct("<II")
+U32_U32_U32 = struct.Struct("<III")
+I32_I32 = struct.Struct("<ii")
+REGISTERS = struct.Struct("<16i")
+API_NAMES = ("base", "debug", "eem")
+
+
+class FrameKind(enum.IntEnum):
+    REQUEST = 1
+    RESPONSE = 2
+
+
+class BatchFlags(enum.IntEnum):
+    STOP_ON_ERROR = 1   #: Skip the remaining operations of a batch after an error.
+
+
+class ResultStatus(enum.IntEnum):
+    OK = 0
+    ERROR = 1
+    SKIPPED = 2
+
+
+class Operation(enum.IntEnum):
+    """Operations and their parameters (little endian); `bytes`/`str` are u32 length + data."""
+    READ_MEMORY = 1             #: u32 address, u32 count -> bytes
+    WRITE_MEMORY = 2            #: u32 address, bytes data
+    READ_REGISTERS = 3          #: -> 16 * i32
+    READ_REGISTER = 4           #: u8 register -> i32
+    WRITE_REGISTER = 5          #: u8 register, i32 value
+    GET_STATE = 6               #: u8 stop -> i32 state, i32 cycles
+    RUN = 7                     #: u8 mode, u8 releaseJTAG
+    ERASE = 8                   #: u32 type, u32 address, u32 length
+    GET_VCC = 9                 #: -> i32
+    GET_JTAG_ID = 10            #: -> i32
+    READ_CYCLE_COUNTER = 11     #: u8 counter -> u64
+    CALL = 12                   #: u8 api, str method, str JSON args -> str JSON result
+
+
+def packBytes(data):
+    return LENGTH.pack(len(data)) + bytes(data)
+
+
+def packString(text):
+    return packBytes(text.encode("utf-8"))
+
+
+class Reader(object):
+    """Sequential decoder of a frame body."""
+
+    def __init__(self, data, offset = 0):
+        self.data = data
+        self.offset = offset
+
+    def unpack(self, fmt):
+        values = fmt.unpack_from(self.data, self.offset)
+        self.offset += fmt.size
+        return values
+
+    def bytes(self):
+        length, = self.unpack(LENGTH)
+        result = bytes(self.data[self.offset : self.offset + length])
+        if len(result) != length:
+            raise MSPError("Truncated frame", errno = ErrorType.INTERNAL_ERR)
+        self.offset += length
+        return result
+
+    def string(self):
+        return self.bytes().decode("utf-8")
+
+
+def receiveExactly(sock, size):
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received : ], size - received)
+        if not count:
+            return None
+        received += count
+    return buf
+
+
+def receiveFrame(sock):
+    """Return the body of the next frame, or None if the peer closed the connection."""
+    header = receiveExactly(sock, LENGTH.size)
+    if header is None:
+        return None
+    length, = LENGTH.unpack(bytes(header))
+    return receiveExactly(sock, length)
+
+
+def sendFrame(sock, body):
+    sock.sendall(LENGTH.pack(len(body)) + body)
+
+
+PARAMETERS = {
+    Operation.READ_MEMORY: U32_U32,
+    Operation.READ_REGISTERS: None,
+    Operation.READ_REGISTER: U8,
+    Operation.WRITE_REGISTER: U8_I32,
+    Operation.GET_STATE: U8,
+    Operation.RUN: U8_U8,
+    Operation.ERASE: U32_U32_U32,
+    Operation.GET_VCC: None,
+    Operation.GET_JTAG_ID: None,
+    Operation.READ_CYCLE_COUNTER: U8,
+}
+
+
+def packParameters(operation, args):
+    if operation == Operation.WRITE_MEMORY:
+        address, data = args
+        return U32.pack(address) + packBytes(data)
+    elif operation == Operation.CALL:
+        api, method, callArgs = args
+        return U8.pack(API_NAMES.index(api)) + packString(method) + packString(json.dumps(encodeValue(list(callArgs))))
+    fmt = PARAMETERS[operation]
+    return fmt.pack(*args) if fmt else b""
+
+
+def readParameters(operation, reader):
+    if operation == Operation.WRITE_MEMORY:
+        address, = reader.unpack(U32)
+        return (address, reader.bytes())
+    elif operation == Operation.CALL:
+        api, = reader.unpack(U8)
+        return (api, reader.string(), reader.string())
+    if operation not in PARAMETERS:
+        raise MSPError("Unknown operation {0}".format(operation), errno = ErrorType.PARAMETER_ERR)
+    fmt = PARAMETERS[operation]
+    return reader.unpack(fmt) if fmt else ()
+
+
+def execute(dll, operation, args):
+    """Run one operation against `dll`; returns the encoded result."""
+    if operation == Operation.READ_MEMORY:
+        address, count = args
+        return packBytes(dll.base.readMemory(address, None, count).raw)
+    elif operation == Operation.WRITE_MEMORY:
+        dll.base.writeMemory(*args)
+    elif operation == Operation.READ_REGISTERS:
+        return REGISTERS.pack(*dll.debug.readRegisters().values())
+    elif operation == Operation.READ_REGISTER:
+        return I32.pack(dll.debug.readRegister(*args))
+    elif operation == Operation.WRITE_REGISTER:
+        dll.debug.writeRegister(*args)
+    elif operation == Operation.GET_STATE:
+        state, cycles = dll.debug.getState(bool(args[0]))
+        return I32_I32.pack(state, cycles)
+    elif operation == Operation.RUN:
+        dll.debug.run(args[0], bool(args[1]))
+    elif operation == Operation.ERASE:
+        dll.base.erase(*args)
+    elif operation == Operation.GET_VCC:
+        return I32.pack(dll.base.getVCC())
+    elif operation == Operation.GET_JTAG_ID:
+        return I32.pack(dll.base.getJTAGId())
+    elif operation == Operation.READ_CYCLE_COUNTER:
+        return U64.pack(dll.eem.readCycleCounterValue(*args) & 0xffffffffffffffff)
+    elif operation == Operation.CALL:
+        api, method, callArgs = args
+        callArgs = decodeValue(json.loads(callArgs))
+        if api >= len(API_NAMES) or not isinstance(callArgs, list):
+            raise MSPError("Invalid call of '{0}'".format(method), errno = ErrorType.PARAMETER_ERR)
+        checkRemoteCall(API_NAMES[api], method, callArgs)
+        result = getattr(getattr(dll, API_NAMES[api]), method)(*callArgs)
+        return packString(json.dumps(encodeValue(result)))
+    return b""
+
+
+def decodeResult(operation, reader):
+    if operation == Operation.READ_MEMORY:
+        return reader.bytes()
+    elif operation == Operation.READ_REGISTERS:
+        return OrderedDict(zip(DEVICE_REGISTERS.__members__, reader.unpack(REGISTERS)))
+    elif operation in (Operation.READ_REGISTER, Operation.GET_VCC, Operation.GET_JTAG_ID):
+        return reader.unpack(I32)[0]
+    elif operation == Operation.GET_STATE:
+        state, cycles = reader.unpack(I32_I32)
+        return (STATE_MODES(state), cycles)
+    elif operation == Operation.READ_CYCLE_COUNTER:
+        return reader.unpack(U64)[0]
+    elif operation == Operation.CALL:
+        return decodeValue(json.loads(reader.string()))
+    return None
+
+
+def executeBatch(dll, body):
+    """Execute a request frame body and return the response frame body."""
+    reader = Reader(body)
+    version, kind, flags, batchId, count = reader.unpack(HEADER)
+    if version != PROTOCOL_VERSION or kind != FrameKind.REQUEST:
+        raise MSPError("Unsupported frame (version {0}, kind {1})".format(version, kind),
+            errno = ErrorType.PARAMETER_ERR)
+    parts = [HEADER.pack(PROTOCOL_VERSION, FrameKind.RESPONSE, 0, batchId, count)]
+    failed = False
+    for _ in range(count):
+        operation, = reader.unpack(U8)
+        args = readParameters(operation, reader)
+        if failed and flags & BatchFlags.STOP_ON_ERROR:
+            parts.append(STATUS.pack(ResultStatus.SKIPPED))
+            continue
+        try:
+            result = execute(dll, operation, args)
+        except Exception as e:
+            failed = True
+            if isinstance(e, MSPError):
+                errno, message = getattr(e, 'errno', ErrorType.INTERNAL_ERR), str(e)
+            else:
+                errno, message = ErrorType.INTERNAL_ERR, "{0}: {1}".format(type(e).__name__, e)
+            parts.append(STATUS.pack(ResultStatus.ERROR) + ERROR.pack(int(errno)) + packString(message))
+        else:
+            parts.append(STATUS.pack(ResultStatus.OK) + result)
+    return b"".join(parts)
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        server = self.server
+        sock = self.request
+        if sock.family != getattr(socket, "AF_UNIX", None):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                body = receiveFrame(sock)
+                if body is None:
+                    return
+                with server.lock:
+                    response = executeBatch(server.dll, body)
+                sendFrame(sock, response)
+        except (MSPError, struct.error) as e:
+            server.logger.error("Closing RPC connection after malformed frame: %s", e)
+        except socket.error:
+            pass
+
+
+class _RpcServerMixIn(object):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def setupRpc(self, dll):
+        self.dll = dll
+        self.lock = threading.Lock()    # The DLL is not reentrant.
+        self.logger = Logger()
+
+
+class TcpRpcServer(_RpcServerMixIn, socketserver.ThreadingMixIn, socketserver.TCPServer):
+
+    def __init__(self, address, dll):
+        self.setupRpc(dll)
+        socketserver.TCPServer.__init__(self, address, _RequestHandler)
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+    class UnixRpcServer(_RpcServerMixIn, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+
+        def __init__(self, path, dll):
+            self.setupRpc(dll)
+            socketserver.UnixStreamServer.__init__(self, path, _RequestHandler)
+
+
+def createServer(address, dll):
+    """Serve `dll` on a TCP `(host, port)` address or a Unix socket path."""
+    if isinstance(address, tuple):
+        return TcpRpcServer(address, dll)
+    return UnixRpcServer(address, dll)
+
+
+class Batch(object):
+    """Operations sent to the server in a single frame.
+
+    Every method appends an operation and returns its index into the
+    results; `submit()` sends the frame and returns a `Future` of the result
+    list, so several batches can be in flight at once (pipelining).
+    """
+
+    def __init__(self, client, stopOnError = True):
+        self.client = client
+        self.stopOnError = stopOnError
+        self.operations = []
+        self._parts = []
+
+    def __len__(self):
+        return len(self.operations)
+
+    def _add(self, operation, *args):
+        self._parts.append(U8.pack(operation) + packParameters(operation, args))
+        self.operations.append(operation)
+        return len(self.operations) - 1
+
+    def readMemory(self, address, count):
+        return self._add(Operation.READ_MEMORY, address, count)
+
+    def writeMemory(self, address, data):
+        return self._add(Operation.WRITE_MEMORY, address, data)
+
+    def readRegisters(self):
+        return self._add(Operation.READ_REGISTERS)
+
+    def readRegister(self, num):
+        return self._add(Operation.READ_REGISTER, num)
+
+    def writeRegister(self, num, value):
+        return self._add(Operation.WRITE_REGISTER, num, value)
+
+    def getState(self, stop = False):
+        return self._add(Operation.GET_STATE, 1 if stop else 0)
+
+    def run(self, mode, releaseJTAG = False):
+        return self._add(Operation.RUN, mode, 1 if releaseJTAG else 0)
+
+    def erase(self, eraseType, address, length):
+        return self._add(Operation.ERASE, eraseType, address, length)
+
+    def getVCC(self):
+        return self._add(Operation.GET_VCC)
+
+    def getJTAGId(self):
+        return self._add(Operation.GET_JTAG_ID)
+
+    def readCycleCounterValue(self, counter):
+        return self._add(Operation.READ_CYCLE_COUNTER, counter)
+
+    def call(self, api, method, *args):
+        """A method listed in `msp430dll.broker.REMOTE_METHODS`, arguments and result as in the broker protocol."""
+        return self._add(Operation.CALL, api, method, args)
+
+    def encode(self, batchId):
+        flags = BatchFlags.STOP_ON_ERROR if self.stopOnError else 0
+        return HEADER.pack(PROTOCOL_VERSION, FrameKind.REQUEST, flags, batchId, len(self.operations)) + b"".join(self._parts)
+
+    def submit(self):
+        return self.client.submit(self)
+
+    def execute(self, timeout = None):
+        """Submit, wait and return the results; raises the first error."""
+        results = self.submit().result(timeout)
+        for result in results:
+            if isinstance(result, MSPError):
+                raise result
+        return results
+
+
+class RpcClient(object):
+    """Connection to a `createServer()` server; failed operations yield `MSPError` instances in the results."""
+
+    def __init__(self, address, timeout = None):
+        if isinstance(address, tuple):
+            self.socket = socket.create_connection(address, timeout)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.settimeout(timeout)
+            self.socket.connect(address)
+        self.socket.settimeout(None)
+        self._pending = {}
+        self._nextId = 0
+        self._lock = threading.Lock()
+        self.logger = Logger()
+        self._reader = threading.Thread(target = self._receive, name = "msp430-rpc-reader")
+        self._reader.daemon = True
+        self._reader.start()
+
+    def batch(self, stopOnError = True):
+        return Batch(self, stopOnError)
+
+    def submit(self, batch):
+        future = Future()
+        with self._lock:
+            if self._reader is None:
+                raise MSPError("RPC connection closed", errno = ErrorType.COMM_ERR)
+            batchId = self._nextId
+            self._nextId = (self._nextId + 1) & 0xffffffff
+            self._pending[batchId] = (future, list(batch.operations))
+            try:
+                sendFrame(self.socket, batch.encode(batchId))
+            except socket.error as e:
+                del self._pending[batchId]
+                raise MSPError("RPC connection lost: {0}".format(e), errno = ErrorType.COMM_ERR)
+        return future
+
+    def _receive(self):
+        reason = "RPC connection closed"
+        try:
+            while True:
+                body = receiveFrame(self.socket)
+                if body is None:
+                    break
+                self._dispatch(body)
+        except (MSPError, ValueError, struct.error) as e:
+            reason = "RPC connection closed after malformed response: {0}".format(e)
+            self.logger.error("%s", reason)
+            try:
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+        except socket.error:
+            pass
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._reader = None
+        for future, _ in pending.values():
+            future.setException(MSPError(reason, errno = ErrorType.COMM_ERR))
+
+    def _dispatch(self, body):
+        reader = Reader(body)
+        _, _, _, batchId, count = reader.unpack(HEADER)
+        with self._lock:
+            entry = self._pending.pop(batchId, None)
+        if entry is None:
+            raise MSPError("Response to unknown batch {0}".format(batchId), errno = ErrorType.COMM_ERR)
+        future, operations = entry
+        try:
+            results = [self._decode(operation, reader) for operation in operations[ : count]]
+        except Exception as e:
+            future.setException(MSPError("Malformed response: {0}".format(e), errno = ErrorType.COMM_ERR))
+            raise
+        future.setResult(results)
+
+    @staticmethod
+    def _decode(operation, reader):
+        status, = reader.unpack(STATUS)
+        if status == ResultStatus.OK:
+            return decodeResult(operation, reader)
+        elif status == ResultStatus.SKIPPED:
+            return None
+        errno, = reader.unpack(ERROR)
+        message = reader.string()
+        return MSPError(message, errno = ErrorType(errno) if errno in ErrorType.__members__.values() else errno)
+
+    def close(self):
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
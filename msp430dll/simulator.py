@@ -0,0 +1,578 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import ctypes
+import threading
+import time
+
+from msp430dll.base import _DeviceStructure, EraseType, ReadWriteType, SystemEventMSPType
+from msp430dll.debug import RUN_MODES, STATE_MODES
+from msp430dll.devicedb import database, MemoryMap
+from msp430dll.eem import BpMode, BpParameter, MAXHANDLE, MAXTRIGGER, MessageIdType, VwControl, VwParameter, VwResources
+from msp430dll.errors import ERROR_MAP, ErrorType
+from msp430dll.replay import applyRestype, memoryOf
+
+DLL_VERSION = 30300000      # Reported by MSP430_Initialize.
+STATUS_OK = 0
+STATUS_ERROR = -1
+
+
+class SimulationError(Exception):
+
+    def __init__(self, errno):
+        super(SimulationError, self).__init__(errno)
+        self.errno = errno
+
+
+def _value(arg):
+    """Plain value of an argument, which may be a Python or a ctypes scalar."""
+    if isinstance(arg, ctypes._CFuncPtr):
+        return arg
+    return getattr(arg, 'value', arg)
+
+
+def _string(arg):
+    value = _value(arg)
+    if value is None:
+        return b""
+    if not isinstance(value, bytes):
+        value = value.encode("ascii")
+    return value
+
+
+def _target(arg):
+    """The ctypes object an output argument (byref, pointer or array) refers to."""
+    if isinstance(arg, type(ctypes.byref(ctypes.c_int()))):
+        return arg._obj
+    if isinstance(arg, ctypes._Pointer):
+        return arg.contents
+    return arg
+
+
+def _store(arg, value):
+    _target(arg).value = value
+
+
+def _copyFrom(arg):
+    address, size = memoryOf(arg)
+    return ctypes.string_at(address, size)
+
+
+def _copyTo(arg, data):
+    address, size = memoryOf(arg)
+    ctypes.memmove(address, data, min(size, len(data)))
+
+
+class LatencyModel(object):
+    """Cost of a DLL call: fixed `overhead` (per function, see `overheads`) plus `perByte` for memory transfers.
+
+    Time is accounted in `elapsed`; only with `realtime` the calls actually take that long.
+    """
+
+    def __init__(self, overhead = 0.0, perByte = 0.0, overheads = None, realtime = False):
+        self.overhead = overhead
+        self.perByte = perByte
+        self.overheads = overheads or {}
+        self.realtime = realtime
+        self.elapsed = 0.0
+        self.calls = 0
+        self.bytes = 0
+
+    @classmethod
+    def usbFet(cls, realtime = False):
+        """Rough figures for a MSP-FET430UIF: ~1ms per round trip, ~30kB/s."""
+        return cls(overhead = 1e-3, perByte = 3.3e-5, overheads = {"MSP430_Initialize": 0.5, "MSP430_OpenDevice": 0.2},
+            realtime = realtime)
+
+    def cost(self, functionName, nbytes = 0):
+        return self.overheads.get(functionName, self.overhead) + nbytes * self.perByte
+
+    def charge(self, functionName, nbytes = 0):
+        cost = self.cost(functionName, nbytes)
+        self.elapsed += cost
+        self.calls += 1
+        self.bytes += nbytes
+        if self.realtime and cost > 0:
+            time.sleep(cost)
+        return cost
+
+
+class SimulatedFunction(object):
+    """Stands in for a ctypes function of the simulated library."""
+
+    def __init__(self, library, name, implementation):
+        self._library = library
+        self._implementation = implementation
+        self.__name__ = name
+        self.argtypes = None
+        self.restype = ctypes.c_int
+
+    def __call__(self, *args):
+        library = self._library
+        with library.lock:
+            try:
+                result, nbytes = self._implementation(*args)
+            except SimulationError as e:
+                library.lastError = e.errno
+                result, nbytes = STATUS_ERROR, 0
+            library.latency.charge(self.__name__, nbytes)
+        return applyRestype(self.restype, result, library._keepAlive)
+
+
+class SimulatedLibrary(object):
+    """Pure-Python stand-in for the MSP430 DLL, e.g. ``DLL(library = SimulatedLibrary("MSP430F5529"))``.
+
+    Memory is modelled after the device description (see `msp430dll.devicedb`):
+    flash reads as 0xff after erase and can only be programmed from 1 to 0,
+    everything else is plain RAM. There is no CPU: `MSP430_Run` with
+    `RUN_TO_BREAKPOINT` stops at the lowest enabled code breakpoint (`executor`
+    can be replaced to model something else), single steps advance the PC by
+    one word. Every run adds `cyclesPerRun` to the EEM cycle counters.
+    """
+
+    def __init__(self, device = "MSP430F5529", latency = None, jtagId = 0x91, cyclesPerRun = 1000):
+        if not hasattr(device, '_fields'):
+            entry = database().lookup(device)
+            if entry is None:
+                raise KeyError(device)
+            self.memoryMap = MemoryMap(entry.device, entry.mainSegmentSize, entry.infoSegmentSize)
+            device = entry.device
+        else:
+            self.memoryMap = MemoryMap(device)
+        self.device = device
+        self.latency = latency if latency is not None else LatencyModel()
+        self.jtagId = jtagId
+        self.cyclesPerRun = cyclesPerRun
+        self.executor = self._defaultExecutor
+        self._name = "simulated"
+        self.lock = threading.RLock()
+        self._keepAlive = []
+        end = max(region.end for region in self.memoryMap.regions)
+        self.memory = bytearray(max(end + 1, 0x10000))
+        for region in self.memoryMap.regions:
+            if region.kind in ("flash", "fram"):
+                self.memory[region.start : region.end + 1] = b"\xff" * (region.end - region.start + 1)
+        self.registers = [0] * 16
+        self.config = {}
+        self.breakpoints = {}       # handle -> BpParameter bytes.
+        self.combinations = {}
+        self.variables = {}         # handle -> VwParameter bytes.
+        self.variableWatch = 1      # VW_DISABLE
+        self.trace = b""
+        self.clockControl = b""
+        self.sequencer = b""
+        self.cycleCounters = [0, 0]
+        self.lastError = ErrorType.NO_ERR
+        self.initialized = False
+        self.opened = False
+        self.vcc = 0
+        self.state = STATE_MODES.STOPPED
+        self.eventCallback = None
+        self.eventIds = None
+        self.clientHandle = 0
+        self.systemNotifyCallback = None
+
+    def __getattr__(self, name):
+        if not name.startswith("MSP430_"):
+            raise AttributeError(name)
+        implementation = getattr(self, "_{0}".format(name[len("MSP430_") : ]), None)
+        if implementation is None:
+            raise AttributeError(name)
+        function = SimulatedFunction(self, name, implementation)
+        self.__dict__[name] = function
+        return function
+
+    def _require(self, condition, errno):
+        if not condition:
+            raise SimulationError(errno)
+
+    def _checkRange(self, address, length, errno):
+        self._require(address >= 0 and length >= 0 and address + length <= len(self.memory), errno)
+
+    def notify(self, event):
+        """Send a `SystemEventMSPType` to the registered system notify callback."""
+        if self.systemNotifyCallback:
+            self.systemNotifyCallback(int(event))
+
+    def loseConnection(self, event = SystemEventMSPType.FET_CONNECTION_LOST):
+        """Model a fixture glitch: the interface is gone until the next `MSP430_Initialize`."""
+        self.initialized = self.opened = False
+        self.notify(event)
+
+    ##
+    ## BaseAPI.
+    ##
+    def _GetNumberOfUsbIfs(self, pNumber):
+        _store(pNumber, 1)
+        return STATUS_OK, 0
+
+    def _GetNameOfUsbIf(self, index, pName, pStatus):
+        self._require(_value(index) == 0, ErrorType.PARAMETER_ERR)
+        _store(pName, b"SIM0")
+        _store(pStatus, 0)
+        return STATUS_OK, 0
+
+    def _SET_SYSTEM_NOTIFY_CALLBACK(self, callback):
+        self.systemNotifyCallback = callback
+        return STATUS_OK, 0
+
+    def _Initialize(self, port, pVersion):
+        self.initialized = True
+        _store(pVersion, DLL_VERSION)
+        return STATUS_OK, 0
+
+    def _Close(self, vccOff):
+        self.initialized = self.opened = False
+        return STATUS_OK, 0
+
+    def _GetJtagID(self, pJtagId):
+        self._require(self.initialized, ErrorType.INTERFACE_SUPPORT_ERR)
+        _store(pJtagId, self.jtagId)
+        return STATUS_OK, 0
+
+    def _copyDevice(self, device, buffer, length):
+        structure = _DeviceStructure()
+        for name in device._fields:
+            if name == "string":
+                ctypes.memmove(structure.string, device.string, min(len(device.string), 32))
+            else:
+                setattr(structure, name, getattr(device, name))
+        data = ctypes.string_at(ctypes.addressof(structure), ctypes.sizeof(structure))
+        ctypes.memmove(buffer, data, min(_value(length), len(data)))
+
+    def _GetFoundDevice(self, buffer, length):
+        self._require(self.opened, ErrorType.NO_DEVICE_ERR)
+        self._copyDevice(self.device, buffer, length)
+        return STATUS_OK, 0
+
+    def _OpenDevice(self, device, password, passwordLength, deviceCode, setId):
+        self._require(self.initialized, ErrorType.INTERFACE_SUPPORT_ERR)
+        name = _string(device)
+        self._require(name in (b"", b"DEVICE_UNKNOWN") or name.upper() == self.device.string.upper(),
+            ErrorType.FOUND_OTHER_DEVICE)
+        self.opened = True
+        self.state = STATE_MODES.STOPPED
+        return STATUS_OK, 0
+
+    def _Device(self, deviceId, buffer, count):
+        """The device list are the entries of the device database, in alphabetical order."""
+        names = database().names()
+        index = _value(deviceId)
+        self._require(0 <= index < len(names), ErrorType.DEVICE_UNKNOWN_ERR)
+        self._copyDevice(database().device(names[index])._replace(id = index), buffer, count)
+        return STATUS_OK, 0
+
+    def _Configure(self, mode, value):
+        self.config[_value(mode)] = _value(value)
+        return STATUS_OK, 0
+
+    def _VCC(self, voltage):
+        self.vcc = _value(voltage)
+        return STATUS_OK, 0
+
+    def _GetCurVCCT(self, pVoltage):
+        _store(pVoltage, self.vcc)
+        return STATUS_OK, 0
+
+    def _GetExtVoltage(self, pVoltage, pState):
+        _store(pVoltage, 0)
+        _store(pState, ErrorType.NO_EX_POWER)
+        return STATUS_OK, 0
+
+    def _Reset(self, method, execute, releaseJtag):
+        self._require(self.opened, ErrorType.NO_DEVICE_ERR)
+        self.registers = [0] * 16
+        self.registers[0] = self.memory[0xfffe] | (self.memory[0xffff] << 8)
+        self.state = STATE_MODES.RUNNING if _value(execute) else STATE_MODES.STOPPED
+        return STATUS_OK, 0
+
+    def _Erase(self, eraseType, address, length):
+        self._require(self.opened, ErrorType.NO_DEVICE_ERR)
+        eraseType = _value(eraseType)
+        if eraseType == EraseType.ERASE_SEGMENT:
+            address = _value(address)
+            region = self.memoryMap.regionOf(address)
+            self._require(region is not None and region.kind in ("flash", "fram"), ErrorType.ERASE_ERR)
+            segments = self.memoryMap.eraseSegments(address, max(_value(length), 1))
+            if not segments:        # FRAM has no segments, the range is just filled.
+                segments = [(address, max(_value(length), 1))]
+        else:
+            names = ("MAIN", ) if eraseType == EraseType.ERASE_MAIN else ("MAIN", "INFO")
+            segments = [(r.start, r.end - r.start + 1) for r in self.memoryMap.regions if r.name in names]
+        for start, size in segments:
+            self.memory[start : start + size] = b"\xff" * size
+        return STATUS_OK, 0
+
+    def _Memory(self, address, buffer, count, rw):
+        self._require(self.opened, ErrorType.NO_DEVICE_ERR)
+        address, count = _value(address), _value(count)
+        if _value(rw) == ReadWriteType.READ:
+            self._checkRange(address, count, ErrorType.READ_MEMORY_ERR)
+            ctypes.memmove(buffer, bytes(self.memory[address : address + count]), count)
+        else:
+            self._checkRange(address, count, ErrorType.WRITE_MEMORY_ERR)
+            data = bytearray(ctypes.string_at(buffer, count) if not isinstance(buffer, bytes) else buffer[ : count])
+            position = 0
+            while position < count:
+                start = address + position
+                region = self.memoryMap.regionOf(start)
+                boundary = self.memoryMap.nextBoundary(start)
+                stop = count if boundary is None else min(count, boundary - address)
+                chunk = data[position : stop]
+                if region is not None and region.kind == "flash":
+                    current = self.memory[start : start + len(chunk)]
+                    chunk = bytearray(a & b for a, b in zip(current, chunk))
+                self.memory[start : start + len(chunk)] = chunk
+                position = stop
+        return STATUS_OK, count
+
+    def _Secure(self):
+        return STATUS_OK, 0
+
+    def _VerifyMem(self, start, length, buffer):
+        start, length = _value(start), _value(length)
+        self._checkRange(start, length, ErrorType.VERIFY_ERR)
+        self._require(bytes(self.memory[start : start + length]) == ctypes.string_at(buffer, length),
+            ErrorType.VERIFY_ERR)
+        return STATUS_OK, length
+
+    def _EraseCheck(self, start, length):
+        start, length = _value(start), _value(length)
+        self._checkRange(start, length, ErrorType.VERIFY_ERR)
+        self._require(self.memory[start : start + length] == b"\xff" * length, ErrorType.VERIFY_ERR)
+        return STATUS_OK, length
+
+    def _Error_Number(self):
+        return int(self.lastError), 0
+
+    def _Error_String(self, number):
+        try:
+            text = ERROR_MAP[ErrorType(_value(number))]
+        except ValueError:
+            text = ERROR_MAP[ErrorType.INVALID_ERR]
+        return text.encode("ascii"), 0
+
+    ##
+    ## DebugAPI.
+    ##
+    def _Registers(self, registers, mask, rw):
+        self._require(self.opened, ErrorType.NO_DEVICE_ERR)
+        target = _target(registers)
+        mask = _value(mask)
+        for idx in range(16):
+            if mask & (1 << idx):
+                if _value(rw) == ReadWriteType.READ:
+                    target[idx] = self.registers[idx]
+                else:
+                    self.registers[idx] = target[idx] & 0xfffff
+        return STATUS_OK, 0
+
+    def _ExtRegisters(self, registers, mask, extended, rw):
+        return self._Registers(registers, mask, rw)
+
+    def _Register(self, register, number, rw):
+        self._require(self.opened and 0 <= _value(number) < 16, ErrorType.PARAMETER_ERR)
+        target = _target(register)
+        if _value(rw) == ReadWriteType.READ:
+            target.value = self.registers[_value(number)]
+        else:
+            self.registers[_value(number)] = target.value & 0xfffff
+        return STATUS_OK, 0
+
+    def _defaultExecutor(self, mode):
+        """Return the state the CPU ends up in after `MSP430_Run(mode)`."""
+        if mode == RUN_MODES.SINGLE_STEP:
+            self.registers[0] = (self.registers[0] + 2) & 0xfffff
+            return STATE_MODES.SINGLE_STEP_COMPLETE
+        if mode == RUN_MODES.RUN_TO_BREAKPOINT:
+            for handle in sorted(self.breakpoints):
+                parameter = self._breakpoint(handle)
+                if parameter.bpMode == BpMode.BP_CODE:
+                    self.registers[0] = parameter.lAddrVal
+                    return STATE_MODES.BREAKPOINT_HIT
+        return STATE_MODES.RUNNING
+
+    def _Run(self, mode, releaseJtag):
+        self._require(self.opened, ErrorType.NO_DEVICE_ERR)
+        mode = _value(mode)
+        self.state = self.executor(mode)
+        self.cycleCounters = [value + self.cyclesPerRun for value in self.cycleCounters]
+        if self.eventCallback is not None and self.eventIds is not None:
+            if self.state == STATE_MODES.BREAKPOINT_HIT:
+                self.eventCallback(self.eventIds.uiMsgIdBreakpoint, 0, 0, self.clientHandle)
+            elif self.state == STATE_MODES.SINGLE_STEP_COMPLETE:
+                self.eventCallback(self.eventIds.uiMsgIdSingleStep, 0, 0, self.clientHandle)
+        return STATUS_OK, 0
+
+    def _State(self, pState, stop, pCycles):
+        self._require(self.opened, ErrorType.NO_DEVICE_ERR)
+        if _value(stop) and self.state == STATE_MODES.RUNNING:
+            self.state = STATE_MODES.STOPPED
+        _store(pState, int(self.state))
+        _store(pCycles, self.cyclesPerRun & 0x7fffffff)
+        return STATUS_OK, 0
+
+    ##
+    ## EMMAPI.
+    ##
+    def _EEM_Init(self, callback, clientHandle, pMessageIds):
+        self.eventCallback = callback
+        self.clientHandle = _value(clientHandle)
+        self.eventIds = MessageIdType.from_buffer_copy(_copyFrom(pMessageIds))
+        return STATUS_OK, 0
+
+    def _breakpoint(self, handle):
+        return BpParameter.from_buffer_copy(self.breakpoints[handle])
+
+    def _allocate(self, table, limit):
+        for handle in range(1, limit + 1):
+            if handle not in table:
+                return handle
+        raise SimulationError(ErrorType.RESOURCE_ERR)
+
+    def _EEM_SetBreakpoint(self, pHandle, pParameter):
+        handle = _target(pHandle)
+        data = _copyFrom(pParameter)
+        parameter = BpParameter.from_buffer_copy(data)
+        if parameter.bpMode == BpMode.BP_CLEAR:
+            self._require(handle.value in self.breakpoints, ErrorType.BREAKPOINT_ERR)
+            del self.breakpoints[handle.value]
+            return STATUS_OK, 0
+        if not handle.value:
+            handle.value = self._allocate(self.breakpoints, min(self.device.nBreakpoints or MAXTRIGGER, MAXHANDLE))
+        self.breakpoints[handle.value] = data
+        return STATUS_OK, 0
+
+    def _EEM_GetBreakpoint(self, handle, pParameter):
+        handle = _value(handle)
+        self._require(handle in self.breakpoints, ErrorType.BREAKPOINT_ERR)
+        _copyTo(pParameter, self.breakpoints[handle])
+        return STATUS_OK, 0
+
+    def _EEM_SetCombineBreakpoint(self, control, count, pHandle, pHandles):
+        handle = _target(pHandle)
+        if not handle.value:
+            handle.value = self._allocate(self.combinations, MAXHANDLE)
+        self.combinations[handle.value] = (_value(count), _copyFrom(pHandles))
+        return STATUS_OK, 0
+
+    def _EEM_GetCombineBreakpoint(self, handle, pCount, pHandles):
+        handle = _value(handle)
+        self._require(handle in self.combinations, ErrorType.BREAKPOINT_ERR)
+        count, handles = self.combinations[handle]
+        _store(pCount, count)
+        _copyTo(pHandles, handles)
+        return STATUS_OK, 0
+
+    def _EEM_SetTrace(self, pParameter):
+        self.trace = _copyFrom(pParameter)
+        return STATUS_OK, 0
+
+    def _EEM_GetTrace(self, pParameter):
+        _copyTo(pParameter, self.trace)
+        return STATUS_OK, 0
+
+    def _EEM_ReadTraceBuffer(self, pBuffer):
+        return STATUS_OK, 0
+
+    def _EEM_ReadTraceData(self, pBuffer, pCount):
+        _store(pCount, 0)      # The simulator does not execute code, so nothing is ever traced.
+        return STATUS_OK, 0
+
+    def _EEM_RefreshTraceBuffer(self):
+        return STATUS_OK, 0
+
+    def _EEM_SetVariableWatch(self, enable):
+        self.variableWatch = _value(enable)
+        return STATUS_OK, 0
+
+    def _EEM_SetVariable(self, pHandle, pParameter):
+        handle = _target(pHandle)
+        data = _copyFrom(pParameter)
+        parameter = VwParameter.from_buffer_copy(data)
+        if parameter.vwControl == VwControl.VW_CLEAR:
+            self.variables.pop(handle.value, None)
+            return STATUS_OK, 0
+        if not handle.value:
+            handle.value = self._allocate(self.variables, MAXTRIGGER)
+        self.variables[handle.value] = data
+        return STATUS_OK, 0
+
+    def _EEM_GetVariableWatch(self, pEnable, resources):
+        _store(pEnable, self.variableWatch)
+        target = _target(resources)
+        for idx, handle in enumerate(sorted(self.variables)[ : len(target)]):
+            parameter = VwParameter.from_buffer_copy(self.variables[handle])
+            entry = VwResources()
+            entry.vwHandle = handle
+            entry.lAddr = parameter.lAddr
+            entry.vwDataType = parameter.vwDataType
+            target[idx] = entry
+        return STATUS_OK, 0
+
+    def _EEM_SetClockControl(self, pParameter):
+        self.clockControl = _copyFrom(pParameter)
+        return STATUS_OK, 0
+
+    def _EEM_GetClockControl(self, pParameter):
+        _copyTo(pParameter, self.clockControl)
+        return STATUS_OK, 0
+
+    def _EEM_SetSequencer(self, pParameter):
+        self.sequencer = _copyFrom(pParameter)
+        return STATUS_OK, 0
+
+    def _EEM_GetSequencer(self, pParameter):
+        _copyTo(pParameter, self.sequencer)
+        return STATUS_OK, 0
+
+    def _EEM_ReadSequencerState(self, pState):
+        _store(pState, 0)
+        return STATUS_OK, 0
+
+    def _EEM_SetCycleCounterMode(self, mode):
+        return STATUS_OK, 0
+
+    def _EEM_ConfigureCycleCounter(self, counter, config):
+        self._require(0 <= _value(counter) < len(self.cycleCounters), ErrorType.PARAMETER_ERR)
+        return STATUS_OK, 0
+
+    def _EEM_ReadCycleCounterValue(self, counter, pValue):
+        self._require(0 <= _value(counter) < len(self.cycleCounters), ErrorType.PARAMETER_ERR)
+        _store(pValue, self.cycleCounters[_value(counter)])
+        return STATUS_OK, 0
+
+    def _EEM_WriteCycleCounterValue(self, counter, value):
+        self._require(0 <= _value(counter) < len(self.cycleCounters), ErrorType.PARAMETER_ERR)
+        self.cycleCounters[_value(counter)] = _value(value)
+        return STATUS_OK, 0
+
+    def _EEM_ResetCycleCounter(self, counter):
+        self._require(0 <= _value(counter) < len(self.cycleCounters), ErrorType.PARAMETER_ERR)
+        self.cycleCounters[_value(counter)] = 0
+        return STATUS_OK, 0
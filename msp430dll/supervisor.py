@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import threading
+import time
+
+from msp430dll.base import SystemEventMSPType
+from msp430dll.errors import CONNECTION_ERRORS, ErrorType, MSPError
+from msp430dll.logger import Logger
+from msp430dll.utils import perf_counter
+
+LOST_EVENTS = frozenset((SystemEventMSPType.FET_CONNECTION_LOST, SystemEventMSPType.DEVICE_CONNECTION_LOST,
+    SystemEventMSPType.FET_RESTART_NEEDED))
+
+
+class ReconnectStats(object):
+
+    def __init__(self):
+        self.events = {}
+        self.reconnects = 0
+        self.failedAttempts = 0
+        self.downtime = 0.0
+        self.resumedTransfers = 0
+
+    def summary(self):
+        return dict(events = dict((SystemEventMSPType(k).name, v) for k, v in self.events.items()),
+            reconnects = self.reconnects, failedAttempts = self.failedAttempts, downtime = self.downtime,
+            resumedTransfers = self.resumedTransfers)
+
+
+class BulkTransfer(object):
+    """Chunked memory transfer that remembers the last completed chunk.
+
+    `data` is written, or with `data` = None `count` bytes are read into
+    `result`. After an error the same object can be passed to
+    `SessionSupervisor.transfer()` again to continue at `position`.
+    """
+
+    def __init__(self, address, data = None, count = None, chunkSize = 1024):
+        self.address = address
+        self.data = data
+        self.count = len(data) if data is not None else count
+        self.chunkSize = chunkSize
+        self.position = 0
+        self.result = bytearray() if data is None else None
+
+    @property
+    def done(self):
+        return self.position >= self.count
+
+    def step(self, base):
+        """Transfer the next chunk."""
+        size = min(self.chunkSize, self.count - self.position)
+        address = self.address + self.position
+        if self.data is None:
+            self.result.extend(base.readMemory(address, None, size).raw)
+        else:
+            base.writeMemory(address, self.data[self.position : self.position + size])
+        self.position += size
+
+
+class SessionSupervisor(object):
+    """Keeps a device connection alive across FET and device connection losses.
+
+    The supervisor registers a system notify callback; on
+    `FET_CONNECTION_LOST`, `DEVICE_CONNECTION_LOST` or `FET_RESTART_NEEDED`
+    (or a connection error raised by the DLL) the next `call()` closes the
+    interface and re-runs initialize, VCC and open with exponential backoff,
+    then retries the operation. Bulk transfers resume at the last completed
+    chunk. Reconnecting is done by the calling thread, never by the callback.
+    """
+
+    def __init__(self, dll, port = "TIUSB", vcc = None, device = "DEVICE_UNKNOWN", initialDelay = 0.1,
+            maxDelay = 5.0, maxAttempts = 10, sleep = time.sleep):
+        self.dll = dll
+        self.port = port
+        self.vcc = vcc
+        self.device = device
+        self.initialDelay = initialDelay
+        self.maxDelay = maxDelay
+        self.maxAttempts = maxAttempts
+        self.sleep = sleep
+        self.stats = ReconnectStats()
+        self.logger = Logger()
+        self._lost = threading.Event()
+        self._lostAt = None
+
+    def connect(self):
+        base = self.dll.base
+        base.initialize(self.port)
+        base.setSystemNotifyCallback(self.onSystemEvent)
+        if self.vcc is not None:
+            base.setVCC(self.vcc)
+        base.openDevice(self.device)
+        self._lost.clear()
+
+    def close(self):
+        base = self.dll.base
+        base.setSystemNotifyCallback(None)
+        base.close()
+
+    def onSystemEvent(self, event):
+        self.stats.events[event] = self.stats.events.get(event, 0) + 1
+        if event in LOST_EVENTS:
+            self.logger.warn("Connection lost (%s).", getattr(event, 'name', event))
+            self.markLost()
+
+    def markLost(self):
+        if not self._lost.is_set():
+            self._lostAt = perf_counter()
+            self._lost.set()
+
+    @property
+    def lost(self):
+        return self._lost.is_set()
+
+    def reconnect(self):
+        """Re-establish the connection; raises the last `MSPError` after `maxAttempts` failures."""
+        self.markLost()
+        delay = self.initialDelay
+        for attempt in range(1, self.maxAttempts + 1):
+            try:
+                self.dll.base.close()
+            except MSPError:
+                pass
+            try:
+                self.connect()
+            except MSPError as e:
+                self.stats.failedAttempts += 1
+                self.logger.warn("Reconnect attempt %d failed: %s", attempt, e)
+                if attempt == self.maxAttempts:
+                    raise
+                self.sleep(delay)
+                delay = min(delay * 2, self.maxDelay)
+            else:
+                self.stats.reconnects += 1
+                self.stats.downtime += perf_counter() - self._lostAt
+                self.logger.info("Reconnected after %d attempt(s).", attempt)
+                return
+
+    def call(self, function, *args):
+        """Call `function(*args)`, reconnecting and retrying after connection losses."""
+        for _ in range(self.maxAttempts):
+            if self.lost:
+                self.reconnect()
+            try:
+                return function(*args)
+            except MSPError as e:
+                if not self.lost and getattr(e, 'errno', None) not in CONNECTION_ERRORS:
+                    raise
+                self.markLost()
+        raise MSPError("Operation failed after {0} reconnects".format(self.maxAttempts), errno = ErrorType.COMM_ERR)
+
+    def transfer(self, bulk):
+        """Run (or resume) a `BulkTransfer`; returns it."""
+        reconnects = self.stats.reconnects
+        while not bulk.done:
+            self.call(bulk.step, self.dll.base)
+        if self.stats.reconnects != reconnects:
+            self.stats.resumedTransfers += 1
+        return bulk
+
+    def writeMemory(self, address, data, chunkSize = 1024):
+        self.transfer(BulkTransfer(address, data = data, chunkSize = chunkSize))
+
+    def readMemory(self, address, count, chunkSize = 1024):
+        return bytes(self.transfer(BulkTransfer(address, count = count, chunkSize = chunkSize)).result)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import namedtuple
+
+from msp430dll.base import ConfigModeType, EraseType
+from msp430dll.devicedb import MemoryMap
+from msp430dll.eem import BpAccess, BpAction, BpMode, BpOperat, BpParameter, BpType
+from msp430dll.errors import ErrorType, MSPError
+from msp430dll.utils import perf_counter
+
+SW_BREAKPOINT_OPCODE = 0x4343   #: 'MOV.B R3,R3' -- the opcode TI tools use for software breakpoints.
+
+MAIN_SEGMENT_SIZE = 512
+INFO_SEGMENT_SIZE = 64
+
+PatchCost = namedtuple("PatchCost", "patched restored readCalls writeCalls bytesWritten segmentsErased elapsed")
+
+
+class SoftwareBreakpoints(object):
+    """Any number of software breakpoints, patched into target memory in batches.
+
+    Breakpoints are only collected by `add` and `remove`; target memory is
+    touched by `commit`, which is meant to be called right before the device
+    is released (see `prepareRun`). Removed breakpoints are restored lazily,
+    i.e. a breakpoint removed and re-added between two runs costs nothing.
+
+    Changes to RAM/FRAM are coalesced into as few read/write spans as possible,
+    breakpoints in flash memory are grouped per segment, so every affected
+    segment is erased and rewritten exactly once.
+
+    A single software breakpoint trigger (fetch of `opcode` on the MDB, all
+    bits compared) stops the CPU on every patched location; pass a
+    `BreakpointManager` to have it installed.
+    """
+
+    def __init__(self, base, device, breakpoints = None, opcode = SW_BREAKPOINT_OPCODE,
+            mainSegmentSize = MAIN_SEGMENT_SIZE, infoSegmentSize = INFO_SEGMENT_SIZE, maxGap = 16):
+        self.base = base
+        self.device = device
+        self.memoryMap = MemoryMap(device, mainSegmentSize, infoSegmentSize)
+        self.breakpoints = breakpoints
+        self.opcode = opcode
+        self.maxGap = maxGap
+        self.originals = {}     # address -> original word, for every location patched on the target.
+        self._wanted = set()
+        self._triggerHandle = None
+        self.history = []
+
+    def __len__(self):
+        return len(self._wanted)
+
+    def __contains__(self, address):
+        return address in self._wanted
+
+    @property
+    def addresses(self):
+        return sorted(self._wanted)
+
+    def add(self, address):
+        if address & 1:
+            raise MSPError("Software breakpoint at odd address 0x{0:04x}.".format(address),
+                errno = ErrorType.PARAMETER_ERR)
+        self._wanted.add(address)
+
+    def remove(self, address):
+        self._wanted.discard(address)
+
+    def clear(self):
+        self._wanted.clear()
+
+    def isPatched(self, address):
+        return address in self.originals
+
+    def originalWord(self, address):
+        return self.originals[address]
+
+    def isFlash(self, address):
+        return self.memoryMap.isFlash(address)
+
+    def segmentOf(self, address):
+        return self.memoryMap.segmentOf(address)
+
+    def commit(self):
+        """Bring target memory in line with the requested breakpoints and return the `PatchCost`."""
+        start = perf_counter()
+        toPatch = self._wanted.difference(self.originals)
+        toRestore = set(self.originals).difference(self._wanted)
+        cost = dict(readCalls = 0, writeCalls = 0, bytesWritten = 0, segmentsErased = 0)
+        if toPatch or toRestore:
+            changes = sorted(toPatch | toRestore)
+            flashChanges = [address for address in changes if self.isFlash(address)]
+            ramChanges = [address for address in changes if not self.isFlash(address)]
+            for spanStart, spanLength, addresses in self._spans(ramChanges):
+                self._rewrite(spanStart, spanLength, addresses, cost, erase = False)
+            for segmentStart, segmentSize, addresses in self._segments(flashChanges):
+                self._rewrite(segmentStart, segmentSize, addresses, cost, erase = True)
+        if self.breakpoints is not None:
+            self._updateTrigger()
+        result = PatchCost(len(toPatch), len(toRestore), elapsed = perf_counter() - start, **cost)
+        self.history.append(result)
+        return result
+
+    def prepareRun(self, pc):
+        """Commit pending changes and feed the original instruction to the CPU if it sits on a breakpoint."""
+        result = self.commit()
+        if pc in self.originals:
+            self.base.configure(ConfigModeType.SET_MDB_BEFORE_RUN, self.originals[pc])
+        return result
+
+    def restoreAll(self):
+        """Remove every patch from target memory, e.g. before closing the device."""
+        self._wanted.clear()
+        return self.commit()
+
+    def _spans(self, addresses):
+        spans = []
+        for address in addresses:
+            if spans and address - (spans[-1][0] + spans[-1][1]) <= self.maxGap:
+                spanStart, _, members = spans[-1]
+                members.append(address)
+                spans[-1] = (spanStart, address + 2 - spanStart, members)
+            else:
+                spans.append((address, 2, [address]))
+        return spans
+
+    def _segments(self, addresses):
+        segments = {}
+        for address in addresses:
+            segment = self.segmentOf(address)
+            segments.setdefault(segment, []).append(address)
+        return [(start, size, members) for (start, size), members in sorted(segments.items())]
+
+    def _rewrite(self, start, length, addresses, cost, erase):
+        data = bytearray(self.base.readMemory(start, None, length).raw)
+        cost['readCalls'] += 1
+        patched = {}
+        restored = []
+        for address in addresses:
+            offset = address - start
+            if address in self.originals:
+                word = self.originals[address]
+                restored.append(address)
+            else:
+                patched[address] = data[offset] | (data[offset + 1] << 8)
+                word = self.opcode
+            data[offset] = word & 0xff
+            data[offset + 1] = (word >> 8) & 0xff
+        if erase:
+            self.base.erase(EraseType.ERASE_SEGMENT, start, length)
+            cost['segmentsErased'] += 1
+        self.base.writeMemory(start, data, length)
+        cost['writeCalls'] += 1
+        cost['bytesWritten'] += length
+        # Only now the target matches, a failed erase or write leaves the table untouched.
+        for address in restored:
+            del self.originals[address]
+        self.originals.update(patched)
+
+    def _updateTrigger(self):
+        if self.originals and self._triggerHandle is None:
+            parameter = BpParameter()
+            parameter.bpMode = BpMode.BP_SOFTWARE
+            parameter.bpType = BpType.BP_MDB
+            parameter.lAddrVal = self.opcode
+            parameter.lMask = 0xffff
+            parameter.bpAccess = BpAccess.BP_FETCH
+            parameter.bpAction = BpAction.BP_BRK
+            parameter.bpOperat = BpOperat.BP_EQUAL
+            self._triggerHandle = self.breakpoints.add(parameter)
+        elif not self.originals and self._triggerHandle is not None:
+            self.breakpoints.remove(self._triggerHandle)
+            self._triggerHandle = None
@@ -0,0 +1,54 @@
+"""Micro-benchmark: cost of a debug log call in the DLL wrappers while logging is at WARN.
+
+Compares the lazy %-style calls against the former eager `str.format` +
+`Logger.log` pattern; run with `python -m msp430dll.tests.benchLogging`.
+"""
+
+import logging
+import timeit
+
+from msp430dll.logger import Logger
+
+
+class LegacyLogger(object):
+
+    def __init__(self):
+        self.logger = logging.getLogger("msp430.legacy")
+        self.logger.setLevel(logging.WARN)
+        self.lastMessage = None
+        self.lastSeverity = None
+
+    def log(self, message, level):
+        self.lastSeverity = level
+        self.lastMessage = message
+        self.logger.log(level, "{0}".format(message))
+
+    def debug(self, message):
+        self.log(message, logging.DEBUG)
+
+
+def bench(func, number = 100000):
+    return min(timeit.repeat(func, number = number, repeat = 5)) / number
+
+
+def run():
+    legacy = LegacyLogger()
+    logger = Logger()
+    logger.setLevel(logging.WARN)
+    version = 0x30300000
+    results = []
+    results.append(("legacy debug call", bench(
+        lambda: legacy.debug("MSP430_Initialize('{0}') - version returned: {1:#x}".format("TIUSB", version)))))
+    results.append(("lazy debug call", bench(
+        lambda: logger.debug("MSP430_Initialize('%s') - version returned: %#x", "TIUSB", version))))
+    results.append(("no logging at all", bench(lambda: None)))
+    return results
+
+
+def main():
+    for label, value in run():
+        print("{0:<20}: {1:8.1f} ns/call".format(label, value * 1e9))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark suite: overhead of the Python layer per operation.
+
+Runs against the in-process `SimulatedLibrary` (without latency), so only
+time spent in `msp430dll` and ctypes is measured. Usage::
+
+    python -m msp430dll.tests.benchOverhead --save baseline.json
+    python -m msp430dll.tests.benchOverhead --compare baseline.json --threshold 0.10
+
+With `--compare` the exit status is 1 if any benchmark regressed by more than
+the threshold; without a file name the committed baseline (`BASELINE`) is
+used. Timings depend on the machine (and on tracers like coverage), so the
+check is opt-in: `testBenchOverhead` only runs it with `MSP430DLL_BENCH=1`.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import timeit
+
+import msp430dll
+from msp430dll import DLL
+from msp430dll.benchstats import checkRegressions, loadBaseline, saveBaseline, summarize
+from msp430dll.eem import TraceBuffer, TraceBufferDecoder
+from msp430dll.simulator import SimulatedLibrary
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchBaseline.json")
+
+MEMORY_SIZES = (2, 64, 1024, 16384)
+TRACE_RECORDS = 1000
+
+
+def openSimulated():
+    dll = DLL(library = SimulatedLibrary("MSP430F5529"))
+    dll.base.initialize()
+    dll.base.openDevice()
+    return dll
+
+
+def measure(name, func, number = 100, repeat = 20, perItem = 1):
+    """Run `func` `number` times per sample and summarize the time per call (or per item)."""
+    samples = [t / (number * perItem) for t in timeit.repeat(func, number = number, repeat = repeat)]
+    return summarize(name, samples)
+
+
+def importTime(repeat = 5):
+    command = [sys.executable, "-c", "import time; s = time.time(); import msp430dll; print(time.time() - s)"]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(msp430dll.__file__)))
+    samples = [float(subprocess.check_output(command, cwd = root).decode("ascii")) for _ in range(repeat)]
+    return summarize("import msp430dll", samples)
+
+
+def run(scale = 1.0, includeImport = True):
+    """Run all benchmarks; `scale` shrinks/grows the number of iterations."""
+    number = max(1, int(100 * scale))
+    repeat = max(3, int(20 * scale))
+    dll = openSimulated()
+    base, debug = dll.base, dll.debug
+    results = []
+    for size in MEMORY_SIZES:
+        results.append(measure("readMemory[{0}]".format(size), lambda: base.readMemory(0x2400, None, size),
+            number, repeat))
+    results.append(measure("readRegisters", debug.readRegisters, number, repeat))
+    results.append(measure("getState", lambda: debug.getState(False), number, repeat))
+    results.append(measure("getFoundDevice", base.getFoundDevice, number, repeat))
+    records = (TraceBuffer * TRACE_RECORDS)()
+    results.append(measure("traceDecode (per record)", lambda: TraceBufferDecoder.decodeMany(records, TRACE_RECORDS),
+        max(1, number // 10), repeat, TRACE_RECORDS))
+    if includeImport:
+        results.append(importTime(max(3, int(5 * scale))))
+    return results
+
+
+def report(results):
+    for result in results:
+        line = "{0:<26} median {1:10.2f} us  p99 {2:10.2f} us".format(result.name, result.median * 1e6, result.p99 * 1e6)
+        if result.name.startswith("readMemory["):
+            size = int(result.name[len("readMemory[") : -1])
+            line += "  {0:8.1f} MB/s".format(size / result.median / 1e6)
+        print(line)
+
+
+def main(args = None):
+    parser = argparse.ArgumentParser(description = "Benchmark the Python layer of msp430dll.")
+    parser.add_argument("--save", help = "write results as JSON baseline")
+    parser.add_argument("--compare", nargs = "?", const = BASELINE,
+        help = "compare against a JSON baseline (default: the committed one)")
+    parser.add_argument("--threshold", type = float, default = 0.10, help = "allowed slowdown (fraction)")
+    parser.add_argument("--scale", type = float, default = 1.0, help = "scale the number of iterations")
+    parser.add_argument("--no-import", action = "store_true", help = "skip the import time benchmark")
+    options = parser.parse_args(args)
+    results = run(options.scale, not options.no_import)
+    report(results)
+    if options.save:
+        saveBaseline(options.save, results)
+    if options.compare:
+        regressions = checkRegressions(results, loadBaseline(options.compare), options.threshold, ("median", ))
+        for regression in regressions:
+            print("REGRESSION {0}: {1} {2:.2f} us -> {3:.2f} us ({4:.2f}x)".format(regression.name, regression.metric,
+                regression.baseline * 1e6, regression.current * 1e6, regression.ratio))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
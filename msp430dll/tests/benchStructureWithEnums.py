@@ -0,0 +1,71 @@
+
+"""Micro-benchmarks: field access of `StructureWithEnums` in decoding loops.
+
+Compares the descriptor based implementation against the former
+`__getattribute__` override; run with `python -m msp430dll.tests.benchStructureWithEnums`.
+"""
+
+import ctypes
+import timeit
+
+from msp430dll.eem import BpParameter, TraceBuffer
+
+
+class LegacyStructureWithEnums(ctypes.Structure):
+
+    _map = {}
+
+    def __getattribute__(self, name):
+        _map = ctypes.Structure.__getattribute__(self, '_map')
+        value = ctypes.Structure.__getattribute__(self, name)
+        if name in _map:
+            EnumClass = _map[name]
+            if isinstance(value, ctypes.Array):
+                return [EnumClass(x) for x in value]
+            else:
+                return EnumClass(value)
+        else:
+            return value
+
+
+class LegacyTraceBuffer(LegacyStructureWithEnums):
+    _pack_ = 1
+    _fields_ = TraceBuffer._fields_
+
+
+class LegacyBpParameter(LegacyStructureWithEnums):
+    _pack_ = 1
+    _fields_ = BpParameter._fields_
+    _map = BpParameter._map
+
+
+def decodeTrace(records):
+    return [(r.lTrBufMAB, r.lTrBufMDB, r.wTrBufCNTRL) for r in records]
+
+
+def decodeBreakpoints(params):
+    return [(p.bpMode, p.lAddrVal, p.bpType, p.bpAccess, p.bpAction, p.bpOperat) for p in params]
+
+
+def bench(func, data, number = 20):
+    return min(timeit.repeat(lambda: func(data), number = number, repeat = 5)) / (number * len(data))
+
+
+def run(count = 1000):
+    results = []
+    for label, decoder, current, legacy in (
+            ("trace decoding", decodeTrace, TraceBuffer, LegacyTraceBuffer),
+            ("breakpoint decoding", decodeBreakpoints, BpParameter, LegacyBpParameter)):
+        new = bench(decoder, [current() for _ in range(count)])
+        old = bench(decoder, [legacy() for _ in range(count)])
+        results.append((label, new, old))
+    return results
+
+
+def main():
+    for label, new, old in run():
+        print("{0:<20}: {1:8.1f} ns/record (was {2:8.1f} ns/record, {3:4.1f}x)".format(label, new * 1e9, old * 1e9, old / new))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+
+import unittest
+
+from msp430dll import DLL
+from msp430dll.base import ConfigModeType, EraseType
+from msp430dll.errors import ErrorType, MSPError
+from msp430dll.simulator import SimulatedLibrary
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.library = SimulatedLibrary("MSP430F5529")
+        self.dll = DLL(library = self.library)
+        self.dll.base.initialize()
+        self.dll.base.openDevice()
+
+    def calls(self, batch):
+        return [(step.kind, step.args) for step in batch.plan()]
+
+    def testMergeWrites(self):
+        batch = self.dll.batch()
+        for idx in range(8):
+            batch.writeMemory(0x2400 + 2 * idx, b"\x00\x00")
+        batch.writeMemory(0x2402, b"\x11\x22")
+        batch.writeMemory(0x2500, b"\x33")
+        self.assertEqual(self.calls(batch), [
+            ("writeMemory", (0x2400, b"\x00\x00\x11\x22" + b"\x00" * 12)),
+            ("writeMemory", (0x2500, b"\x33")),
+        ])
+
+    def testMergeWriteIntervals(self):
+        batch = self.dll.batch()
+        batch.writeMemory(0x2410, b"\x01" * 4)
+        batch.writeMemory(0x2400, b"\x02" * 4)
+        batch.writeMemory(0x2420, b"\x03" * 4)
+        batch.writeMemory(0x2402, b"\x04" * 16)      # Bridges the first two runs.
+        batch.writeMemory(0x2424, b"")
+        self.assertEqual(self.calls(batch), [
+            ("writeMemory", (0x2400, b"\x02\x02" + b"\x04" * 16 + b"\x01\x01")),
+            ("writeMemory", (0x2420, b"\x03" * 4)),
+        ])
+
+    def testLargeImage(self):
+        image = bytes(bytearray(idx & 0xff for idx in range(0x10000)))
+        batch = self.dll.batch()
+        for offset in range(0, len(image), 256):
+            batch.writeMemory(0x4400 + offset, image[offset : offset + 256])
+        self.assertEqual(self.calls(batch), [("writeMemory", (0x4400, image))])
+
+    def testReadOrdering(self):
+        batch = self.dll.batch()
+        early = batch.readMemory(0x2400, 2)         # Overlaps a later write.
+        batch.writeMemory(0x2400, b"\x12\x34")
+        late = batch.readMemory(0x2401, 2)          # Overlaps an earlier write.
+        other = batch.readMemory(0x2404, 4)
+        self.assertEqual(self.calls(batch), [
+            ("readMemory", (0x2400, 2)),
+            ("writeMemory", (0x2400, b"\x12\x34")),
+            ("readMemory", (0x2401, 7)),
+        ])
+        batch.execute()
+        self.assertEqual(early.result(), b"\x00\x00")
+        self.assertEqual(late.result(), b"\x34\x00")
+        self.assertEqual(other.result(), b"\x00" * 4)
+
+    def testConflictSplitsSegment(self):
+        batch = self.dll.batch()
+        batch.writeMemory(0x2400, b"\x01")
+        read = batch.readMemory(0x2400, 1)
+        batch.writeMemory(0x2400, b"\x02")
+        self.assertEqual([kind for kind, _ in self.calls(batch)], ["writeMemory", "readMemory", "writeMemory"])
+        batch.execute()
+        self.assertEqual(read.result(), b"\x01")
+        self.assertEqual(self.dll.base.readMemory(0x2400, None, 1).raw, b"\x02")
+
+    def testBarriersAndRegisters(self):
+        with self.dll.batch() as batch:
+            batch.writeMemory(0x4400, b"\x0f")
+            batch.writeRegister(4, 1)
+            erased = batch.erase(EraseType.ERASE_SEGMENT, 0x4400, 1)
+            batch.configure(ConfigModeType.RAM_PRESERVE_MODE, 1)
+            batch.writeMemory(0x4400, b"\xf1")
+            batch.writeRegister(5, 2)
+            batch.writeRegister(4, 3)
+            flash = batch.readMemory(0x4400, 1)
+            self.assertEqual([kind for kind, _ in self.calls(batch)], ["writeMemory", "writeRegisters", "erase",
+                "configure", "writeMemory", "readMemory", "writeRegisters"])
+        self.assertEqual(batch.calls, 7)
+        self.assertIsNone(erased.result())
+        self.assertEqual(flash.result(), b"\xf1")
+        registers = self.dll.debug.readRegisters()
+        self.assertEqual((registers["R4"], registers["R5"]), (3, 2))
+
+    def testErrors(self):
+        batch = self.dll.batch()
+        write = batch.writeMemory(0x2400, b"\x01")
+        read = batch.readMemory(0x100000, 2)
+        register = batch.writeRegister(4, 1)
+        self.assertRaises(MSPError, batch.execute)
+        self.assertIsNone(write.result())
+        self.assertEqual(read.exception().errno, ErrorType.READ_MEMORY_ERR)
+        self.assertIsInstance(register.exception(), MSPError)
+
+        with self.assertRaises(ValueError):
+            with self.dll.batch() as batch:
+                write = batch.writeMemory(0x2400, b"\x02")
+                raise ValueError()
+        self.assertIsInstance(write.exception(), MSPError)
+        self.assertEqual(self.dll.base.readMemory(0x2400, None, 1).raw, b"\x01")
+
+    def testWriteRegisters(self):
+        self.dll.debug.writeRegisters({"PC": 0x4400, 4: 7})
+        registers = self.dll.debug.readRegisters()
+        self.assertEqual((registers["R0"], registers["R4"], registers["R5"]), (0x4400, 7, 0))
+        self.dll.debug.writeRegisters(range(16), mask = 0x0020)
+        self.assertEqual(self.dll.debug.readRegisters()["R5"], 5)
+        self.assertEqual(self.dll.debug.readRegisters()["R6"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+
+from contextlib import contextmanager
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from msp430dll.tests import benchOverhead
+
+#: Allowed slowdown against the committed baseline; generous, as machines differ from the one it was taken on.
+THRESHOLD = os.environ.get("MSP430DLL_BENCH_THRESHOLD", "1.0")
+
+
+class TestBenchOverhead(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.baseline = os.path.join(self.directory, "baseline.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @contextmanager
+    def quiet(self):
+        stdout, sys.stdout = sys.stdout, StringIO()
+        try:
+            yield
+        finally:
+            sys.stdout = stdout
+
+    def testRunAndCompare(self):
+        results = benchOverhead.run(scale = 0.01, includeImport = False)
+        names = [r.name for r in results]
+        self.assertIn("readMemory[1024]", names)
+        self.assertIn("traceDecode (per record)", names)
+        self.assertTrue(all(r.min <= r.median <= r.max for r in results))
+        args = ["--scale", "0.01", "--no-import"]
+        with self.quiet():
+            self.assertEqual(benchOverhead.main(args + ["--save", self.baseline]), 0)
+            self.assertEqual(benchOverhead.main(args + ["--compare", self.baseline, "--threshold", "1000"]), 0)
+            self.assertEqual(benchOverhead.main(args + ["--compare", self.baseline, "--threshold", "-1"]), 1)
+
+    @unittest.skipUnless(os.environ.get("MSP430DLL_BENCH"), "wall-clock timings; set MSP430DLL_BENCH=1 to compare")
+    def testCommittedBaseline(self):
+        with self.quiet():
+            status = benchOverhead.main(["--scale", "0.5", "--no-import", "--compare", "--threshold", THRESHOLD])
+        self.assertEqual(status, 0, "Python-layer overhead regressed against {0}".format(benchOverhead.BASELINE))
+
+
+if __name__ == '__main__':
+    unittest.main()
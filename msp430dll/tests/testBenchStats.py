@@ -0,0 +1,44 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from msp430dll.benchstats import BenchmarkResult, checkRegressions, loadBaseline, percentile, saveBaseline, summarize
+
+
+class TestBenchStats(unittest.TestCase):
+
+    def testPercentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertRaises(ValueError, percentile, [], 50)
+
+    def testSummarize(self):
+        result = summarize("f", [5, 1, 3, 2, 4])
+        self.assertEqual(result, BenchmarkResult("f", 5, 1, 3, 5, 5))
+
+    def testRegressions(self):
+        baseline = {"f": dict(min = 10, median = 10, p99 = 10), "g": dict(min = 10, median = 10, p99 = 10)}
+        results = [BenchmarkResult("f", 3, 10, 12, 10, 12), BenchmarkResult("g", 3, 10, 10, 10, 10),
+            BenchmarkResult("h", 3, 99, 99, 99, 99)]
+        regressions = checkRegressions(results, baseline, threshold = 0.1)
+        self.assertEqual([(r.name, r.metric) for r in regressions], [("f", "median")])
+        self.assertAlmostEqual(regressions[0].ratio, 1.2)
+        self.assertEqual(checkRegressions(results, baseline, threshold = 0.5), [])
+
+    def testBaselineRoundTrip(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, "baseline.json")
+            saveBaseline(filename, [summarize("f", [1.0, 2.0])])
+            baseline = loadBaseline(filename)
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(baseline, {"f": dict(name = "f", runs = 2, min = 1.0, median = 1.0, p99 = 2.0, max = 2.0)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+
+import unittest
+
+from msp430dll.breakpoint import BreakpointManager
+from msp430dll.devicedb import database
+from msp430dll.eem import BpMode, BpParameter, MAXTRIGGER
+from msp430dll.errors import MSPError
+
+
+class FakeEEM(object):
+
+    def __init__(self):
+        self.calls = []
+        self.reads = []
+        self.nextHandle = 1
+
+    def getBreakpoint(self, handle):
+        self.reads.append(handle)
+        return codeBreakpoint(0xf000 + handle)
+
+    def setBreakpoint(self, parameter, handle = 0):
+        self.calls.append((handle, int(parameter.bpMode), parameter.lAddrVal))
+        if handle == 0:
+            handle = self.nextHandle
+            self.nextHandle += 1
+        return handle
+
+
+def codeBreakpoint(address):
+    param = BpParameter()
+    param.bpMode = BpMode.BP_CODE
+    param.lAddrVal = address
+    return param
+
+
+class TestBreakpointManager(unittest.TestCase):
+
+    def setUp(self):
+        self.eem = FakeEEM()
+        self.manager = BreakpointManager(self.eem, maxBreakpoints = 3)
+
+    def testApplyOnlySendsChanges(self):
+        handles = self.manager.apply([codeBreakpoint(0xf800), codeBreakpoint(0xf810)])
+        self.assertEqual(handles, [1, 2])
+        self.assertEqual(len(self.eem.calls), 2)
+        handles = self.manager.apply([codeBreakpoint(0xf810), codeBreakpoint(0xf800)])
+        self.assertEqual(handles, [2, 1])
+        self.assertEqual(len(self.eem.calls), 2)
+
+    def testStaleHandlesAreReused(self):
+        self.manager.apply([codeBreakpoint(0xf800), codeBreakpoint(0xf810)])
+        handles = self.manager.apply([codeBreakpoint(0xf820)])
+        self.assertEqual(handles, [1])
+        self.assertEqual(self.eem.calls[2:], [(1, BpMode.BP_CODE, 0xf820), (2, BpMode.BP_CLEAR, 0)])
+        self.assertEqual(self.manager.handles, [1])
+
+    def testGetBreakpointFromShadow(self):
+        handle = self.manager.add(codeBreakpoint(0xf800))
+        calls = self.manager.dllCalls
+        self.assertEqual(self.manager.getBreakpoint(handle).lAddrVal, 0xf800)
+        self.assertEqual(self.manager.dllCalls, calls)
+
+    def testGetForeignBreakpoint(self):
+        self.assertEqual(self.manager.getBreakpoint(7).lAddrVal, 0xf007)
+        self.assertEqual(self.manager.getBreakpoint(7).lAddrVal, 0xf007)
+        self.assertEqual(self.eem.reads, [7, 7])
+        self.assertNotIn(7, self.manager)
+        self.assertEqual(self.manager.handles, [])
+
+    def testDeviceLimit(self):
+        manager = BreakpointManager(self.eem, device = database().device("MSP430F2274"))
+        self.assertEqual(manager.maxBreakpoints, 2)
+        self.assertRaises(MSPError, manager.apply, [codeBreakpoint(addr) for addr in range(0xf800, 0xf806, 2)])
+        self.assertEqual(BreakpointManager(self.eem).maxBreakpoints, MAXTRIGGER)
+
+    def testResourceLimit(self):
+        with self.assertRaises(MSPError):
+            self.manager.apply([codeBreakpoint(addr) for addr in range(0xf800, 0xf808, 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+from msp430dll import DLL
+from msp430dll.broker import Broker, BrokerClient, BrokerServer, decodeValue, encodeValue
+from msp430dll.errors import ErrorType, MSPError
+from msp430dll.simulator import SimulatedLibrary
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "requires Unix domain sockets")
+class TestBroker(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "broker.sock")
+        self.libraries = []
+        self.broker = Broker(idleTimeout = 60.0, factory = self.factory)
+        self.server = BrokerServer(self.path, self.broker, reapInterval = 60.0)
+        self.thread = threading.Thread(target = self.server.serve_forever, kwargs = dict(poll_interval = 0.01))
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.directory)
+
+    def factory(self, port):
+        library = SimulatedLibrary("MSP430F5529")
+        self.libraries.append(library)
+        return DLL(library = library)
+
+    def testEncoding(self):
+        value = [b"\x00\xff", {'a': (1, None)}, True]
+        self.assertEqual(decodeValue(encodeValue(value)), [b"\x00\xff", {'a': [1, None]}, True])
+        self.assertRaises(TypeError, encodeValue, object())
+
+    def testWarmSession(self):
+        with BrokerClient(self.path) as client:
+            with client.acquire("SIM0") as lease:
+                self.assertEqual(lease.device['string'], b"MSP430F5529")
+                lease.base.writeMemory(0x2400, b"\x12\x34")
+            with client.acquire("SIM0") as lease:
+                self.assertEqual(lease.base.readMemory(0x2400, None, 2), b"\x12\x34")
+                self.assertEqual(lease.debug.readRegisters()["R4"], 0)
+                with self.assertRaises(MSPError) as cm:
+                    lease.base.readMemory(0x100000, None, 2)
+                self.assertEqual(cm.exception.errno, ErrorType.READ_MEMORY_ERR)
+                self.assertRaises(MSPError, lease.base.close)
+            status, = client.status()
+        self.assertEqual(len(self.libraries), 1)
+        self.assertEqual((status['opens'], status['calls'], status['errors']), (1, 4, 1))
+        self.assertEqual(status['state'], "degraded")
+        self.assertFalse(status['leased'])
+
+    def testExclusiveLease(self):
+        first = BrokerClient(self.path)
+        second = BrokerClient(self.path)
+        lease = first.acquire("SIM0")
+        with self.assertRaises(MSPError) as cm:
+            second.acquire("SIM0", timeout = 0.05)
+        self.assertEqual(cm.exception.errno, ErrorType.USB_FET_BUSY_ERR)
+        self.assertRaises(MSPError, second.request, op = "call", lease = lease.leaseId, api = "base",
+            method = "getVCC")
+        self.assertRaises(MSPError, second.request, op = "release", lease = lease.leaseId)
+        self.assertEqual(self.broker.status()[0]['leased'], True)
+        first.close()   # Disconnecting releases the lease.
+        second.acquire("SIM0", timeout = 5.0).release()
+        second.close()
+
+    def testSharedDll(self):
+        dll = self.factory("SIM0")
+        broker = Broker(idleTimeout = 0.0, factory = lambda port: dll)
+        leaseId, first = broker.acquire("SIM0")
+        with self.assertRaises(MSPError) as cm:
+            broker.acquire("SIM1", timeout = 0.05)
+        self.assertEqual(cm.exception.errno, ErrorType.USB_FET_BUSY_ERR)
+        broker.release(leaseId)
+        leaseId, second = broker.acquire("SIM1", timeout = 1.0)
+        self.assertFalse(first.isOpen)
+        self.assertEqual((first.opens, second.opens), (1, 1))
+        self.assertEqual(broker.reapIdle(), [])     # "SIM0" is idle, but its DLL is in use.
+        broker.release(leaseId)
+        broker.shutdown()
+
+    def testAllowlist(self):
+        with BrokerClient(self.path) as client:
+            with client.acquire("SIM0") as lease:
+                for api, method, args in (("base", "MSP430_Memory", [0x2400, b"\x00", 16, 1]),
+                        ("base", "readOutFile", [0, 16, "out.txt"]), ("base", "secure", []),
+                        ("base", "initialize", []), ("base", "readMemory", [0x2400, b"\x00", 16]),
+                        ("eem", "init", [None, 0, None]), ("logger", "info", ["x"])):
+                    with self.assertRaises(MSPError) as cm:
+                        lease.call(api, method, *args)
+                    self.assertEqual(cm.exception.errno, ErrorType.PARAMETER_ERR)
+                self.assertEqual(lease.base.readMemory(0x2400, None, 2), b"\x00\x00")
+        self.assertEqual(self.broker.status()[0]['calls'], 1)
+
+    def testSocketPath(self):
+        self.assertRaises(MSPError, BrokerServer, self.path, self.broker)
+        stale = os.path.join(self.directory, "stale.sock")
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(stale)
+        listener.close()
+        BrokerServer(stale, Broker(factory = self.factory)).server_close()
+        self.assertFalse(os.path.exists(stale))
+        regular = os.path.join(self.directory, "file")
+        open(regular, "w").close()
+        self.assertRaises(MSPError, BrokerServer, regular, self.broker)
+        self.assertTrue(os.path.exists(regular))
+
+    def testIdleTimeout(self):
+        with BrokerClient(self.path) as client:
+            client.acquire("SIM0").release()
+        self.broker.idleTimeout = 0.0
+        self.assertEqual(self.broker.reapIdle(), ["SIM0"])
+        self.assertFalse(self.libraries[0].opened)
+        self.assertEqual(self.broker.status(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
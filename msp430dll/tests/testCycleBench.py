@@ -0,0 +1,65 @@
+import unittest
+
+from msp430dll import DLL
+from msp430dll.benchstats import BenchmarkResult
+from msp430dll.cyclebench import CycleBenchmark
+from msp430dll.debug import RUN_MODES, STATE_MODES
+from msp430dll.errors import ErrorType, MSPError
+from msp430dll.simulator import SimulatedLibrary
+
+
+class ScriptedExecutor(object):
+    """Stops at the next (pc, cycles) pair of the script on every run."""
+
+    def __init__(self, library, script):
+        self.library = library
+        self.script = list(script)
+
+    def __call__(self, mode):
+        if mode != RUN_MODES.RUN_TO_BREAKPOINT or not self.script:
+            return STATE_MODES.RUNNING
+        pc, cycles = self.script.pop(0)
+        self.library.registers[0] = pc
+        self.library.cyclesPerRun = cycles
+        return STATE_MODES.BREAKPOINT_HIT
+
+
+class TestCycleBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.library = SimulatedLibrary("MSP430F5529")
+        self.dll = DLL(library = self.library)
+        self.dll.base.initialize()
+        self.dll.base.openDevice()
+        self.bench = CycleBenchmark(self.dll, timeout = 0.05, pollInterval = 0)
+
+    def testMeasureCall(self):
+        self.library.executor = ScriptedExecutor(self.library, [(0x4500, c) for c in (120, 100, 110)])
+        result = self.bench.measureCall("f", 0x4400, 0x4500, 0x2400, runs = 3, registers = {12: 0x55})
+        self.assertEqual(result, BenchmarkResult("f", 3, 100, 110, 120, 120))
+        self.assertEqual(self.dll.base.readMemory(0x23fe, None, 2).raw, b"\x00\x45")
+        self.assertEqual(self.library.registers[1], 0x23fe)
+        self.assertEqual(self.library.registers[12], 0x55)
+
+    def testMeasureRange(self):
+        script = [(0x4400, 7), (0x4420, 30), (0x4400, 7), (0x4420, 40)]
+        self.library.executor = ScriptedExecutor(self.library, script)
+        result = self.bench.measureRange("loop", 0x4400, 0x4420, runs = 2)
+        self.assertEqual((result.min, result.max), (30, 40))
+        self.assertEqual(len(self.bench.breakpoints), 2)
+
+    def testWrongStop(self):
+        self.library.executor = ScriptedExecutor(self.library, [(0x4410, 10)])
+        with self.assertRaises(MSPError) as cm:
+            self.bench.measureCall("f", 0x4400, 0x4500, 0x2400, runs = 1)
+        self.assertEqual(cm.exception.errno, ErrorType.RUN_ERR)
+
+    def testTimeout(self):
+        self.library.executor = ScriptedExecutor(self.library, [])
+        with self.assertRaises(MSPError) as cm:
+            self.bench.measureCall("f", 0x4400, 0x4500, 0x2400, runs = 1)
+        self.assertEqual(cm.exception.errno, ErrorType.RUN_ERR)
+
+
+if __name__ == '__main__':
+    unittest.main()
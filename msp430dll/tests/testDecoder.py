@@ -0,0 +1,61 @@
+
+import ctypes
+import unittest
+
+from msp430dll.base import DeviceDecoder, DeviceStructureNT, _DeviceStructure
+from msp430dll.decoder import RecordDecoder
+from msp430dll.eem import TraceBuffer, TraceBufferDecoder, VwDataType, VwResources, VwResourcesDecoder
+
+
+class Unpacked(ctypes.Structure):
+    _fields_ = [
+        ("a", ctypes.c_uint8),
+        ("b", ctypes.c_uint32),
+        ("c", ctypes.c_int16 * 3),
+    ]
+
+
+class TestRecordDecoder(unittest.TestCase):
+
+    def testDeviceStructure(self):
+        device = _DeviceStructure()
+        device.endian = 0xaa55
+        device.mainEnd = 0xffff
+        device.hasFramMemory = 1
+        ctypes.memmove(device.string, b"MSP430F20x3", 11)
+        result = DeviceDecoder.decode(device)
+        self.assertIsInstance(result, DeviceStructureNT)
+        self.assertEqual(result.endian, 0xaa55)
+        self.assertEqual(result.string, b"MSP430F20x3")
+        self.assertEqual(result.mainEnd, 0xffff)
+        self.assertEqual(result.hasFramMemory, 1)
+
+    def testStringIsBounded(self):
+        buf = ctypes.create_string_buffer(b"\x55\xaa\x01\x00" + b"X" * 40, ctypes.sizeof(_DeviceStructure))
+        self.assertEqual(DeviceDecoder.decode(buf).string, b"X" * 32)
+
+    def testPadding(self):
+        decoder = RecordDecoder(Unpacked)
+        self.assertEqual(decoder.size, ctypes.sizeof(Unpacked))
+        record = Unpacked(7, 0x12345678)
+        record.c[1] = -2
+        self.assertEqual(tuple(decoder.decode(record)), (7, 0x12345678, (0, -2, 0)))
+
+    def testBulk(self):
+        records = (TraceBuffer * 4)()
+        for idx, record in enumerate(records):
+            record.lTrBufMAB = 0xf800 + idx
+            record.wTrBufCNTRL = idx
+        result = TraceBufferDecoder.decodeMany(records, 3)
+        self.assertEqual([r.lTrBufMAB for r in result], [0xf800, 0xf801, 0xf802])
+        self.assertEqual(result[2].wTrBufCNTRL, 2)
+
+    def testEnumMapping(self):
+        resources = (VwResources * 2)()
+        resources[1].vwDataType = VwDataType.VW_32
+        result = VwResourcesDecoder.decodeMany(resources, 2)
+        self.assertIs(result[1].vwDataType, VwDataType.VW_32)
+
+
+if __name__ == '__main__':
+    unittest.main()
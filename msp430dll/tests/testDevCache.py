@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from msp430dll import DLL
+from msp430dll.devcache import CACHE_VERSION, DeviceCache
+from msp430dll.logger import Logger
+from msp430dll.simulator import SimulatedLibrary, STATUS_OK
+from msp430dll.utils import saveJson
+
+
+class RecordingLibrary(SimulatedLibrary):
+    """Records the names passed to `MSP430_OpenDevice`; `anyName` accepts every name like a lenient DLL."""
+
+    def __init__(self, device, anyName = False, **kws):
+        super(RecordingLibrary, self).__init__(device, **kws)
+        self.anyName = anyName
+        self.openedNames = []
+
+    def _OpenDevice(self, device, password, passwordLength, deviceCode, setId):
+        self.openedNames.append(device.value if hasattr(device, "value") else device)
+        if self.anyName:
+            self.opened = True
+            return STATUS_OK, 0
+        return super(RecordingLibrary, self)._OpenDevice(device, password, passwordLength, deviceCode, setId)
+
+
+class TestDeviceCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "devices.json")
+        self.level = Logger().logger.level
+        Logger().silent()
+
+    def tearDown(self):
+        Logger().setLevel(self.level)
+        shutil.rmtree(self.directory)
+
+    def connect(self, library, cache = None):
+        cache = cache or DeviceCache(self.filename)
+        base = DLL(library = library).base
+        base.initialize()
+        return cache, cache.openDevice(base, "SIM0")
+
+    def testMissThenHit(self):
+        library = RecordingLibrary("MSP430F20x3")
+        cache, device = self.connect(library)
+        self.assertEqual(device.string, b"MSP430F20x3")
+        self.assertEqual(len(cache.stats.detected), 1)
+        self.assertIsNotNone(cache.lookup("SIM0", 0x91))
+        library = RecordingLibrary("MSP430F20x3")
+        cache, device = self.connect(library)
+        self.assertEqual(device.string, b"MSP430F20x3")
+        self.assertEqual(library.openedNames, [b"MSP430F20x3"])
+        self.assertEqual((len(cache.stats.cached), len(cache.stats.detected)), (1, 0))
+
+    def testOtherPartRefused(self):
+        self.connect(RecordingLibrary("MSP430F20x3"))
+        library = RecordingLibrary("MSP430F5529")
+        cache, device = self.connect(library)
+        self.assertEqual(device.string, b"MSP430F5529")
+        self.assertEqual(cache.stats.fallbacks, 1)
+        self.assertEqual(cache.lookup("SIM0", 0x91)[0], "MSP430F5529")
+
+    def testOtherPartOpenedByName(self):
+        self.connect(RecordingLibrary("MSP430F20x3"))
+        library = RecordingLibrary("MSP430F5529", anyName = True)
+        cache, device = self.connect(library)
+        self.assertEqual(device.string, b"MSP430F5529")
+        self.assertEqual(library.openedNames[0], b"MSP430F20x3")
+        self.assertEqual(cache.stats.fallbacks, 1)
+        self.assertEqual(cache.lookup("SIM0", 0x91)[0], "MSP430F5529")
+
+    def testInvalidation(self):
+        cache, _ = self.connect(RecordingLibrary("MSP430F20x3"))
+        cache.invalidate("SIM0", 0x91)
+        self.assertIsNone(DeviceCache(self.filename).lookup("SIM0", 0x91))
+        saveJson(self.filename, dict(version = CACHE_VERSION, devices = {DeviceCache.key("SIM0", 0x91): dict(name = "x")}))
+        cache = DeviceCache(self.filename)
+        self.assertIsNone(cache.lookup("SIM0", 0x91))
+        self.assertEqual(cache.entries, {})
+        saveJson(self.filename, dict(version = CACHE_VERSION + 1, devices = {DeviceCache.key("SIM0", 0x91): {}}))
+        self.assertEqual(DeviceCache(self.filename).entries, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
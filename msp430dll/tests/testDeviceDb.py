@@ -0,0 +1,86 @@
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from msp430dll import DLL
+from msp430dll.devicedb import DeviceDatabase, MemoryMap
+from msp430dll.simulator import SimulatedLibrary
+
+
+class TestDeviceDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db = DeviceDatabase(os.path.join(self.directory, "devices.csv"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testLookup(self):
+        entry = self.db.lookup("msp430f20x3")
+        self.assertEqual(entry.device.mainStart, 0xf800)
+        self.assertEqual(entry.device.jtagId, 0x89)
+        self.assertIsNone(self.db.lookupId(0))
+        self.assertIsNone(self.db.lookup("MSP430X999"))
+        self.assertRaises(KeyError, self.db.device, "MSP430X999")
+
+    def testUserEntry(self):
+        device = self.db.device("MSP430F20x3")._replace(id = 4711)
+        self.db.add(device, name = "MSP430TEST")
+        other = DeviceDatabase(self.db.userFile)
+        self.assertEqual(other.lookupId(4711).name, "MSP430TEST")
+        self.assertIn("MSP430F20x3", other)
+
+    def testImportDll(self):
+        base = DLL(library = SimulatedLibrary("MSP430F20x3")).base
+        count = self.db.importDll(base)
+        self.assertEqual(count, len(DeviceDatabase(os.devnull)))
+        names = self.db.names()
+        for name in ("MSP430F20x3", "MSP430F5529", "MSP430FR2433"):
+            entry = self.db.lookupId(names.index(name))
+            self.assertEqual(entry.name, name)
+            self.assertEqual(entry.device.mainStart, self.db.device(name).mainStart)
+        self.assertEqual(self.db.lookup("MSP430F149").infoSegmentSize, 128)
+        other = DeviceDatabase(self.db.userFile)
+        self.assertEqual(other.lookupId(names.index("MSP430G2553")).name, "MSP430G2553")
+
+
+class TestMemoryMap(unittest.TestCase):
+
+    def setUp(self):
+        self.map = DeviceDatabase(os.devnull).memoryMap("MSP430F20x3")
+
+    def testRegions(self):
+        self.assertEqual(self.map.regionOf(0x0210).name, "RAM")
+        self.assertEqual(self.map.regionOf(0x1040).name, "INFO")
+        self.assertIsNone(self.map.regionOf(0x0300))
+        self.assertTrue(self.map.isFlash(0xfffe))
+        self.assertFalse(self.map.isFlash(0x0200))
+
+    def testSegments(self):
+        self.assertEqual(self.map.segmentOf(0xf9fe), (0xf800, 512))
+        self.assertEqual(self.map.segmentOf(0x1041), (0x1040, 64))
+        self.assertIsNone(self.map.segmentOf(0x0200))
+        self.assertEqual(self.map.eraseSegments(0xf9f0, 0x20), [(0xf800, 512), (0xfa00, 512)])
+        self.assertEqual(self.map.eraseSegments(0x0200, 0x10000), [(0x1000, 64), (0x1040, 64), (0x1080, 64),
+            (0x10c0, 64), (0xf800, 512), (0xfa00, 512), (0xfc00, 512), (0xfe00, 512)])
+        self.assertEqual(self.map.nextBoundary(0x0200), 0x0280)
+        self.assertEqual(self.map.nextBoundary(0x0300), 0x1000)
+        self.assertIsNone(self.map.nextBoundary(0x10000))
+
+    def testValidate(self):
+        self.assertEqual(self.map.validate(0xf800, 0x800), [])
+        self.assertEqual(self.map.validate(0x0270, 0x20), [(0x0280, 0x028f)])
+
+    def testFram(self):
+        fram = DeviceDatabase(os.devnull).device("MSP430FR5969")
+        memoryMap = MemoryMap(fram)
+        self.assertFalse(memoryMap.isFlash(fram.mainStart))
+        self.assertIsNone(memoryMap.segmentOf(fram.mainStart))
+        self.assertEqual(memoryMap.eraseSegments(0, 0x100000), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
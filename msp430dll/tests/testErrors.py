@@ -0,0 +1,25 @@
+
+import unittest
+
+from msp430dll.errors import ERROR_MAP, ErrorType
+
+
+class TestErrorCodes(unittest.TestCase):
+
+    def testErrorCodeInEnum(self):
+        self.assertEqual(ErrorType['PRESERVE_RESTORE_ERR'], 12)
+
+    def testErrorCodeInNotEnum(self):
+        with self.assertRaises(KeyError):
+            value = ErrorType['FooBar']
+
+    def testErrorCodeInErrorMap(self):
+        self.assertEqual(ERROR_MAP[ErrorType.USB_FET_NOT_FOUND_ERR], 'Could not find MSP-FET430UIF on specified COM port')
+
+    def testErrorCodeInNotErrorMap(self):
+        with self.assertRaises(KeyError):
+            value = ERROR_MAP['FooBar']
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import threading
+import time
+import unittest
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from msp430dll import DLL
+from msp430dll.debug import RUN_MODES
+from msp430dll.eem import BpMode, BpParameter, MessageType
+from msp430dll.events import Backpressure, EventBus, Subscription
+from msp430dll.logger import Logger
+from msp430dll.simulator import SimulatedLibrary
+
+TIMEOUT = 5.0
+
+
+class BlockingCallback(object):
+
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.events = []
+
+    def __call__(self, event):
+        self.entered.set()
+        self.release.wait(TIMEOUT)
+        self.events.append(event.wParam)
+
+
+def waitFor(condition):
+    deadline = time.time() + TIMEOUT
+    while not condition() and time.time() < deadline:
+        time.sleep(0.001)
+    return condition()
+
+
+class TestEventBus(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = EventBus()
+
+    def tearDown(self):
+        self.bus.stop()
+        for subscription in self.bus.subscribers:
+            subscription.close()
+
+    def post(self, *params):
+        for param in params:
+            self.bus._enqueue(MessageType.WMX_BREKAPOINT, param, 0, 0)
+
+    def testDispatcherDeliversSimulatorEvents(self):
+        library = SimulatedLibrary("MSP430F20x3")
+        dll = DLL(library = library)
+        dll.base.initialize()
+        dll.base.openDevice()
+        self.bus.attach(dll.eem)
+        self.bus.start()
+        received = queue.Queue()
+        self.bus.subscribe(received.put, messageTypes = [MessageType.WMX_BREKAPOINT])
+        parameter = BpParameter()
+        parameter.bpMode = BpMode.BP_CODE
+        parameter.lAddrVal = 0xf820
+        dll.eem.setBreakpoint(parameter)
+        dll.debug.run(RUN_MODES.RUN_TO_BREAKPOINT, False)
+        dll.debug.run(RUN_MODES.SINGLE_STEP, False)
+        event = received.get(timeout = TIMEOUT)
+        self.assertEqual(event.msgId, MessageType.WMX_BREKAPOINT)
+        self.assertTrue(waitFor(lambda: self.bus.received == 2))
+        self.assertTrue(received.empty())
+
+    def testDropNewest(self):
+        callback = BlockingCallback()
+        subscription = self.bus.subscribe(callback, maxPending = 2, policy = Backpressure.DROP_NEWEST)
+        self.post(1)
+        self.bus.dispatchPending()
+        self.assertTrue(callback.entered.wait(TIMEOUT))
+        self.post(2, 3, 4)
+        self.bus.dispatchPending()
+        self.assertEqual(subscription.dropped, 1)
+        callback.release.set()
+        self.assertTrue(waitFor(lambda: subscription.delivered == 3))
+        self.assertEqual(callback.events, [1, 2, 3])
+
+    def testDropOldest(self):
+        callback = BlockingCallback()
+        subscription = self.bus.subscribe(callback, maxPending = 2, policy = Backpressure.DROP_OLDEST)
+        self.post(1)
+        self.bus.dispatchPending()
+        self.assertTrue(callback.entered.wait(TIMEOUT))
+        self.post(2, 3, 4)
+        self.bus.dispatchPending()
+        callback.release.set()
+        self.assertTrue(waitFor(lambda: subscription.delivered == 3))
+        self.assertEqual(callback.events, [1, 3, 4])
+
+    def testQueueOverflowAndUnsubscribe(self):
+        bounded = queue.Queue(maxsize = 1)
+        subscription = self.bus.subscribeQueue(bounded)
+        self.post(1, 2, 3)
+        self.assertEqual(self.bus.dispatchPending(), 3)
+        self.assertEqual((subscription.delivered, subscription.dropped), (1, 2))
+        subscription.close()
+        self.assertEqual(self.bus.subscribers, [])
+        self.assertEqual(self.bus.dropped, 2)
+        self.post(4)
+        self.bus.dispatchPending()
+        self.assertEqual(bounded.qsize(), 1)
+        self.assertEqual(self.bus.dropped, 2)
+
+    def testFilter(self):
+        received = queue.Queue()
+        self.bus.subscribeQueue(received, messageTypes = [MessageType.WMX_STATE])
+        self.post(1)
+        self.bus._enqueue(MessageType.WMX_STATE, 7, 0, 0)
+        self.bus.dispatchPending()
+        self.assertEqual(received.get_nowait().wParam, 7)
+        self.assertTrue(received.empty())
+
+    def testNextEvent(self):
+        try:
+            import asyncio
+        except ImportError:
+            self.skipTest("asyncio not available")
+        self.assertRaises(RuntimeError, self.bus.nextEvent)     # Outside of a running loop.
+        self.bus.start()
+        loop = asyncio.new_event_loop()
+        try:
+            future = self.bus.nextEvent(loop = loop)
+            self.post(42)
+            event = loop.run_until_complete(asyncio.wait_for(future, TIMEOUT))
+        finally:
+            loop.close()
+        self.assertEqual(event.wParam, 42)
+        self.assertEqual(self.bus.subscribers, [])
+
+    def testRaisingSubscription(self):
+        class Raising(Subscription):
+            def offer(self, event):
+                raise RuntimeError("broken subscriber")
+        self.bus._add(Raising(self.bus, None))
+        received = queue.Queue()
+        self.bus.subscribeQueue(received)
+        self.bus.start()
+        level = Logger().logger.level
+        Logger().silent()
+        try:
+            self.post(1, 2)
+            self.assertEqual(received.get(timeout = TIMEOUT).wParam, 1)
+            self.assertEqual(received.get(timeout = TIMEOUT).wParam, 2)
+        finally:
+            Logger().setLevel(level)
+
+    def testAbstractSubscription(self):
+        self.assertRaises(TypeError, Subscription, self.bus, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
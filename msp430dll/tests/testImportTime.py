@@ -0,0 +1,60 @@
+
+import os
+import subprocess
+import sys
+import unittest
+
+import msp430dll
+
+IMPORT_BUDGET_US = 50000     # `import msp430dll` took ~60ms before submodules were loaded lazily, ~8ms after.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(msp430dll.__file__)))
+
+
+def importTimes(statement):
+    """Run `statement` under `python -X importtime`; returns {module: cumulative microseconds}."""
+    process = subprocess.Popen([sys.executable, "-X", "importtime", "-c", statement], cwd = ROOT,
+        stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+    _, stderr = process.communicate()
+    result = {}
+    for line in stderr.decode("ascii", "replace").splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line[len("import time:") : ].split("|")
+        try:
+            result[module.strip()] = int(cumulative)
+        except ValueError:
+            pass    # Header line.
+    return result
+
+
+@unittest.skipIf(sys.version_info < (3, 7), "-X importtime and PEP 562 require Python 3.7")
+class TestImportTime(unittest.TestCase):
+
+    def testPackageImportIsLazy(self):
+        modules = importTimes("import msp430dll")
+        self.assertIn("msp430dll", modules)
+        for heavy in ("msp430dll.base", "msp430dll.debug", "msp430dll.eem", "ctypes", "unittest", "logging"):
+            self.assertNotIn(heavy, modules)
+
+    def testImportBudget(self):
+        modules = importTimes("import msp430dll")
+        self.assertLess(modules["msp430dll"], IMPORT_BUDGET_US)
+
+    def testLazyApis(self):
+        from msp430dll.simulator import SimulatedLibrary
+        dll = msp430dll.DLL(library = SimulatedLibrary())
+        self.assertNotIn("debug", dll.__dict__)
+        self.assertNotIn("eem", dll.__dict__)
+        debug = dll.debug
+        self.assertIs(dll.__dict__["debug"], debug)
+        self.assertEqual(debug.errorNumber, dll.base.errorNumber)
+
+    def testLazyAttributes(self):
+        from msp430dll.base import BaseAPI
+        self.assertIs(msp430dll.BaseAPI, BaseAPI)
+        self.assertRaises(AttributeError, getattr, msp430dll, "NoSuchThing")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+
+import json
+import unittest
+
+from msp430dll import DLL
+from msp430dll.api import API
+from msp430dll.errors import ErrorType, MSPError
+from msp430dll.instrument import Histogram, Instrumentation
+from msp430dll.simulator import SimulatedLibrary
+
+
+class FakeFunction(object):
+
+    def __init__(self, result = 0):
+        self.result = result
+        self.argtypes = None
+        self.restype = None
+
+    def __call__(self, *args):
+        if self.result is None:
+            raise ValueError("failed")
+        return self.result
+
+
+class FakeLibrary(object):
+
+    def __init__(self):
+        self.MSP430_Memory = FakeFunction()
+        self.MSP430_Run = FakeFunction(None)
+
+
+class FakeAPI(API):
+
+    FUNCTIONS = (
+        ("MSP430_Memory", None, []),
+        ("MSP430_Run", None, []),
+        ("MSP430_Missing", None, []),
+    )
+
+
+class FakeDLL(object):
+
+    def __init__(self):
+        library = FakeLibrary()
+        self.base = FakeAPI(self, library)
+        self.debug = FakeAPI(self, library)
+        self.eem = FakeAPI(self, library)
+
+
+class TestHistogram(unittest.TestCase):
+
+    def testBuckets(self):
+        histogram = Histogram((1.0, 2.0, 4.0))
+        for value in (0.5, 1.5, 1.5, 3.0, 10.0):
+            histogram.record(value)
+        self.assertEqual(histogram.counts, [1, 2, 1, 1])
+        self.assertEqual(histogram.cumulative()[-1], (float('inf'), 5))
+        self.assertEqual(histogram.quantile(0.5), 2.0)
+        self.assertEqual(histogram.quantile(1.0), 10.0)
+        self.assertEqual(histogram.max, 10.0)
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def testLazyBinding(self):
+        dll = FakeDLL()
+        self.assertNotIn("MSP430_Memory", dll.base.__dict__)
+        self.assertTrue(dll.base.isImplemented("MSP430_Memory"))
+        self.assertIn("MSP430_Memory", dll.base.__dict__)
+        self.assertFalse(dll.base.isImplemented("MSP430_Missing"))
+        self.assertRaises(AttributeError, getattr, dll.base, "MSP430_Missing")
+        self.assertEqual(dll.base.unsupported, ["MSP430_Missing"])
+
+    def testInstallUninstall(self):
+        dll = FakeDLL()
+        raw = dll.base.MSP430_Memory
+        instrumentation = Instrumentation().install(dll)
+        self.assertIsNot(dll.base.MSP430_Memory, raw)
+        self.assertIs(dll.instrumentation, instrumentation)
+        dll.base.MSP430_Memory(0x200, None, 16, 1)
+        dll.debug.MSP430_Memory(0x200, None, 8, 0)
+        self.assertRaises(ValueError, dll.eem.MSP430_Run, 0, False)
+        stats = instrumentation.functions["MSP430_Memory"]
+        self.assertEqual((stats.calls, stats.bytesRead, stats.bytesWritten), (2, 16, 8))
+        self.assertEqual(instrumentation.functions["MSP430_Run"].errors, 1)
+        instrumentation.uninstall()
+        self.assertEqual(dll.base.MSP430_Memory, raw)
+        self.assertIsNone(dll.instrumentation)
+
+    def testFailedTransfer(self):
+        dll = DLL(library = SimulatedLibrary("MSP430F5529"))
+        dll.base.initialize()
+        dll.base.openDevice()
+        instrumentation = Instrumentation().install(dll)
+        dll.base.readMemory(0x2400, None, 4)
+        with self.assertRaises(MSPError) as cm:
+            dll.base.readMemory(0x100000, None, 16)
+        self.assertEqual(cm.exception.errno, ErrorType.READ_MEMORY_ERR)
+        stats = instrumentation.functions["MSP430_Memory"]
+        self.assertEqual((stats.calls, stats.errors, stats.bytesRead), (2, 1, 4))
+        instrumentation.uninstall()
+
+    def testExport(self):
+        dll = FakeDLL()
+        instrumentation = Instrumentation().install(dll)
+        dll.base.MSP430_Memory(0x200, None, 16, 1)
+        data = json.loads(instrumentation.toJson())
+        self.assertEqual(list(data), ["MSP430_Memory"])
+        self.assertEqual(data["MSP430_Memory"]["latency"]["count"], 1)
+        text = instrumentation.toPrometheus()
+        self.assertIn('msp430_dll_calls_total{function="MSP430_Memory"} 1', text)
+        self.assertIn('msp430_dll_bytes_total{function="MSP430_Memory",direction="read"} 16', text)
+        self.assertIn('msp430_dll_call_seconds_bucket{function="MSP430_Memory",le="+Inf"} 1', text)
+        self.assertIn("# TYPE msp430_dll_call_seconds histogram", text)
+
+
+if __name__ == '__main__':
+    unittest.main()
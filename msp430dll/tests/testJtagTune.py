@@ -0,0 +1,115 @@
+
+import ctypes
+import os
+import shutil
+import tempfile
+import unittest
+
+from msp430dll import DLL
+from msp430dll.base import ConfigModeType, InterfaceType
+from msp430dll.errors import ErrorType, MSPError
+from msp430dll.jtagtune import JtagTuner, readbackPatterns, TuningCache
+from msp430dll.logger import Logger
+from msp430dll.simulator import SimulatedLibrary
+
+
+class CableLibrary(SimulatedLibrary):
+    """Longer transfer times for slower speeds and Spy-Bi-Wire; JTAG at speed 0 corrupts reads."""
+
+    def _Memory(self, address, buffer, count, rw):
+        speed = self.config.get(ConfigModeType.JTAG_SPEED, 3)
+        interface = self.config.get(ConfigModeType.INTERFACE_MODE, InterfaceType.JTAG_IF)
+        self.latency.perByte = 1e-6 * (speed + 1) * (3 if interface == InterfaceType.SPYBIWIRE_IF else 1)
+        result = super(CableLibrary, self)._Memory(address, buffer, count, rw)
+        if rw == 1 and speed == 0 and interface == InterfaceType.JTAG_IF:
+            ctypes.memset(buffer, 0x5a, 1)
+        return result
+
+
+class TestJtagTune(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.library = CableLibrary("MSP430F2274")
+        self.dll = DLL(library = self.library)
+        self.dll.base.initialize("SIM0")
+        self.dll.base.openDevice()
+        self.device = self.dll.base.getFoundDevice()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def tuner(self):
+        return JtagTuner(self.dll.base, "SIM0", self.device, timer = lambda: self.library.latency.elapsed)
+
+    def testPatterns(self):
+        patterns = readbackPatterns(16)
+        self.assertEqual(len(patterns), 6)
+        self.assertTrue(all(len(p) == 16 for p in patterns))
+        self.assertEqual(len(readbackPatterns(15, 2)), 12)
+
+    def testSelect(self):
+        self.dll.base.writeMemory(self.device.ramStart, b"\x12\x34")
+        best, trials = self.tuner().run()
+        self.assertEqual(len(trials), 8)
+        self.assertEqual((best.interface, best.speed), (InterfaceType.JTAG_IF, 1))
+        self.assertEqual(trials[0].errorRate, 1.0)
+        self.assertEqual(self.library.config[ConfigModeType.JTAG_SPEED], 1)
+        self.assertEqual(self.dll.base.readMemory(self.device.ramStart, None, 2).raw, b"\x12\x34")
+
+    def testConnectSequence(self):
+        base = self.dll.base
+        calls = []
+
+        def recorder(name, method):
+            def record(*args, **kws):
+                calls.append(name)
+                return method(*args, **kws)
+            return record
+        for name in ("close", "initialize", "configure", "setVCC", "openDevice"):
+            setattr(base, name, recorder(name, getattr(base, name)))
+        JtagTuner(base, "SIM0", self.device, vcc = 3300).connect(InterfaceType.JTAG_IF, 2)
+        self.assertEqual(calls, ["close", "initialize", "configure", "configure", "setVCC", "openDevice"])
+        self.assertEqual(self.library.vcc, 3300)
+        del calls[:]
+        JtagTuner(base, "SIM0", self.device, vcc = None).connect()
+        self.assertEqual(calls, ["close", "initialize", "openDevice"])
+
+    def testRestoreAfterFailedConnect(self):
+        self.dll.base.writeMemory(self.device.ramStart, b"\x12\x34")
+        tuner = self.tuner()
+        connect = tuner.connect
+        calls = []
+
+        def failingConnect(interface = None, speed = None):
+            calls.append((interface, speed))
+            if len(calls) == 9:     # The final connect with the best setting.
+                self.dll.base.close()
+                raise MSPError("connect failed", errno = ErrorType.INITIALIZE_ERR)
+            connect(interface, speed)
+
+        tuner.connect = failingConnect
+        level = Logger().logger.level
+        Logger().silent()
+        try:
+            self.assertRaises(MSPError, tuner.run)
+        finally:
+            Logger().setLevel(level)
+        self.assertEqual(calls[-1], (None, None))
+        self.assertEqual(self.dll.base.readMemory(self.device.ramStart, None, 2).raw, b"\x12\x34")
+
+    def testCache(self):
+        filename = os.path.join(self.directory, "jtagtune.json")
+        cache = TuningCache(filename)
+        best = cache.tune(self.dll.base, "SIM0", self.device, timer = lambda: self.library.latency.elapsed)
+        self.assertEqual(best.speed, 1)
+        self.library.config.clear()
+        self.dll.base.close()
+        self.dll.base.initialize("SIM0")
+        self.assertEqual(TuningCache(filename).apply(self.dll.base, "SIM0"), (InterfaceType.JTAG_IF, 1))
+        self.assertEqual(self.library.config[ConfigModeType.INTERFACE_MODE], InterfaceType.JTAG_IF)
+        self.assertIsNone(TuningCache(filename).apply(self.dll.base, "SIM1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+
+import logging
+import unittest
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from msp430dll.logger import Logger
+
+
+class Counted(object):
+
+    def __init__(self):
+        self.count = 0
+
+    def __str__(self):
+        self.count += 1
+        return "counted"
+
+
+class TestLogger(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = Logger()
+        self.level = self.logger.logger.level
+        self.logger.setLevel(logging.WARN)
+
+    def tearDown(self):
+        Logger.disableRingBuffer()
+        self.logger.setLevel(self.level)
+
+    def testSingleHandler(self):
+        for _ in range(5):
+            Logger()
+        shared = logging.getLogger(Logger.LOGGER_BASE_NAME)
+        self.assertEqual([h for h in shared.handlers if isinstance(h, logging.StreamHandler)], [Logger._handler])
+
+    def testLazyArguments(self):
+        value = Counted()
+        self.logger.debug("value: %s", value)
+        self.assertEqual(value.count, 0)
+        self.assertEqual(self.logger.getLastError(), (None, None))
+
+    def testRingBuffer(self):
+        ring = Logger.enableRingBuffer(capacity = 2)
+        self.logger.silent()
+        self.logger.setLevel("DEBUG")
+        Logger._handler.setLevel(logging.CRITICAL)
+        try:
+            for idx in range(3):
+                self.logger.debug("message %d", idx)
+        finally:
+            Logger._handler.setLevel(logging.NOTSET)
+        self.assertEqual([r.getMessage() for r in ring.records()], ["message 1", "message 2"])
+        stream = StringIO()
+        Logger.dumpRecent(stream)
+        self.assertEqual(stream.getvalue().splitlines()[-1], "[DEBUG (msp430)]: message 2")
+
+    def testLastError(self):
+        Logger._handler.setLevel(logging.CRITICAL)
+        try:
+            self.logger.warn("failed with %d", 42)
+        finally:
+            Logger._handler.setLevel(logging.NOTSET)
+        self.assertEqual(self.logger.getLastError(), (logging.WARN, "failed with 42"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+
+import json
+import unittest
+
+from msp430dll import DLL
+from msp430dll.base import EnableDisableType
+from msp430dll.debug import RUN_MODES
+from msp430dll.errors import ErrorType, MSPError
+from msp430dll.msp430_info import beautifyEnumerator, collectInfo, inventory, inventoryTarget
+from msp430dll.simulator import SimulatedLibrary
+
+
+class RecordingLibrary(SimulatedLibrary):
+    """Records the `MSP430_Run` and `MSP430_Close` calls; `MSP430_OpenDevice` fails if `failOpen` is set."""
+
+    def __init__(self, *args, **kws):
+        super(RecordingLibrary, self).__init__(*args, **kws)
+        self.calls = []
+        self.failOpen = False
+
+    def _OpenDevice(self, device, password, passwordLength, deviceCode, setId):
+        self._require(not self.failOpen, ErrorType.NO_DEVICE_ERR)
+        return super(RecordingLibrary, self)._OpenDevice(device, password, passwordLength, deviceCode, setId)
+
+    def _Run(self, mode, releaseJtag):
+        self.calls.append(("run", mode.value if hasattr(mode, "value") else mode))
+        return super(RecordingLibrary, self)._Run(mode, releaseJtag)
+
+    def _Close(self, vccOff):
+        self.calls.append(("close", ))
+        return super(RecordingLibrary, self)._Close(vccOff)
+
+
+class TestInventory(unittest.TestCase):
+
+    def testBeautifyEnumerator(self):
+        self.assertEqual(beautifyEnumerator(EnableDisableType.ENABLE), "ENABLE")
+        self.assertEqual(beautifyEnumerator("ErrorType.NO_ERR"), "NO_ERR")
+
+    def testTarget(self):
+        target = inventoryTarget((".", "msp430", "SIM0", "MSP430F5529"))
+        self.assertEqual(target['port'], "SIM0")
+        self.assertEqual(target['device']['string'], "MSP430F5529")
+        self.assertEqual(target['architecture'], "CPU_ARCH_XV2")
+        self.assertIn("PC", target['registers'])
+        self.assertGreaterEqual(target['connectTime'], 0.0)
+
+    def testTargetReleased(self):
+        library = RecordingLibrary("MSP430F5529")
+        collectInfo(DLL(library = library), "SIM0")
+        self.assertEqual(library.calls, [("run", RUN_MODES.FREE_RUN), ("close", )])
+        library = RecordingLibrary("MSP430F5529")
+        library.failOpen = True
+        self.assertRaises(MSPError, collectInfo, DLL(library = library), "SIM0")
+        self.assertEqual(library.calls, [("close", )])     # Nothing to release.
+
+    def testError(self):
+        target = inventoryTarget((".", "msp430", "SIM0", "MSP430X999"))
+        self.assertEqual(set(target), set(['port', 'error']))
+        self.assertTrue(target['error'].startswith("KeyError"))
+
+    def testSerial(self):
+        result = inventory(".", "msp430", processes = 0, simulate = "MSP430F5529")
+        self.assertEqual([i['name'] for i in result['interfaces']], ["SIM0"])
+        self.assertEqual(len(result['targets']), 1)
+        json.dumps(result)
+
+    def testParallel(self):
+        result = inventory(".", "msp430", ["SIM0", "SIM1"], processes = 2, simulate = "MSP430F2274")
+        self.assertEqual([t['port'] for t in result['targets']], ["SIM0", "SIM1"])
+        self.assertEqual([t['device']['string'] for t in result['targets']], ["MSP430F2274"] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+
+import select
+import threading
+import unittest
+
+from msp430dll import DLL
+from msp430dll.base import SystemEventMSPType
+from msp430dll.debug import RUN_MODES
+from msp430dll.eem import MessageType
+from msp430dll.multiplex import EEM_EVENT, EventMultiplexer, SYSTEM_EVENT
+from msp430dll.simulator import SimulatedLibrary
+
+
+class HookedSocket(object):
+    """Calls `hook` once, at the first `recv()`."""
+
+    def __init__(self, sock, hook):
+        self.sock = sock
+        self.hook = hook
+
+    def recv(self, size):
+        hook, self.hook = self.hook, None
+        if hook is not None:
+            hook()
+        return self.sock.recv(size)
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+
+class TestMultiplexer(unittest.TestCase):
+
+    def setUp(self):
+        self.mux = EventMultiplexer()
+        self.libraries = {}
+        self.dlls = {}
+        for session in ("A", "B"):
+            library = self.libraries[session] = SimulatedLibrary("MSP430F5529")
+            dll = self.dlls[session] = DLL(library = library)
+            dll.base.initialize()
+            dll.base.openDevice()
+            self.mux.register(session, dll)
+
+    def tearDown(self):
+        self.mux.close()
+
+    def testTagging(self):
+        self.assertEqual(self.mux.poll(), [])
+        self.dlls["A"].debug.run(RUN_MODES.SINGLE_STEP, False)
+        self.libraries["B"].notify(SystemEventMSPType.DEVICE_IN_LPM5_MODE)
+        readable, _, _ = select.select([self.mux], [], [], 1.0)
+        self.assertEqual(readable, [self.mux])
+        events = self.mux.poll()
+        self.assertEqual([(e.session, e.kind) for e in events], [("A", EEM_EVENT), ("B", SYSTEM_EVENT)])
+        self.assertEqual(events[0].event.msgId, MessageType.WMX_SINGLESTEP)
+        self.assertEqual(events[1].event, SystemEventMSPType.DEVICE_IN_LPM5_MODE)
+        self.assertEqual(self.mux.received, {"A": 1, "B": 1})
+        self.assertEqual(self.mux.deliveryLatency.count, 2)
+        self.assertEqual(select.select([self.mux], [], [], 0.0)[0], [])
+
+    def testDispatchFromThreads(self):
+        def fire(session):
+            for _ in range(50):
+                self.libraries[session].notify(SystemEventMSPType.FET_CONNECTION_LOST)
+        threads = [threading.Thread(target = fire, args = (session, )) for session in ("A", "B")]
+        for thread in threads:
+            thread.start()
+        seen = []
+        while len(seen) < 100:
+            self.mux.dispatch(seen.append, timeout = 1.0)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(set(e.session for e in seen)), ["A", "B"])
+        self.assertEqual(self.mux.handlingLatency.count, 100)
+        self.assertIsNotNone(self.mux.handlingLatency.quantile(0.99))
+
+    def testEventWhileDraining(self):
+        notify = lambda: self.libraries["A"].notify(SystemEventMSPType.FET_RESTART_NEEDED)
+        self.mux._receiver = HookedSocket(self.mux._receiver, notify)
+        self.assertEqual(len(self.mux.poll()), 1)
+        notify()
+        self.assertEqual(select.select([self.mux], [], [], 1.0)[0], [self.mux])
+        self.assertEqual(len(self.mux.poll()), 1)
+
+    def testUnregister(self):
+        thunk = self.libraries["A"].eventCallback
+        self.mux.unregister("A")
+        self.assertIsNot(self.libraries["A"].eventCallback, thunk)
+        self.assertEqual(self.libraries["A"].eventIds.uiMsgIdSingleStep, 0)
+        self.libraries["A"].notify(SystemEventMSPType.FET_RESTART_NEEDED)
+        self.dlls["A"].debug.run(RUN_MODES.SINGLE_STEP, False)
+        self.assertEqual(self.mux.poll(0.01), [])
+        self.assertEqual(self.mux.sessions, ["B"])
+        self.assertRaises(KeyError, self.mux.register, "B", self.dlls["B"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+
+import gc
+import os
+import shutil
+import tempfile
+import unittest
+import weakref
+
+from msp430dll import DLL
+from msp430dll.errors import MSPError
+from msp430dll import replay as replayModule
+from msp430dll.replay import Memory, readLog, RecordingLibrary, ReplayLibrary
+
+
+class FakeFunction(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.argtypes = None
+        self.restype = None
+
+    def __call__(self, *args):
+        if self.name == "MSP430_Memory":
+            address, buf, count, rw = args
+            if rw == 1:
+                for idx in range(count):
+                    buf[idx] = chr((address + idx) & 0xff).encode("latin-1")
+        elif self.name == "MSP430_GetCurVCCT":
+            args[0]._obj.value = 3300
+        elif self.name == "MSP430_Registers":
+            for idx in range(16):
+                args[0][idx] = idx * 2
+        return 0
+
+
+class FakeLibrary(object):
+
+    _name = "fake"
+
+    def __getattr__(self, name):
+        if not name.startswith("MSP430_") or name == "MSP430_Identify":
+            raise AttributeError(name)
+        function = FakeFunction(name)
+        setattr(self, name, function)
+        return function
+
+
+class TestRecordReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "session.mspr")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def session(self, dll):
+        data = dll.base.readMemory(0x200, None, 8).raw
+        dll.base.writeMemory(0x200, b"\x01\x02")
+        voltage = dll.base.getVCC()
+        registers = dll.debug.readRegisters()
+        return data, voltage, registers["R3"], dll.base.isImplemented("MSP430_Identify")
+
+    def testRoundTrip(self):
+        recorder = RecordingLibrary(FakeLibrary(), self.filename)
+        recorded = self.session(DLL(library = recorder))
+        recorder.close()
+        self.assertEqual(recorded, (bytes(bytearray(range(8))), 3300, 6, False))
+
+        calls, missing = readLog(self.filename)
+        self.assertEqual(missing, set(["MSP430_Identify"]))
+        self.assertEqual([c.name for c in calls], ["MSP430_Memory", "MSP430_Memory", "MSP430_GetCurVCCT",
+            "MSP430_Registers"])
+        self.assertIsInstance(calls[1].args[1], Memory)
+        self.assertIsNone(calls[1].args[1].after)
+
+        replay = ReplayLibrary(self.filename)
+        dll = DLL(library = replay)
+        self.assertEqual(self.session(dll), recorded)
+        self.assertEqual(replay.remaining, 0)
+
+    def testDivergence(self):
+        recorder = RecordingLibrary(FakeLibrary(), self.filename)
+        DLL(library = recorder).base.readMemory(0x200, None, 8)
+        recorder.close()
+        dll = DLL(library = ReplayLibrary(self.filename))
+        self.assertRaises(MSPError, dll.base.readMemory, 0x300, None, 8)
+        self.assertRaises(MSPError, dll.base.getVCC)
+
+    def testRealtimeSpeed(self):
+        recorder = RecordingLibrary(FakeLibrary(), self.filename)
+        DLL(library = recorder).base.getVCC()
+        recorder.close()
+        calls, missing = readLog(self.filename)
+        calls = [call._replace(duration = 0.5) for call in calls]
+
+        class FakeTime(object):
+            sleeps = []
+            sleep = staticmethod(sleeps.append)
+        original, replayModule.time = replayModule.time, FakeTime
+        try:
+            DLL(library = ReplayLibrary((calls, missing), realtime = True, speed = 2.0)).base.getVCC()
+        finally:
+            replayModule.time = original
+        self.assertEqual(FakeTime.sleeps, [0.25])
+
+    def testInstancesNotCached(self):
+        library = FakeLibrary()
+        dll = DLL(library = library)
+        dll.base.readMemory(0x200, None, 8)
+        self.assertIsNot(DLL(library = library), dll)
+        references = (weakref.ref(library), weakref.ref(dll))
+        del library, dll
+        gc.collect()
+        self.assertEqual([r() for r in references], [None, None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+
+import unittest
+
+from msp430dll import DLL
+from msp430dll.base import EraseType, ReadWriteType
+from msp430dll.devicedb import database, MemoryMap
+from msp430dll.errors import BoardQuarantined, DeadlineExceeded, ErrorType, MSPError
+from msp430dll.retry import classify, Idempotency, RetryPolicy, verifiedRanges
+from msp430dll.simulator import SimulatedLibrary
+from msp430dll.watchdog import Watchdog
+
+
+class FlakyLibrary(SimulatedLibrary):
+    """`failures[name]` calls of `_<name>` fail with `errors[name]` (default COMM_ERR) after taking effect."""
+
+    def __init__(self, *args, **kws):
+        super(FlakyLibrary, self).__init__(*args, **kws)
+        self.failures = {}
+        self.errors = {}
+        self.corrupt = False
+
+    def _fail(self, name):
+        if self.failures.get(name):
+            self.failures[name] -= 1
+            self._require(False, self.errors.get(name, ErrorType.COMM_ERR))
+
+    def _Memory(self, address, buffer, count, rw):
+        result = super(FlakyLibrary, self)._Memory(address, buffer, count, rw)
+        if self.corrupt and rw == ReadWriteType.WRITE:
+            self.memory[address] ^= 0xff
+        self._fail("Memory")
+        return result
+
+    def _Register(self, register, number, rw):
+        result = super(FlakyLibrary, self)._Register(register, number, rw)
+        self._fail("Register")
+        return result
+
+    def _Erase(self, eraseType, address, length):
+        self._fail("Erase")
+        return super(FlakyLibrary, self)._Erase(eraseType, address, length)
+
+
+class TestRetry(unittest.TestCase):
+
+    def setUp(self):
+        self.library = FlakyLibrary("MSP430F5529")
+        self.dll = DLL(library = self.library)
+        self.dll.base.initialize()
+        self.dll.base.openDevice()
+        self.delays = []
+        self.policy = RetryPolicy(maxRetries = 3, baseDelay = 0.01, maxDelay = 0.03, sleep = self.delays.append,
+            random = lambda: 1.0).install(self.dll)
+        self.level = self.policy.logger.logger.level
+        self.policy.logger.silent()
+
+    def tearDown(self):
+        self.policy.uninstall()
+        self.policy.logger.setLevel(self.level)
+
+    def testClassify(self):
+        self.assertEqual(classify("MSP430_Memory", (0, None, 2, ReadWriteType.READ)), Idempotency.SAFE)
+        self.assertEqual(classify("MSP430_Memory", (0, None, 2, 0)), Idempotency.REPEATABLE)
+        self.assertEqual(classify("MSP430_State", ()), Idempotency.SAFE)
+        self.assertEqual(classify("MSP430_Erase", ()), Idempotency.UNSAFE)
+        self.assertEqual(classify("MSP430_Secure", ()), Idempotency.UNSAFE)
+        self.assertEqual(classify("MSP430_Unknown", ()), Idempotency.UNSAFE)
+
+    def testRetriedRead(self):
+        self.library.failures["Memory"] = 2
+        self.assertEqual(self.dll.base.readMemory(0x2400, None, 2).raw, b"\x00\x00")
+        self.assertEqual(self.delays, [0.01, 0.02])
+        counters = self.policy.snapshot()["MSP430_Memory"]["retries"]
+        self.assertEqual((counters['retries'], counters['recovered'], counters['exhausted']), (2, 1, 0))
+
+    def testExhausted(self):
+        self.library.failures["Memory"] = 10
+        with self.assertRaises(MSPError) as cm:
+            self.dll.base.readMemory(0x2400, None, 2)
+        self.assertEqual(cm.exception.errno, ErrorType.COMM_ERR)
+        self.assertEqual(self.delays, [0.01, 0.02, 0.03])
+        self.assertEqual(self.policy.counters("MSP430_Memory").exhausted, 1)
+
+    def testVerifiedWrite(self):
+        self.library.failures["Memory"] = 1
+        self.dll.base.writeMemory(0x2400, b"\x12\x34")
+        self.assertEqual(self.dll.base.readMemory(0x2400, None, 2).raw, b"\x12\x34")
+        self.library.failures["Register"] = 1
+        self.dll.debug.writeRegister(5, 0x4711)
+        self.assertEqual(self.dll.debug.readRegister(5), 0x4711)
+        self.assertEqual(self.policy.counters("MSP430_Register").recovered, 1)
+
+        self.library.failures["Memory"] = 1
+        self.library.corrupt = True
+        with self.assertRaises(MSPError) as cm:
+            self.dll.base.writeMemory(0x2400, b"\x12\x34")
+        self.assertEqual(cm.exception.errno, ErrorType.VERIFY_ERR)
+        self.assertEqual(self.policy.counters("MSP430_Memory").verifyFailures, 1)
+
+    def testPeripheralWriteNotVerified(self):
+        self.library.failures["Memory"] = 1
+        self.library.corrupt = True
+        self.dll.base.writeMemory(0x0100, b"\x12\x34")     # SFRs, may read back anything.
+        self.assertEqual(self.policy.counters("MSP430_Memory").verifyFailures, 0)
+
+    def testVerifiedRanges(self):
+        memoryMap = MemoryMap(database().device("MSP430F5529"))
+        self.assertEqual(verifiedRanges(memoryMap, 0x0100, 0x10), [])
+        self.assertEqual(verifiedRanges(memoryMap, 0x0ff0, 0x20), [(0x1000, 0x10)])
+        self.assertEqual(verifiedRanges(memoryMap, 0x23fe, 4), [(0x23fe, 2), (0x2400, 2)])
+
+    def testTimeoutNotRetried(self):
+        calls = []
+
+        def hanging(*args):
+            calls.append(args)
+            raise DeadlineExceeded("MSP430_Memory", 5.0)
+        args = (0x2400, None, 2, ReadWriteType.READ)
+        self.assertRaises(DeadlineExceeded, self.policy.call, "MSP430_Memory", hanging, args)
+        self.assertEqual((len(calls), self.delays), (1, []))
+        self.policy.retryTimeouts = True
+        self.assertRaises(DeadlineExceeded, self.policy.call, "MSP430_Memory", hanging, args)
+        self.assertEqual(len(calls), 5)
+
+    def testUnsafe(self):
+        self.library.failures["Erase"] = 1
+        self.assertRaises(MSPError, self.dll.base.erase, EraseType.ERASE_SEGMENT, 0x4400, 2)
+        self.assertEqual(self.policy.counters("MSP430_Erase").notRetried, 1)
+        self.assertEqual(self.delays, [])
+
+    def testPermanentError(self):
+        with self.assertRaises(MSPError) as cm:
+            self.dll.debug.readRegister(99)
+        self.assertEqual(cm.exception.errno, ErrorType.PARAMETER_ERR)
+        self.assertEqual(self.policy.retryStats, {})
+
+
+class TestRetryWithWatchdog(unittest.TestCase):
+
+    def setUp(self):
+        self.library = FlakyLibrary("MSP430F5529")
+        self.dll = DLL(library = self.library)
+        self.delays = []
+        self.watchdog = Watchdog(port = "SIM0", defaultDeadline = 1.0)
+        self.policy = RetryPolicy(inner = self.watchdog, sleep = self.delays.append, random = lambda: 1.0).install(self.dll)
+        self.level = self.policy.logger.logger.level
+        self.policy.logger.silent()
+        self.dll.base.initialize("SIM0")
+        self.dll.base.openDevice()
+
+    def tearDown(self):
+        self.policy.uninstall()
+        self.policy.logger.setLevel(self.level)
+
+    def testRetriedThroughWatchdog(self):
+        self.library.failures["Memory"] = 2
+        self.assertEqual(self.dll.base.readMemory(0x2400, None, 2).raw, b"\x00\x00")
+        self.assertEqual(self.policy.counters("MSP430_Memory").recovered, 1)
+        stats = self.policy.snapshot()["MSP430_Memory"]
+        self.assertEqual((stats['calls'], stats['errors'], stats['timeouts']), (3, 2, 0))
+        self.assertEqual(self.watchdog.recoveries + self.watchdog.failedRecoveries, 0)
+
+    def testVerifiedWriteThroughWatchdog(self):
+        self.library.failures["Memory"] = 1
+        self.library.corrupt = True
+        with self.assertRaises(MSPError) as cm:
+            self.dll.base.writeMemory(0x2400, b"\x12\x34")
+        self.assertEqual(cm.exception.errno, ErrorType.VERIFY_ERR)
+
+    def testQuarantineNotRetried(self):
+        self.watchdog.quarantined = MSPError("lost", errno = ErrorType.COMM_ERR)
+        self.assertRaises(BoardQuarantined, self.dll.base.readMemory, 0x2400, None, 2)
+        self.assertEqual(self.delays, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
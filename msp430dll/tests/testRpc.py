@@ -0,0 +1,165 @@
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+from msp430dll import DLL
+from msp430dll.debug import STATE_MODES
+from msp430dll.errors import ErrorType, MSPError
+from msp430dll.logger import Logger
+from msp430dll.rpc import createServer, FrameKind, HEADER, PROTOCOL_VERSION, Reader, receiveFrame, RpcClient, sendFrame
+from msp430dll.simulator import SimulatedLibrary
+
+
+class RpcTestMixIn(object):
+
+    def startServer(self, address):
+        self.library = SimulatedLibrary("MSP430F5529")
+        dll = DLL(library = self.library)
+        dll.base.initialize()
+        dll.base.openDevice()
+        self.server = createServer(address, dll)
+        self.thread = threading.Thread(target = self.server.serve_forever, kwargs = dict(poll_interval = 0.01))
+        self.thread.start()
+
+    def stopServer(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+class TestRpcTcp(RpcTestMixIn, unittest.TestCase):
+
+    def setUp(self):
+        self.startServer(("127.0.0.1", 0))
+        self.client = RpcClient(self.server.server_address, timeout = 5.0)
+
+    def tearDown(self):
+        self.client.close()
+        self.stopServer()
+
+    def testBatch(self):
+        batch = self.client.batch()
+        batch.writeMemory(0x2400, bytes(bytearray(range(200))))
+        reads = [batch.readMemory(0x2400 + 4 * idx, 4) for idx in range(50)]
+        registers = batch.readRegisters()
+        state = batch.getState(False)
+        vcc = batch.getVCC()
+        results = batch.execute(5.0)
+        self.assertEqual(len(results), 54)
+        self.assertEqual(b"".join(results[idx] for idx in reads), bytes(bytearray(range(200))))
+        self.assertEqual(list(results[registers])[0], "R0")
+        self.assertEqual(results[state][0], STATE_MODES.STOPPED)
+        self.assertEqual(results[vcc], self.library.vcc)
+
+    def testErrors(self):
+        batch = self.client.batch()
+        batch.writeRegister(4, 0x1234)
+        batch.readMemory(0x100000, 2)
+        batch.readRegister(4)
+        results = batch.submit().result(5.0)
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], MSPError)
+        self.assertEqual(results[1].errno, ErrorType.READ_MEMORY_ERR)
+        self.assertIsNone(results[2])
+        self.assertRaises(MSPError, batch.execute, 5.0)
+
+        batch = self.client.batch(stopOnError = False)
+        batch.readMemory(0x100000, 2)
+        batch.readRegister(4)
+        batch.call("base", "_private")
+        batch.call("base", "MSP430_Memory", 0x2400, b"\x00", 16, 1)
+        batch.call("base", "readOutFile", 0, 16, "out.txt")
+        batch.call("base", "secure")
+        batch.call("base", "readMemory", 0x2400, b"\x00", 16)
+        batch.call("base", "readMemory", 0x2400, None, 2)
+        results = batch.submit().result(5.0)
+        self.assertEqual(results[1], 0x1234)
+        self.assertEqual([r.errno for r in results[2 : 7]], [ErrorType.PARAMETER_ERR] * 5)
+        self.assertEqual(results[7], b"\x00\x00")
+
+    def testPipelining(self):
+        futures = []
+        for idx in range(10):
+            batch = self.client.batch()
+            batch.writeRegister(5, idx)
+            batch.readRegister(5)
+            batch.call("base", "getFoundDevice")
+            futures.append(batch.submit())
+        for idx, future in enumerate(futures):
+            _, value, device = future.result(5.0)
+            self.assertEqual(value, idx)
+            self.assertEqual(device['string'], b"MSP430F5529")
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "requires Unix domain sockets")
+class TestRpcUnix(RpcTestMixIn, unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.startServer(os.path.join(self.directory, "rpc.sock"))
+
+    def tearDown(self):
+        self.stopServer()
+        shutil.rmtree(self.directory)
+
+    def testConnectionLoss(self):
+        client = RpcClient(self.server.server_address, timeout = 5.0)
+        batch = client.batch()
+        batch.readCycleCounterValue(0)
+        self.assertEqual(batch.execute(5.0), [0])
+        client.close()
+        self.assertRaises(MSPError, batch.execute, 5.0)
+
+
+class TestUnknownBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(1)
+        self.thread = threading.Thread(target = self.serve)
+        self.thread.start()
+        self.level = Logger().logger.level
+        Logger().silent()
+
+    def tearDown(self):
+        Logger().setLevel(self.level)
+        self.thread.join()
+        self.listener.close()
+
+    def serve(self):
+        """Answer the first request with the response to another batch."""
+        connection, _ = self.listener.accept()
+        try:
+            body = receiveFrame(connection)
+            _, _, _, batchId, count = Reader(body).unpack(HEADER)
+            sendFrame(connection, HEADER.pack(PROTOCOL_VERSION, FrameKind.RESPONSE, 0, batchId + 1000, 0))
+            receiveFrame(connection)    # Until the client gives up the connection.
+        finally:
+            connection.close()
+
+    def testPendingFuturesFail(self):
+        client = RpcClient(self.listener.getsockname(), timeout = 5.0)
+        try:
+            batch = client.batch()
+            batch.getVCC()
+            with self.assertRaises(MSPError) as cm:
+                batch.submit().result(5.0)
+            self.assertEqual(cm.exception.errno, ErrorType.COMM_ERR)
+            self.assertRaises(MSPError, batch.submit)
+        finally:
+            client.close()
+
+
+class TestReader(unittest.TestCase):
+
+    def testTruncated(self):
+        self.assertRaises(MSPError, Reader(b"\x10\x00\x00\x00abc").bytes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+
+import unittest
+
+from msp430dll import DLL
+from msp430dll.base import EraseType
+from msp430dll.debug import RUN_MODES, STATE_MODES
+from msp430dll.eem import BpMode, BpParameter
+from msp430dll.errors import ErrorType, MSPError
+from msp430dll.simulator import LatencyModel, SimulatedLibrary
+from msp430dll.swbreak import SoftwareBreakpoints
+
+
+class TestSimulator(unittest.TestCase):
+
+    def setUp(self):
+        self.library = SimulatedLibrary("MSP430F20x3", latency = LatencyModel(overhead = 1e-3, perByte = 1e-5))
+        self.dll = DLL(library = self.library)
+
+    def open(self):
+        self.dll.base.initialize()
+        self.dll.base.openDevice()
+        return self.dll.base.getFoundDevice()
+
+    def testIdentification(self):
+        device = self.open()
+        self.assertEqual(device.string, b"MSP430F20x3")
+        self.assertEqual(device.mainStart, 0xf800)
+        self.assertEqual(self.dll.base.getJTAGId(), 0x91)
+
+    def testErrors(self):
+        with self.assertRaises(MSPError) as cm:
+            self.dll.base.readMemory(0x200, None, 2)
+        self.assertEqual(cm.exception.errno, ErrorType.NO_DEVICE_ERR)
+        self.dll.base.initialize()
+        self.assertRaises(MSPError, self.dll.base.openDevice, "MSP430F149")
+
+    def testMemory(self):
+        self.open()
+        self.dll.base.writeMemory(0x200, b"\x12\x34")
+        self.assertEqual(self.dll.base.readMemory(0x200, None, 2).raw, b"\x12\x34")
+        self.assertEqual(self.dll.base.readMemory(0xf800, None, 2).raw, b"\xff\xff")
+        self.dll.base.writeMemory(0xf800, b"\x0f\xf0")
+        self.dll.base.writeMemory(0xf800, b"\xf1\x1f")
+        self.assertEqual(self.dll.base.readMemory(0xf800, None, 2).raw, b"\x01\x10")
+        self.dll.base.erase(EraseType.ERASE_SEGMENT, 0xf810, 2)
+        self.assertEqual(self.dll.base.readMemory(0xf800, None, 2).raw, b"\xff\xff")
+
+    def testWriteAcrossGapIntoFlash(self):
+        self.open()
+        self.dll.base.writeMemory(0x1000, b"\x0f\x0f")
+        self.dll.base.writeMemory(0x0ffe, b"\x12\x34\xf0\xf1")
+        self.assertEqual(self.dll.base.readMemory(0x0ffe, None, 4).raw, b"\x12\x34\x00\x01")
+
+    def testLatency(self):
+        self.open()
+        calls = self.library.latency.calls
+        elapsed = self.library.latency.elapsed
+        self.dll.base.readMemory(0x200, None, 100)
+        self.assertEqual(self.library.latency.calls, calls + 1)
+        self.assertAlmostEqual(self.library.latency.elapsed - elapsed, 1e-3 + 100 * 1e-5)
+
+    def testRunToBreakpoint(self):
+        self.open()
+        self.dll.debug.writeRegister(4, 0x1234)
+        self.assertEqual(self.dll.debug.readRegisters()["R4"], 0x1234)
+        parameter = BpParameter()
+        parameter.bpMode = BpMode.BP_CODE
+        parameter.lAddrVal = 0xf820
+        handle = self.dll.eem.setBreakpoint(parameter)
+        self.assertEqual(self.dll.eem.getBreakpoint(handle).lAddrVal, 0xf820)
+        self.dll.debug.run(RUN_MODES.RUN_TO_BREAKPOINT, False)
+        self.assertEqual(self.dll.debug.getState(False)[0], STATE_MODES.BREAKPOINT_HIT)
+        self.assertEqual(self.dll.debug.readRegister(0), 0xf820)
+        self.assertEqual(self.dll.eem.readCycleCounterValue(0), self.library.cyclesPerRun)
+
+    def testSoftwareBreakpoints(self):
+        device = self.open()
+        self.dll.base.writeMemory(0xf900, b"\x34\x12\x78\x56")
+        breakpoints = SoftwareBreakpoints(self.dll.base, device)
+        breakpoints.add(0xf902)
+        breakpoints.commit()
+        self.assertEqual(self.dll.base.readMemory(0xf900, None, 4).raw, b"\x34\x12\x43\x43")
+        breakpoints.restoreAll()
+        self.assertEqual(self.dll.base.readMemory(0xf900, None, 4).raw, b"\x34\x12\x78\x56")
+
+
+if __name__ == '__main__':
+    unittest.main()
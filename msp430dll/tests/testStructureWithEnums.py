@@ -0,0 +1,45 @@
+
+import unittest
+
+from msp430dll.eem import BpAction, BpMode, BpParameter, SeqParameter, SeqState, TraceBuffer
+from msp430dll.utils import MappedArrayView
+
+
+class TestStructureWithEnums(unittest.TestCase):
+
+    def testScalarFieldIsEnum(self):
+        param = BpParameter()
+        param.bpMode = BpMode.BP_RANGE
+        param.lAddrVal = 0xf800
+        self.assertIs(param.bpMode, BpMode.BP_RANGE)
+        self.assertEqual(param.lAddrVal, 0xf800)
+
+    def testUnmappedFieldIsNative(self):
+        self.assertEqual(type(TraceBuffer.__dict__['lTrBufMAB']).__name__, 'CField')
+        self.assertEqual(type(BpParameter.__dict__['lAddrVal']).__name__, 'CField')
+
+    def testArrayFieldIsCachedLiveView(self):
+        param = SeqParameter()
+        view = param.seqNextStateX
+        self.assertIsInstance(view, MappedArrayView)
+        self.assertIs(param.seqNextStateX, view)
+        param.seqNextStateX[2] = SeqState.SEQ_STATE3
+        self.assertEqual(view, [SeqState.SEQ_STATE0, SeqState.SEQ_STATE0, SeqState.SEQ_STATE3, SeqState.SEQ_STATE0])
+        self.assertIs(view[2], SeqState.SEQ_STATE3)
+
+    def testInitializer(self):
+        param = SeqParameter(1, 0, BpAction.BP_BRK)
+        self.assertIs(param.bpAction, BpAction.BP_BRK)
+
+    def testInvalidValueRaises(self):
+        param = BpParameter()
+        param.bpMode = 42
+        with self.assertRaises(ValueError):
+            param.bpMode
+
+    def testStr(self):
+        self.assertIn("bpMode [BpMode] = <BpMode.BP_CLEAR: 0>;", str(BpParameter()))
+
+
+if __name__ == '__main__':
+    unittest.main()
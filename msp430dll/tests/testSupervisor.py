@@ -0,0 +1,89 @@
+
+import unittest
+
+from msp430dll import DLL
+from msp430dll.base import SystemEventMSPType
+from msp430dll.errors import ErrorType, MSPError
+from msp430dll.simulator import SimulatedLibrary
+from msp430dll.supervisor import BulkTransfer, SessionSupervisor
+
+
+class GlitchingLibrary(SimulatedLibrary):
+    """Loses the connection before the `glitchAt`-th memory access; fails `failures` reconnects."""
+
+    def __init__(self, *args, **kws):
+        super(GlitchingLibrary, self).__init__(*args, **kws)
+        self.glitchAt = None
+        self.failures = 0
+        self.accesses = []
+
+    def _Memory(self, address, buffer, count, rw):
+        if self.glitchAt is not None and len(self.accesses) == self.glitchAt:
+            self.glitchAt = None
+            self.loseConnection()
+        if self.opened:
+            self.accesses.append(address)
+        return super(GlitchingLibrary, self)._Memory(address, buffer, count, rw)
+
+    def _Initialize(self, port, pVersion):
+        if self.failures:
+            self.failures -= 1
+            self._require(False, ErrorType.USB_FET_NOT_FOUND_ERR)
+        return super(GlitchingLibrary, self)._Initialize(port, pVersion)
+
+
+class TestSupervisor(unittest.TestCase):
+
+    def setUp(self):
+        self.library = GlitchingLibrary("MSP430F5529")
+        self.delays = []
+        self.supervisor = SessionSupervisor(DLL(library = self.library), "SIM0", vcc = 3000,
+            initialDelay = 0.1, maxDelay = 0.3, maxAttempts = 4, sleep = self.delays.append)
+        self.supervisor.connect()
+        self.level = self.supervisor.logger.logger.level
+        self.supervisor.logger.silent()
+
+    def tearDown(self):
+        self.supervisor.logger.setLevel(self.level)
+
+    def testSystemEvent(self):
+        self.library.notify(SystemEventMSPType.DEVICE_IN_LPM5_MODE)
+        self.assertFalse(self.supervisor.lost)
+        self.library.loseConnection(SystemEventMSPType.FET_RESTART_NEEDED)
+        self.assertTrue(self.supervisor.lost)
+        self.assertEqual(self.supervisor.call(self.supervisor.dll.base.getVCC), 3000)
+        summary = self.supervisor.stats.summary()
+        self.assertEqual(summary['events'], {'DEVICE_IN_LPM5_MODE': 1, 'FET_RESTART_NEEDED': 1})
+        self.assertEqual(summary['reconnects'], 1)
+        self.assertGreaterEqual(summary['downtime'], 0.0)
+
+    def testResume(self):
+        data = bytes(bytearray(idx & 0xff for idx in range(4096)))
+        self.library.glitchAt = 2
+        self.library.failures = 3
+        self.supervisor.writeMemory(0x2400, data, chunkSize = 1024)
+        self.assertEqual(self.library.accesses, [0x2400, 0x2800, 0x2c00, 0x3000])
+        self.assertEqual(self.delays, [0.1, 0.2, 0.3])
+        self.assertEqual(self.supervisor.stats.failedAttempts, 3)
+        self.assertEqual(self.supervisor.stats.resumedTransfers, 1)
+        self.assertEqual(self.supervisor.readMemory(0x2400, 4096, chunkSize = 1000), data)
+
+    def testGiveUp(self):
+        bulk = BulkTransfer(0x2400, count = 2048)
+        self.library.glitchAt = 1
+        self.library.failures = 4
+        with self.assertRaises(MSPError) as cm:
+            self.supervisor.transfer(bulk)
+        self.assertEqual(cm.exception.errno, ErrorType.USB_FET_NOT_FOUND_ERR)
+        self.assertEqual(bulk.position, 1024)
+        self.supervisor.transfer(bulk)
+        self.assertTrue(bulk.done)
+        self.assertEqual(len(bulk.result), 2048)
+
+    def testOtherErrors(self):
+        self.assertRaises(MSPError, self.supervisor.call, self.supervisor.dll.base.readMemory, 0x100000, None, 2)
+        self.assertEqual(self.supervisor.stats.reconnects, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
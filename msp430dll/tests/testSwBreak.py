@@ -0,0 +1,82 @@
+import unittest
+
+from msp430dll import DLL
+from msp430dll.breakpoint import BreakpointManager
+from msp430dll.eem import BpMode, BpType
+from msp430dll.errors import ErrorType, MSPError
+from msp430dll.simulator import SimulatedLibrary
+from msp430dll.swbreak import SoftwareBreakpoints
+
+
+class TestSoftwareBreakpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.dll = DLL(library = SimulatedLibrary("MSP430F20x3"))
+        self.dll.base.initialize()
+        self.dll.base.openDevice()
+        self.device = self.dll.base.getFoundDevice()
+        self.dll.base.writeMemory(0xf900, b"\x34\x12\x78\x56\xbc\x9a")
+        self.dll.base.writeMemory(0x0200, b"\x11\x22\x33\x44")
+        self.manager = BreakpointManager(self.dll.eem, device = self.device)
+        self.breakpoints = SoftwareBreakpoints(self.dll.base, self.device, self.manager)
+
+    def read(self, address, length):
+        return self.dll.base.readMemory(address, None, length).raw
+
+    def testFlashSegmentRewrittenOnce(self):
+        self.breakpoints.add(0xf900)
+        self.breakpoints.add(0xf904)
+        cost = self.breakpoints.commit()
+        self.assertEqual((cost.patched, cost.segmentsErased, cost.writeCalls), (2, 1, 1))
+        self.assertEqual(self.read(0xf900, 6), b"\x43\x43\x78\x56\x43\x43")
+        self.assertEqual(self.breakpoints.originalWord(0xf904), 0x9abc)
+
+    def testRamSpansCoalesced(self):
+        self.breakpoints.add(0x0200)
+        self.breakpoints.add(0x0202)
+        cost = self.breakpoints.commit()
+        self.assertEqual((cost.readCalls, cost.writeCalls, cost.segmentsErased), (1, 1, 0))
+        self.assertEqual(self.read(0x0200, 4), b"\x43\x43\x43\x43")
+
+    def testLazyRestore(self):
+        self.breakpoints.add(0xf902)
+        self.breakpoints.commit()
+        self.breakpoints.remove(0xf902)
+        self.breakpoints.add(0xf902)
+        cost = self.breakpoints.commit()
+        self.assertEqual((cost.patched, cost.restored, cost.writeCalls), (0, 0, 0))
+        self.breakpoints.restoreAll()
+        self.assertEqual(self.read(0xf900, 6), b"\x34\x12\x78\x56\xbc\x9a")
+        self.assertFalse(self.breakpoints.isPatched(0xf902))
+
+    def testOddAddress(self):
+        with self.assertRaises(MSPError) as cm:
+            self.breakpoints.add(0xf901)
+        self.assertEqual(cm.exception.errno, ErrorType.PARAMETER_ERR)
+
+    def testTrigger(self):
+        self.breakpoints.add(0xf900)
+        self.breakpoints.commit()
+        self.assertEqual(len(self.manager), 1)
+        parameter = self.dll.eem.getBreakpoint(self.manager.handles[0])
+        self.assertEqual(parameter.bpMode, BpMode.BP_SOFTWARE)
+        self.assertEqual(parameter.bpType, BpType.BP_MDB)
+        self.assertEqual(parameter.lAddrVal, self.breakpoints.opcode)
+        self.assertEqual(parameter.lMask, 0xffff)
+        self.breakpoints.restoreAll()
+        self.assertEqual(len(self.manager), 0)
+
+    def testFailedWriteKeepsTable(self):
+        def failingWrite(address, buffer, count = None):
+            raise MSPError("write failed", errno = ErrorType.WRITE_MEMORY_ERR)
+        self.breakpoints.add(0xf900)
+        self.breakpoints.commit()
+        self.breakpoints.remove(0xf900)
+        self.breakpoints.add(0xf902)
+        self.dll.base.writeMemory = failingWrite
+        self.assertRaises(MSPError, self.breakpoints.commit)
+        self.assertEqual(self.breakpoints.originals, {0xf900: 0x1234})
+
+
+if __name__ == '__main__':
+    unittest.main()
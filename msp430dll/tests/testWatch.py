@@ -0,0 +1,102 @@
+from collections import namedtuple
+import unittest
+
+from msp430dll import DLL
+from msp430dll.eem import VwDataType, VwParameter
+from msp430dll.errors import MSPError
+from msp430dll.simulator import SimulatedLibrary
+from msp430dll.utils import perf_counter
+from msp430dll.watch import WatchMode, WatchScheduler
+
+TraceRecord = namedtuple("TraceRecord", "lTrBufMAB lTrBufMDB")
+
+
+class TestWatchScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.library = SimulatedLibrary("MSP430F5529")
+        self.dll = DLL(library = self.library)
+        self.dll.base.initialize()
+        self.dll.base.openDevice()
+        self.dll.base.writeMemory(0x2400, b"\x34\x12\x78\x56\x00\x00\xaa\xbb")
+
+    def watchedAddresses(self):
+        return sorted(VwParameter.from_buffer_copy(data).lAddr.value for data in self.library.variables.values())
+
+    def testPinnedByPriority(self):
+        scheduler = WatchScheduler(self.dll, hardwareSlots = 2)
+        scheduler.watch("low", 0x2400, priority = 0)
+        scheduler.watch("high", 0x2402, priority = 5)
+        scheduler.watch("mid", 0x2406, priority = 3)
+        scheduler.start()
+        modes = dict((s.name, s.mode) for s in scheduler.report())
+        self.assertEqual(modes, dict(low = WatchMode.POLLED, high = WatchMode.HARDWARE, mid = WatchMode.HARDWARE))
+        self.assertEqual(self.watchedAddresses(), [0x2402, 0x2406])
+        scheduler.stop()
+        self.assertEqual(self.library.variables, {})
+
+    def testPollCoalescesReads(self):
+        scheduler = WatchScheduler(self.dll, hardwareSlots = 0)
+        scheduler.watch("a", 0x2400)
+        scheduler.watch("b", 0x2402, dataType = VwDataType.VW_8)
+        scheduler.watch("c", 0x2406)
+        scheduler.watch("far", 0x2500, rate = 0)
+        scheduler.start()
+        scheduler.poll()
+        self.assertEqual(scheduler.memoryReads, 2)
+        self.assertEqual((scheduler["a"], scheduler["b"], scheduler["c"]), (0x1234, 0x78, 0xbbaa))
+        scheduler.poll()
+        self.assertEqual(scheduler.memoryReads, 3)     # Only `far` (no rate limit) is due again.
+        self.assertEqual(scheduler.variables["a"].updates, 1)
+
+    def testRateFromStart(self):
+        scheduler = WatchScheduler(self.dll, hardwareSlots = 0)
+        scheduler.watch("a", 0x2400)
+        self.assertIsNone(scheduler.variables["a"].started)
+        self.assertEqual(scheduler.report()[0].achievedRate, 0.0)
+        before = perf_counter()
+        scheduler.start()
+        self.assertGreaterEqual(scheduler.variables["a"].started, before)
+        scheduler.watch("b", 0x2402)
+        self.assertGreaterEqual(scheduler.variables["b"].started, scheduler.variables["a"].started)
+
+    def testHardwareUpdates(self):
+        scheduler = WatchScheduler(self.dll, hardwareSlots = 1)
+        scheduler.watch("a", 0x2400)
+        scheduler.start()
+        self.dll.eem.readTraceRecords = lambda count: [TraceRecord(0x2400, 0x10042), TraceRecord(0x3000, 1)]
+        scheduler.poll()
+        self.assertEqual(scheduler["a"], 0x0042)
+        self.assertEqual(scheduler.memoryReads, 0)
+
+    def testRotationReusesTriggers(self):
+        scheduler = WatchScheduler(self.dll, hardwareSlots = 2, rotatingSlots = 1, rotationPeriod = 0)
+        for idx, name in enumerate("abcd"):
+            scheduler.watch(name, 0x2400 + 2 * idx, priority = 4 - idx)
+        scheduler.start()
+        rotating = []
+        for _ in range(4):
+            self.assertEqual(len(self.library.variables), 2)
+            rotating.append([s.name for s in scheduler.report() if s.mode == WatchMode.ROTATING])
+            scheduler.poll()
+        self.assertEqual(rotating, [["b"], ["c"], ["d"], ["b"]])
+
+    def testPromotionKeepsHandle(self):
+        scheduler = WatchScheduler(self.dll, hardwareSlots = 2, rotatingSlots = 1)
+        scheduler.watch("a", 0x2400, priority = 3)
+        scheduler.watch("b", 0x2402, priority = 2)
+        scheduler.watch("c", 0x2404, priority = 1)
+        scheduler.start()
+        handle = scheduler.variables["b"].handle
+        scheduler.unwatch("a")
+        self.assertEqual(scheduler.variables["b"].mode, WatchMode.HARDWARE)
+        self.assertEqual(scheduler.variables["b"].handle, handle)
+        self.assertEqual(scheduler.variables["c"].mode, WatchMode.ROTATING)
+        self.assertEqual(self.watchedAddresses(), [0x2402, 0x2404])
+
+    def testTooManyRotatingSlots(self):
+        self.assertRaises(MSPError, WatchScheduler, self.dll, hardwareSlots = 1, rotatingSlots = 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
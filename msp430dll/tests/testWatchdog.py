@@ -0,0 +1,132 @@
+
+import threading
+import unittest
+
+from msp430dll import DLL
+from msp430dll.errors import BoardQuarantined, CONNECTION_ERRORS, DeadlineExceeded, ErrorType, MSPError
+from msp430dll.simulator import SimulatedLibrary
+from msp430dll.utils import perf_counter
+from msp430dll.watchdog import Watchdog
+
+
+class HangingFunction(object):
+
+    def __init__(self, library, name, function):
+        self.library = library
+        self.name = name
+        self.function = function
+
+    restype = property(lambda self: self.function.restype, lambda self, value: setattr(self.function, 'restype', value))
+    argtypes = property(lambda self: self.function.argtypes,
+        lambda self, value: setattr(self.function, 'argtypes', value))
+
+    def __call__(self, *args):
+        if self.name in self.library.hang:
+            self.library.release.wait()
+        return self.function(*args)
+
+
+class HangingLibrary(SimulatedLibrary):
+    """Functions named in `hang` block (outside of the library lock) until `release` is set."""
+
+    def __init__(self, *args, **kws):
+        super(HangingLibrary, self).__init__(*args, **kws)
+        self.hang = set()
+        self.release = threading.Event()
+
+    def __getattr__(self, name):
+        return HangingFunction(self, name, super(HangingLibrary, self).__getattr__(name))
+
+
+class TestWatchdog(unittest.TestCase):
+
+    def setUp(self):
+        self.library = HangingLibrary("MSP430F5529")
+        self.dll = DLL(library = self.library)
+        self.watchdog = Watchdog(port = "SIM0", deadlines = {"MSP430_Initialize": 0.2, "MSP430_OpenDevice": 0.2},
+            defaultDeadline = 0.2, abandonedTimeout = 1.0).install(self.dll)
+        self.level = self.watchdog.logger.logger.level
+        self.watchdog.logger.silent()
+        self.dll.base.initialize("SIM0")
+        self.dll.base.openDevice()
+
+    def tearDown(self):
+        self.library.release.set()
+        self.watchdog.uninstall()
+        self.watchdog.logger.setLevel(self.level)
+
+    def testNormalCalls(self):
+        self.dll.debug.writeRegister(4, 17)
+        self.assertEqual(self.dll.debug.readRegister(4), 17)
+        stats = self.watchdog.snapshot()["MSP430_Register"]
+        self.assertEqual((stats['calls'], stats['timeouts']), (2, 0))
+        self.assertIsNotNone(stats['latency']['p99'])
+
+    def testErrorNumberSurvives(self):
+        self.watchdog.defaultDeadline = 1.0
+        with self.assertRaises(MSPError) as cm:
+            self.dll.base.readMemory(0xfffff0, None, 64)
+        self.assertNotIsInstance(cm.exception, DeadlineExceeded)
+        self.assertEqual(cm.exception.errno, ErrorType.READ_MEMORY_ERR)
+        self.assertEqual(self.watchdog.recoveries + self.watchdog.failedRecoveries, 0)
+        self.assertFalse(any(stats.timeouts for stats in self.watchdog.functions.values()))
+        self.assertEqual(self.watchdog.functions["MSP430_Memory"].errors, 1)
+
+    def testTimeoutAndRecovery(self):
+        self.library.hang.add("MSP430_State")
+        release = threading.Timer(0.4, self.library.release.set)
+        release.start()
+        start = perf_counter()
+        with self.assertRaises(DeadlineExceeded) as cm:
+            self.dll.debug.getState(False)
+        self.assertLess(perf_counter() - start, 0.4)   # Raised before the recovery.
+        with self.assertRaises(BoardQuarantined) as quarantined:
+            self.dll.base.getVCC()
+        self.assertIn("recovery in progress", str(quarantined.exception))
+        self.assertTrue(self.watchdog.waitForRecovery(5.0))
+        release.join()
+        self.assertEqual(cm.exception.functionName, "MSP430_State")
+        self.assertIn(cm.exception.errno, CONNECTION_ERRORS)
+        self.assertEqual(self.watchdog.recoveries, 1)
+        self.assertTrue(self.library.opened)
+        self.assertEqual(self.dll.base.readMemory(0x2400, None, 2).raw, b"\x00\x00")
+        stats = self.watchdog.functions["MSP430_State"]
+        self.assertEqual((stats.timeouts, stats.latency.count), (1, 1))
+        self.assertGreaterEqual(stats.latency.max, 0.2)
+        self.assertLess(stats.latency.max, 0.4)     # Not including the recovery.
+        self.assertIn('msp430_dll_timeouts_total{function="MSP430_State"} 1', self.watchdog.toPrometheus())
+
+    def testRecoveryWaitsForAbandonedCall(self):
+        self.library.hang.add("MSP430_Memory")
+        self.assertRaises(DeadlineExceeded, self.dll.base.readMemory, 0x2400, None, 2)
+        self.assertTrue(self.watchdog.waitForRecovery(5.0))
+        self.assertEqual(self.watchdog.failedRecoveries, 1)
+        self.assertEqual(self.watchdog.quarantined.errno, ErrorType.USB_FET_BUSY_ERR)
+        self.assertTrue(self.library.opened)        # Neither closed nor re-initialized.
+        self.assertNotIn("MSP430_Close", self.watchdog.functions)
+        with self.assertRaises(BoardQuarantined) as cm:
+            self.dll.base.getVCC()
+        self.assertEqual(cm.exception.functionName, "MSP430_GetCurVCCT")
+        self.assertRaises(MSPError, self.watchdog.reset)
+        self.library.release.set()
+        self.watchdog.reset()
+        self.assertEqual(self.dll.base.getJTAGId(), 0x91)
+
+    def testQuarantine(self):
+        self.watchdog.device = "MSP430F20x3"       # Not the simulated part, so re-opening fails.
+        self.library.hang.add("MSP430_State")
+        release = threading.Timer(0.4, self.library.release.set)
+        release.start()
+        self.assertRaises(DeadlineExceeded, self.dll.debug.getState, False)
+        self.assertTrue(self.watchdog.waitForRecovery(5.0))
+        release.join()
+        self.assertEqual(self.watchdog.failedRecoveries, 1)
+        self.assertIsNotNone(self.watchdog.quarantined)
+        self.assertRaises(BoardQuarantined, self.dll.base.getVCC)
+        self.watchdog.reset()
+        self.dll.base.initialize("SIM0")
+        self.assertEqual(self.dll.base.getJTAGId(), 0x91)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -26,7 +26,25 @@ __copyright__ = """
   51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
 
+import abc
+import json
 import os
+import threading
+try:
+    from time import perf_counter
+except ImportError:
+    from time import time as perf_counter
+
+try:
+    from abc import ABC
+except ImportError:
+    ABC = abc.ABCMeta("ABC", (object, ), {})
+
+try:
+    TimeoutError = TimeoutError
+except NameError:
+    class TimeoutError(OSError):
+        pass
 
 CYG_PREFIX = "/cygdrive/"
 
@@ -38,24 +56,192 @@ def cygpathToWin(path):
         path = "{0}{1}".format(driveLetter, path)
     return path
 
+
+def configDirectory():
+    """Directory for persistent data (caches etc.), `$MSP430DLL_HOME` or `~/.msp430dll`."""
+    return os.environ.get("MSP430DLL_HOME") or os.path.join(os.path.expanduser("~"), ".msp430dll")
+
+
+def loadJson(filename, default = None):
+    try:
+        with open(filename) as inf:
+            return json.load(inf)
+    except (IOError, OSError, ValueError):
+        return default
+
+
+def saveJson(filename, data):
+    """Write `data` to `filename`, atomically replacing an existing file."""
+    directory = os.path.dirname(filename)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    tmpName = "{0}.{1}.tmp".format(filename, os.getpid())
+    with open(tmpName, "w") as outf:
+        json.dump(data, outf, indent = 2, sort_keys = True)
+    try:
+        os.replace(tmpName, filename)
+    except AttributeError:
+        if os.path.exists(filename):
+            os.remove(filename)
+        os.rename(tmpName, filename)
+
+
+class Future(object):
+    """Result of an asynchronous operation, set exactly once from another thread."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._result = None
+        self._exception = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def done(self):
+        return self._event.is_set()
+
+    def setResult(self, result):
+        self._result = result
+        self._finish()
+
+    def setException(self, exception):
+        self._exception = exception
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def addDoneCallback(self, callback):
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def exception(self, timeout = None):
+        if not self._event.wait(timeout):
+            raise TimeoutError("Future not done after {0} s".format(timeout))
+        return self._exception
+
+    def result(self, timeout = None):
+        exception = self.exception(timeout)
+        if exception is not None:
+            raise exception
+        return self._result
+
 import ctypes
 
-class StructureWithEnums(ctypes.Structure):
-    """Add missing enum feature to ctypes Structures.
+
+class MappedField(object):
+    """Data descriptor wrapping a ctypes field: values are converted by `_map` on read."""
+
+    def __init__(self, name, field, enumClass):
+        self.name = name
+        self.field = field
+        self.enumClass = enumClass
+        self.members = getattr(enumClass, '_value2member_map_', {})
+
+    @property
+    def offset(self):
+        return self.field.offset
+
+    @property
+    def size(self):
+        return self.field.size
+
+    def __get__(self, obj, objtype = None):
+        if obj is None:
+            return self
+        value = self.field.__get__(obj, objtype)
+        try:
+            return self.members[value]
+        except KeyError:
+            return self.enumClass(value)
+
+    def __set__(self, obj, value):
+        self.field.__set__(obj, value)
+
+
+class MappedArrayField(MappedField):
+    """Like `MappedField`, but for array fields: returns a (cached) `MappedArrayView`."""
+
+    def __get__(self, obj, objtype = None):
+        if obj is None:
+            return self
+        views = obj.__dict__
+        try:
+            return views[self.name]
+        except KeyError:
+            view = views[self.name] = MappedArrayView(self.field.__get__(obj, objtype), self.enumClass, self.members)
+            return view
+
+
+class MappedArrayView(object):
+    """Live view of a ctypes array, elements are converted on access."""
+
+    __slots__ = ('array', 'enumClass', 'members')
+
+    def __init__(self, array, enumClass, members):
+        self.array = array
+        self.enumClass = enumClass
+        self.members = members
+
+    def _convert(self, value):
+        try:
+            return self.members[value]
+        except KeyError:
+            return self.enumClass(value)
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._convert(x) for x in self.array[idx]]
+        return self._convert(self.array[idx])
+
+    def __setitem__(self, idx, value):
+        self.array[idx] = value
+
+    def __iter__(self):
+        for value in self.array:
+            yield self._convert(value)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class StructureWithEnumsType(type(ctypes.Structure)):
+    """Replaces the ctypes descriptors of the fields listed in `_map` once, at class creation.
+
+    Fields not in `_map` are left alone, i.e. they are read at native ctypes speed.
     """
-    _map = {}
 
-    def __getattribute__(self, name):
-        _map = ctypes.Structure.__getattribute__(self, '_map')
-        value = ctypes.Structure.__getattribute__(self, name)
-        if name in _map:
-            EnumClass = _map[name]
-            if isinstance(value, ctypes.Array):
-                return [EnumClass(x) for x in value]
+    def __init__(cls, name, bases, namespace):
+        super(StructureWithEnumsType, cls).__init__(name, bases, namespace)
+        _map = namespace.get('_map', {})
+        for fieldName, fieldType in namespace.get('_fields_', ()):
+            if fieldName not in _map:
+                continue
+            if issubclass(fieldType, ctypes.Array):
+                descriptor = MappedArrayField(fieldName, cls.__dict__[fieldName], _map[fieldName])
             else:
-                return EnumClass(value)
-        else:
-            return value
+                descriptor = MappedField(fieldName, cls.__dict__[fieldName], _map[fieldName])
+            setattr(cls, fieldName, descriptor)
+
+
+class _StructureWithEnums(ctypes.Structure):
+
+    _map = {}
 
     def __str__(self):
         result = []
@@ -72,3 +258,9 @@ class StructureWithEnums(ctypes.Structure):
     __repr__ = __str__
 
 
+StructureWithEnums = StructureWithEnumsType('StructureWithEnums', (_StructureWithEnums, ), {
+    '__doc__': """Add missing enum feature to ctypes Structures.
+    """,
+    '__module__': __name__,
+})
+
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+from collections import namedtuple
+
+import enum
+from msp430dll.eem import N_TRACE_POS, VwControl, VwDataType, VwEnable, VwParameter
+from msp430dll.errors import ErrorType, MSPError
+from msp430dll.utils import perf_counter
+
+DATA_SIZE = {
+    VwDataType.VW_8: 1,
+    VwDataType.VW_16: 2,
+    VwDataType.VW_32: 4,
+}
+
+WatchStats = namedtuple("WatchStats", "name mode requestedRate achievedRate updates")
+
+
+class WatchMode(enum.IntEnum):
+    POLLED = 0      #: Read by (coalesced) memory polling.
+    HARDWARE = 1    #: Permanently on a hardware variable-watch trigger.
+    ROTATING = 2    #: Currently on one of the rotating hardware slots.
+
+
+class WatchedVariable(object):
+
+    def __init__(self, name, address, dataType, priority, rate):
+        self.name = name
+        self.address = address
+        self.dataType = VwDataType(dataType)
+        self.size = DATA_SIZE[self.dataType]
+        self.priority = priority
+        self.rate = rate
+        self.interval = 1.0 / rate if rate else 0.0
+        self.mode = WatchMode.POLLED
+        self.handle = 0
+        self.value = None
+        self.updates = 0
+        self.lastUpdate = None
+        self.started = None     # Set when watching starts.
+
+    def update(self, value, now):
+        self.value = value
+        self.updates += 1
+        self.lastUpdate = now
+
+    def isDue(self, now):
+        return self.lastUpdate is None or (now - self.lastUpdate) >= self.interval
+
+    def achievedRate(self, now):
+        if self.started is None:
+            return 0.0
+        elapsed = now - self.started
+        return self.updates / elapsed if elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return "WatchedVariable({0!r}, 0x{1:04x}, {2}, priority = {3})".format(self.name, self.address, self.dataType.name, self.priority)
+
+
+class WatchScheduler(object):
+    """Watch any number of target variables.
+
+    The variables with the highest priority are pinned to hardware
+    variable-watch triggers; `rotatingSlots` of the `hardwareSlots` are
+    handed round-robin to the remaining variables every `rotationPeriod`
+    seconds. Everything else is sampled by `poll`, which reads all due
+    variables with as few `MSP430_Memory` calls as possible (addresses
+    closer than `maxGap` bytes share one read).
+
+    `rate` is the sampling budget of a variable in updates/second; polled
+    variables are never read more often than that.
+    """
+
+    def __init__(self, dll, hardwareSlots = 2, rotatingSlots = 0, rotationPeriod = 0.5, maxGap = 16):
+        if rotatingSlots > hardwareSlots:
+            raise MSPError("More rotating slots than hardware slots.", errno = ErrorType.PARAMETER_ERR)
+        self.dll = dll
+        self.hardwareSlots = hardwareSlots
+        self.rotatingSlots = rotatingSlots
+        self.rotationPeriod = rotationPeriod
+        self.maxGap = maxGap
+        self.variables = {}
+        self._pinned = []
+        self._rotating = []
+        self._pool = []
+        self._rotationIndex = 0
+        self._lastRotation = perf_counter()
+        self._byAddress = {}
+        self.active = False
+        self.memoryReads = 0
+
+    def __getitem__(self, name):
+        return self.variables[name].value
+
+    def watch(self, name, address, dataType = VwDataType.VW_16, priority = 0, rate = 10.0):
+        variable = self.variables[name] = WatchedVariable(name, address, dataType, priority, rate)
+        if self.active:
+            variable.started = perf_counter()
+            self.assign()
+
+    def unwatch(self, name):
+        variable = self.variables.pop(name)
+        if variable.handle:
+            self._release(variable)
+        if self.active:
+            self.assign()
+
+    def start(self):
+        self.dll.eem.setVariableWatch(VwEnable.VW_ENABLE)
+        now = perf_counter()
+        for variable in self.variables.values():
+            variable.started = now
+        self.active = True
+        self.assign()
+
+    def stop(self):
+        for variable in self.variables.values():
+            if variable.handle:
+                self._release(variable)
+        self.dll.eem.setVariableWatch(VwEnable.VW_DISABLE)
+        self.active = False
+
+    def assign(self):
+        """(Re-)distribute variables to hardware slots by priority."""
+        ordered = sorted(self.variables.values(), key = lambda v: (-v.priority, v.name))
+        nPinned = self.hardwareSlots - self.rotatingSlots
+        pinned = ordered[ : nPinned]
+        self._pool = ordered[nPinned : ]
+        for variable in self._pinned + self._rotating:
+            if variable not in pinned and variable.handle:
+                self._release(variable)
+        for variable in pinned:
+            if variable.mode == WatchMode.ROTATING:
+                # Promoted from a rotating slot, the trigger already watches it.
+                variable.mode = WatchMode.HARDWARE
+            elif variable.mode != WatchMode.HARDWARE:
+                self._acquire(variable, WatchMode.HARDWARE)
+        self._pinned = pinned
+        self._rotating = []
+        self._rotationIndex = 0
+        self._rotate()
+
+    def poll(self):
+        """Collect hardware updates, rotate slots when due and sample due variables from memory."""
+        now = perf_counter()
+        self._drainTrace(now)
+        if self.rotatingSlots and self._pool and (now - self._lastRotation) >= self.rotationPeriod:
+            self._rotate()
+        due = [v for v in self._pool if v.mode == WatchMode.POLLED and v.isDue(now)]
+        for start, length, members in self._spans(due):
+            data = bytearray(self.dll.base.readMemory(start, None, length).raw)
+            self.memoryReads += 1
+            for variable in members:
+                offset = variable.address - start
+                value = 0
+                for idx in range(variable.size):
+                    value |= data[offset + idx] << (8 * idx)
+                variable.update(value, now)
+
+    def report(self):
+        now = perf_counter()
+        return [WatchStats(v.name, v.mode, v.rate, v.achievedRate(now), v.updates)
+            for v in sorted(self.variables.values(), key = lambda v: v.name)]
+
+    def _rotate(self):
+        self._lastRotation = perf_counter()
+        if not self.rotatingSlots or not self._pool:
+            return
+        count = min(self.rotatingSlots, len(self._pool))
+        selected = [self._pool[(self._rotationIndex + idx) % len(self._pool)] for idx in range(count)]
+        self._rotationIndex = (self._rotationIndex + count) % len(self._pool)
+        freed = [v for v in self._rotating if v not in selected]
+        for variable in selected:
+            if variable in self._rotating:
+                continue
+            if freed:
+                # Re-target an existing trigger instead of clear + set.
+                previous = freed.pop(0)
+                handle, previous.handle, previous.mode = previous.handle, 0, WatchMode.POLLED
+                self._byAddress.pop(previous.address, None)
+                self._acquire(variable, WatchMode.ROTATING, handle)
+            else:
+                self._acquire(variable, WatchMode.ROTATING)
+        for variable in freed:
+            self._release(variable)
+        self._rotating = selected
+
+    def _acquire(self, variable, mode, handle = 0):
+        parameter = VwParameter()
+        parameter.vwControl = VwControl.VW_SET
+        parameter.lAddr = variable.address
+        parameter.vwDataType = variable.dataType
+        variable.handle = self.dll.eem.setVariable(handle, parameter) or handle
+        variable.mode = mode
+        self._byAddress[variable.address] = variable
+
+    def _release(self, variable):
+        parameter = VwParameter()
+        parameter.vwControl = VwControl.VW_CLEAR
+        self.dll.eem.setVariable(variable.handle, parameter)
+        self._byAddress.pop(variable.address, None)
+        variable.handle = 0
+        variable.mode = WatchMode.POLLED
+
+    def _drainTrace(self, now):
+        if not self._byAddress:
+            return
+        for record in self.dll.eem.readTraceRecords(N_TRACE_POS):
+            variable = self._byAddress.get(record.lTrBufMAB)
+            if variable is not None:
+                variable.update(record.lTrBufMDB & ((1 << (8 * variable.size)) - 1), now)
+
+    def _spans(self, variables):
+        spans = []
+        for variable in sorted(variables, key = lambda v: v.address):
+            end = variable.address + variable.size
+            if spans and variable.address - (spans[-1][0] + spans[-1][1]) <= self.maxGap:
+                start, length, members = spans[-1]
+                members.append(variable)
+                spans[-1] = (start, max(start + length, end) - start, members)
+            else:
+                spans.append((variable.address, variable.size, [variable]))
+        return spans
@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__version__ = "0.1.0"
+__description__ = "MSP430DLL (Python wrapper for msp430.dll)."
+__copyright__ = """
+  MSP430DLL (Python wrapper for msp430.dll).
+
+  (C) 2016 by Christoph Schueler <https://github.com/christoph2,
+                                       cpu12.gems@googlemail.com>
+
+  All Rights Reserved
+
+  This program is free software; you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation; either version 2 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License along
+  with this program; if not, write to the Free Software Foundation, Inc.,
+  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from msp430dll.errors import BoardQuarantined, DeadlineExceeded, ErrorType, MSPError
+from msp430dll.instrument import Instrumentation
+from msp430dll.logger import Logger
+from msp430dll.utils import Future, perf_counter, TimeoutError
+
+DEFAULT_DEADLINE = 5.0
+DEFAULT_DEADLINES = {
+    "MSP430_Erase": 60.0,
+    "MSP430_ProgramFile": 120.0,
+    "MSP430_ReadOutFile": 120.0,
+    "MSP430_VerifyFile": 120.0,
+    "MSP430_Initialize": 30.0,
+    "MSP430_OpenDevice": 30.0,
+}
+
+_local = threading.local()
+
+
+def _onWorker():
+    return getattr(_local, 'worker', None) is not None
+
+
+class _Worker(object):
+    """Thread executing DLL calls; abandoned (and left to finish on its own) when a call hangs."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target = self._run, name = "msp430-watchdog-worker")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, func, args):
+        future = Future()
+        self._queue.put((future, func, args))
+        return future
+
+    def stop(self):
+        self._queue.put(None)
+
+    def _run(self):
+        _local.worker = self
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, func, args = item
+            try:
+                future.setResult(func(*args))
+            except Exception as e:
+                future.setException(e)
+
+
+class Watchdog(Instrumentation):
+    """Deadlines for DLL calls, on top of the `Instrumentation` statistics.
+
+    Installed like `Instrumentation` (``Watchdog(port = "TIUSB").install(dll)``);
+    do not install both. Guarded functions run on a worker thread and the
+    caller waits at most `deadlines[name]` (default `defaultDeadline`, None
+    means unguarded) seconds; DLL calls made on the worker itself (like
+    `MSP430_Error_Number` while checking a result) run inline. On timeout
+    the worker is abandoned, the latency is recorded at the deadline and
+    `DeadlineExceeded` is raised at once, so a caller never blocks longer
+    than the deadline of its call. A controlled recovery (close, initialize,
+    open) is started in the background and runs on a fresh worker, again
+    under deadlines, but only after the abandoned calls returned -- the DLL
+    is not reentrant; it waits at most `abandonedTimeout` seconds for them.
+    A recovery thus takes up to `abandonedTimeout` plus the deadlines of
+    `MSP430_Close`, `MSP430_Initialize` and `MSP430_OpenDevice`; meanwhile
+    calls raise `BoardQuarantined` at once (`waitForRecovery()` waits for
+    the outcome). If the recovery fails, the board is quarantined: every
+    call raises `BoardQuarantined` until `reset()`.
+
+    Latency quantiles per function are available via `snapshot()` etc.
+    """
+
+    def __init__(self, port = "TIUSB", device = "DEVICE_UNKNOWN", deadlines = None, defaultDeadline = DEFAULT_DEADLINE,
+            recover = True, abandonedTimeout = DEFAULT_DEADLINE, bounds = None):
+        super(Watchdog, self).__init__(bounds)
+        self.port = port
+        self.device = device
+        self.deadlines = dict(DEFAULT_DEADLINES)
+        self.deadlines.update(deadlines or {})
+        self.defaultDeadline = defaultDeadline
+        self.recoverOnTimeout = recover
+        self.abandonedTimeout = abandonedTimeout
+        self.recoveries = 0
+        self.failedRecoveries = 0
+        self.quarantined = None
+        self.logger = Logger()
+        self._worker = None
+        self._abandoned = []        # Futures of timed out calls, maybe still running.
+        self._lock = threading.Lock()
+        self._recovering = False
+        self._recoveryThread = None
+
+    def deadline(self, functionName):
+        return self.deadlines.get(functionName, self.defaultDeadline)
+
+    def wrap(self, functionName, func):
+        timeout = self.deadline(functionName)
+        if timeout is None:
+            return super(Watchdog, self).wrap(functionName, func)
+
+        def guarded(*args):
+            return self.call(functionName, func, args, timeout)
+        # Timed on the caller's side, so a timed out call is recorded at its deadline.
+        timed = super(Watchdog, self).wrap(functionName, guarded)
+
+        def wrapper(*args):
+            if not _onWorker():
+                if self.quarantined is not None:
+                    raise BoardQuarantined(functionName, self.quarantined)
+                if self._recovering and threading.current_thread() is not self._recoveryThread:
+                    raise BoardQuarantined(functionName, "recovery in progress")
+            try:
+                return timed(*args)
+            except DeadlineExceeded:
+                if self.recoverOnTimeout:
+                    self._startRecovery()
+                raise
+        wrapper.__name__ = functionName
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    def call(self, functionName, func, args, timeout):
+        """`func(*args)` on the worker thread; raises `DeadlineExceeded` after `timeout` seconds."""
+        if _onWorker():
+            return func(*args)
+        with self._lock:
+            if self._worker is None:
+                self._worker = _Worker()
+            worker = self._worker
+        future = worker.submit(func, args)
+        try:
+            exception = future.exception(timeout)
+        except TimeoutError:
+            pass
+        else:
+            if exception is not None:
+                raise exception
+            return future.result()
+        with self._lock:
+            if self._worker is worker:
+                self._worker = None
+            self._abandoned.append(future)
+        worker.stop()
+        self.stats(functionName).timeouts += 1
+        error = DeadlineExceeded(functionName, timeout)
+        self.logger.error("%s", error)
+        raise error
+
+    def recover(self):
+        """Close and re-open the interface in the calling thread; quarantines the board if that fails."""
+        with self._lock:
+            if self._recovering:
+                return False
+            self._recovering = True
+            self._recoveryThread = threading.current_thread()
+        return self._recover()
+
+    def waitForRecovery(self, timeout = None):
+        """Wait for a background recovery to finish; returns False if it is still running."""
+        thread = self._recoveryThread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        return not self._recovering
+
+    def _startRecovery(self):
+        with self._lock:
+            if self._recovering:
+                return
+            self._recovering = True
+            thread = self._recoveryThread = threading.Thread(target = self._recover, name = "msp430-watchdog-recovery")
+            thread.daemon = True
+        thread.start()
+
+    def _recover(self):
+        base = self.dll.base
+        try:
+            self._awaitAbandoned()
+            try:
+                base.close()
+            except DeadlineExceeded:
+                raise
+            except MSPError:
+                pass
+            base.initialize(self.port)
+            base.openDevice(self.device)
+        except MSPError as e:
+            self.failedRecoveries += 1
+            self.quarantined = e
+            self.logger.error("Recovery failed, board quarantined: %s", e)
+            return False
+        finally:
+            with self._lock:
+                self._recovering = False
+        self.recoveries += 1
+        self.logger.info("Recovered after a timeout.")
+        return True
+
+    def reset(self):
+        """Clear the statistics and lift the quarantine, once the abandoned calls returned."""
+        self._awaitAbandoned()
+        super(Watchdog, self).reset()
+        self.quarantined = None
+
+    def uninstall(self):
+        super(Watchdog, self).uninstall()
+        with self._lock:
+            if self._worker is not None:
+                self._worker.stop()
+                self._worker = None
+
+    def _awaitAbandoned(self):
+        """Wait up to `abandonedTimeout` seconds for the timed out calls to leave the DLL."""
+        with self._lock:
+            pending = [future for future in self._abandoned if not future.done()]
+        end = perf_counter() + self.abandonedTimeout
+        for future in pending:
+            try:
+                future.exception(max(0.0, end - perf_counter()))
+            except TimeoutError:
+                raise MSPError("A timed out call is still running inside the DLL.", errno = ErrorType.USB_FET_BUSY_ERR)
+        with self._lock:
+            self._abandoned = [future for future in self._abandoned if not future.done()]
@@ -42,7 +42,7 @@ setup(
     # installed, specify them here.  If using Python 2.6 or less, then these
     # have to be included in MANIFEST.in as well.
     package_data = {
-        'sample': ['package_data.dat'],
+        'msp430dll': ['data/*.csv', 'tests/*.json'],
     },
 
     # Although 'package_data' is the preferred approach, in some case you may
@@ -57,6 +57,7 @@ setup(
     entry_points={
         'console_scripts': [
             'msp430-info = msp430dll.msp430_info:main',
+            'msp430-broker = msp430dll.broker:main',
         ],
     },
     test_suite="msp430dll.tests"